@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Desactiva las conexiones persistentes, que bajo ASGI se acumulan (ver app/settings.py)
+os.environ['SERVIDOR_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -0,0 +1,196 @@
+# app/basedatos.py
+"""Enrutamiento de lecturas a la réplica y métricas de conexiones a la base de datos."""
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from usuarios.views import validar_token, es_admin
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias usado para las lecturas de la petición en curso (None = el primario)
+_alias_lectura = ContextVar('alias_lectura', default=None)
+
+
+def _clave_escritura(usuario_id):
+    return f"bd:escritura:{usuario_id}"
+
+
+def _usuario_id(request):
+    payload = validar_token(request)
+    if payload and 'error' not in payload:
+        return payload.get('usuario_id')
+    return None
+
+
+def replica_configurada():
+    alias = getattr(settings, 'REPLICA_ALIAS', None)
+    return alias if alias and alias in settings.DATABASES else None
+
+
+# -----------------------------
+# Router
+# -----------------------------
+class EnrutadorReplica:
+    """Envía las lecturas del ORM a la réplica solo cuando el middleware lo marcó
+    para la petición en curso y no hay una transacción abierta en el primario
+    (dentro de una transacción se lee lo que la propia transacción escribió)."""
+
+    def db_for_read(self, model, **hints):
+        alias = _alias_lectura.get()
+        if alias and not connections['default'].in_atomic_block:
+            return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primario tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaLecturaMiddleware:
+    """Marca las peticiones GET para leer de la réplica, salvo que el mismo usuario haya
+    escrito hace menos de REPLICA_VENTANA_ESCRITURA segundos (lee sus propias escrituras
+    aunque la réplica vaya atrasada).
+
+    La marca de escritura se guarda en la caché; con varios procesos la caché debe
+    ser compartida (Redis, memcached o base de datos) para que la ventana se respete.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Bajo ASGI la cadena es asíncrona y la petición no salta a un hilo solo por este middleware
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _usar_replica(self, request, alias, escribio):
+        return alias is not None and request.method in METODOS_SEGUROS and not escribio
+
+    def _marcar_escritura(self, request, alias, usuario_id, response):
+        return bool(alias and usuario_id and request.method not in METODOS_SEGUROS and response.status_code < 400)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        alias = replica_configurada()
+        usuario_id = _usuario_id(request) if alias else None
+        escribio = bool(usuario_id and cache.get(_clave_escritura(usuario_id)))
+
+        marca = _alias_lectura.set(alias if self._usar_replica(request, alias, escribio) else None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _alias_lectura.reset(marca)
+
+        if self._marcar_escritura(request, alias, usuario_id, response):
+            cache.set(_clave_escritura(usuario_id), True, timeout=settings.REPLICA_VENTANA_ESCRITURA)
+        return response
+
+    async def __acall__(self, request):
+        alias = replica_configurada()
+        usuario_id = _usuario_id(request) if alias else None
+        escribio = bool(usuario_id and await cache.aget(_clave_escritura(usuario_id)))
+
+        # sync_to_async copia el contexto al hilo del ORM, así el enrutador ve la marca
+        marca = _alias_lectura.set(alias if self._usar_replica(request, alias, escribio) else None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _alias_lectura.reset(marca)
+
+        if self._marcar_escritura(request, alias, usuario_id, response):
+            await cache.aset(_clave_escritura(usuario_id), True, timeout=settings.REPLICA_VENTANA_ESCRITURA)
+        return response
+
+
+# -----------------------------
+# Métricas de conexiones
+# -----------------------------
+_contadores = {'conexiones_abiertas': {}}
+_bloqueo = threading.Lock()
+
+
+def _conexion_creada(sender, connection, **kwargs):
+    with _bloqueo:
+        abiertas = _contadores['conexiones_abiertas']
+        abiertas[connection.alias] = abiertas.get(connection.alias, 0) + 1
+
+
+connection_created.connect(_conexion_creada, dispatch_uid='basedatos_conexion_creada')
+
+
+def estadisticas_conexiones():
+    """Estado de cada alias en este proceso: latencia de un SELECT 1 y, con el pool
+    nativo, la ocupación del pool; sin pool, cuántas conexiones físicas se abrieron
+    (con conexiones persistentes este número debería crecer muy poco)."""
+    resultado = {}
+    for alias in settings.DATABASES:
+        conexion = connections[alias]
+        datos = {
+            'conexiones_abiertas': _contadores['conexiones_abiertas'].get(alias, 0),
+            'conn_max_age': conexion.settings_dict.get('CONN_MAX_AGE'),
+        }
+        inicio = time.perf_counter()
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            datos['disponible'] = True
+            datos['latencia_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        except Exception as e:
+            datos['disponible'] = False
+            datos['error'] = str(e)
+
+        pool = getattr(conexion, 'pool', None)
+        if pool is not None:
+            estadisticas = pool.get_stats()
+            datos['pool'] = {
+                'minimo': estadisticas.get('pool_min'),
+                'maximo': estadisticas.get('pool_max'),
+                'abiertas': estadisticas.get('pool_size'),
+                'disponibles': estadisticas.get('pool_available'),
+                'en_espera': estadisticas.get('requests_waiting', 0),
+                'utilizacion': round(
+                    (estadisticas.get('pool_size', 0) - estadisticas.get('pool_available', 0))
+                    / estadisticas['pool_max'], 3
+                ) if estadisticas.get('pool_max') else None,
+            }
+        resultado[alias] = datos
+    return resultado
+
+
+@require_http_methods(["GET"])
+def salud_base_datos(request):
+    """Disponibilidad para balanceadores y monitores (sin autenticación); el detalle por
+    alias, con el pool y los errores de la base, solo para administradores."""
+    estadisticas = estadisticas_conexiones()
+    disponible = all(datos['disponible'] for datos in estadisticas.values())
+    estado = 200 if disponible else 503
+    try:
+        admin = es_admin(validar_token(request))
+    except DatabaseError:
+        # Con la base caída el rol no se puede verificar: solo la disponibilidad
+        admin = False
+    if not admin:
+        return JsonResponse({'disponible': disponible}, status=estado)
+    return JsonResponse({
+        'disponible': disponible,
+        'replica': replica_configurada(),
+        'bases_datos': estadisticas
+    }, status=estado)
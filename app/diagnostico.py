@@ -0,0 +1,230 @@
+# app/diagnostico.py
+"""Diagnóstico de consultas por petición: sospechas de N+1 y planes de consultas lentas.
+
+Una fracción DIAGNOSTICO_MUESTREO de las peticiones se diagnostica. En ellas el envoltorio
+de app.instrumentacion guarda cada consulta con su sitio de llamada. Al terminar:
+
+- las consultas se agrupan por SQL normalizado y cada grupo que se repite al menos
+  DIAGNOSTICO_REPETICIONES_N1 veces se informa como posible N+1 con su sitio de llamada;
+- las consultas SELECT que tardan más de DIAGNOSTICO_CONSULTA_LENTA_MS se repiten con
+  EXPLAIN (ANALYZE, BUFFERS) en una transacción de solo lectura que se revierte.
+
+Los informes con hallazgos se escriben en el logger "app.diagnostico" (una línea JSON) y se
+guardan en el cache compartido (app/settings.py), donde el endpoint de administración lee
+los últimos de todos los procesos. Las peticiones no
+muestreadas solo pagan un random().
+"""
+import json
+import logging
+import random
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from app.instrumentacion import medicion_actual, medicion_en_curso
+from usuarios.views import validar_token, es_admin
+
+logger = logging.getLogger('app.diagnostico')
+
+# Cada informe va en su propia clave, numerada con un contador atómico del cache
+CLAVE_CONTADOR_INFORMES = 'diagnostico:informes:contador'
+TIEMPO_CACHE_INFORME = 60 * 60 * 24 * 7
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+_LISTAS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+_BLOQUEOS = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+
+
+def normalizar_sql(sql):
+    """SQL sin literales ni parámetros y con las listas IN colapsadas, para agrupar."""
+    sql = _LITERALES.sub('?', sql)
+    sql = _LISTAS.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def _explicable(sql):
+    # Solo lecturas puras: EXPLAIN ANALYZE ejecuta la consulta otra vez
+    inicio = sql.lstrip()[:6].upper()
+    return inicio == 'SELECT' and not _BLOQUEOS.search(sql)
+
+
+def _explicar(consulta):
+    try:
+        with transaction.atomic(using=consulta.alias):
+            with connections[consulta.alias].cursor() as cursor:
+                cursor.execute("SET TRANSACTION READ ONLY")
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + consulta.sql, consulta.params)
+                plan = cursor.fetchone()[0]
+            transaction.set_rollback(True, using=consulta.alias)
+    except DatabaseError as e:
+        return {'error': str(e)}
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def analizar_consultas(consultas):
+    """Devuelve (sospechas de N+1, consultas lentas con su plan)."""
+    grupos = {}
+    for consulta in consultas:
+        clave = normalizar_sql(consulta.sql)
+        grupo = grupos.get(clave)
+        if grupo is None:
+            grupos[clave] = grupo = {'sql': clave, 'veces': 0, 'tiempo_ms': 0.0, 'sitios': {}}
+        grupo['veces'] += 1
+        grupo['tiempo_ms'] += consulta.duracion * 1000
+        grupo['sitios'][consulta.sitio] = grupo['sitios'].get(consulta.sitio, 0) + 1
+
+    sospechas = [
+        {
+            'sql': g['sql'],
+            'veces': g['veces'],
+            'tiempo_ms': round(g['tiempo_ms'], 2),
+            'sitios': [{'sitio': s, 'veces': v} for s, v in sorted(g['sitios'].items(), key=lambda x: -x[1])],
+        }
+        for g in sorted(grupos.values(), key=lambda g: -g['veces'])
+        if g['veces'] >= settings.DIAGNOSTICO_REPETICIONES_N1
+    ]
+
+    umbral = settings.DIAGNOSTICO_CONSULTA_LENTA_MS / 1000
+    lentas, explicadas = [], set()
+    for consulta in sorted(consultas, key=lambda c: -c.duracion):
+        if consulta.duracion < umbral:
+            break
+        clave = normalizar_sql(consulta.sql)
+        lenta = {'sql': consulta.sql, 'duracion_ms': round(consulta.duracion * 1000, 2), 'sitio': consulta.sitio}
+        # Un plan por forma de consulta y como máximo DIAGNOSTICO_MAX_EXPLAIN por petición
+        if clave not in explicadas and len(explicadas) < settings.DIAGNOSTICO_MAX_EXPLAIN and _explicable(consulta.sql):
+            explicadas.add(clave)
+            lenta['plan'] = _explicar(consulta)
+        lentas.append(lenta)
+
+    return sospechas, lentas
+
+
+def _clave_informe(numero):
+    return f"diagnostico:informe:{numero}"
+
+
+def _guardar_informe(informe):
+    logger.warning(json.dumps(informe, default=str, ensure_ascii=False))
+    # incr es atómico: los procesos que informan a la vez no se pisan
+    cache.add(CLAVE_CONTADOR_INFORMES, 0, timeout=None)
+    try:
+        numero = cache.incr(CLAVE_CONTADOR_INFORMES)
+    except ValueError:
+        # El contador se desalojó entre add e incr
+        cache.add(CLAVE_CONTADOR_INFORMES, 0, timeout=None)
+        numero = cache.incr(CLAVE_CONTADOR_INFORMES)
+    cache.set(_clave_informe(numero), informe, timeout=TIEMPO_CACHE_INFORME)
+
+
+def informes_guardados():
+    """Los últimos DIAGNOSTICO_INFORMES_GUARDADOS informes, del más reciente al más antiguo."""
+    ultimo = cache.get(CLAVE_CONTADOR_INFORMES) or 0
+    desde = max(ultimo - settings.DIAGNOSTICO_INFORMES_GUARDADOS, 0)
+    claves = [_clave_informe(numero) for numero in range(ultimo, desde, -1)]
+    encontrados = cache.get_many(claves)
+    return [encontrados[clave] for clave in claves if clave in encontrados]
+
+
+def _diagnosticar(request, response, medicion, consultas, duracion):
+    # Las consultas del propio diagnóstico (EXPLAIN) no cuentan para la petición
+    marca = medicion_actual.set(None)
+    try:
+        sospechas, lentas = analizar_consultas(consultas)
+    finally:
+        medicion_actual.reset(marca)
+    if not sospechas and not lentas:
+        return
+    coincidencia = getattr(request, 'resolver_match', None)
+    _guardar_informe({
+        'fecha': timezone.now().isoformat(),
+        'metodo': request.method,
+        'ruta': coincidencia.route if coincidencia else None,
+        'path': request.path,
+        'estado': response.status_code,
+        'duracion_ms': round(duracion * 1000, 2),
+        'consultas': medicion.consultas,
+        'tiempo_bd_ms': round(medicion.tiempo_bd * 1000, 2),
+        'sospechas_n1': sospechas,
+        'consultas_lentas': lentas,
+    })
+
+
+# -----------------------------
+# Middleware
+# -----------------------------
+class DiagnosticoConsultasMiddleware:
+    """Diagnostica una muestra de las peticiones; con DIAGNOSTICO_MUESTREO = 0 se desactiva."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DIAGNOSTICO_MUESTREO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _iniciar(self):
+        if random.random() >= settings.DIAGNOSTICO_MUESTREO:
+            return None, None
+        medicion, marca = medicion_en_curso()
+        medicion.detalle = []
+        return medicion, marca
+
+    def _terminar(self, medicion, marca):
+        consultas, medicion.detalle = medicion.detalle, None
+        if marca is not None:
+            medicion_actual.reset(marca)
+        return consultas
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        medicion, marca = self._iniciar()
+        if medicion is None:
+            return self.get_response(request)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            consultas = self._terminar(medicion, marca)
+        _diagnosticar(request, response, medicion, consultas, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        medicion, marca = self._iniciar()
+        if medicion is None:
+            return await self.get_response(request)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            consultas = self._terminar(medicion, marca)
+        await sync_to_async(_diagnosticar)(request, response, medicion, consultas, time.perf_counter() - inicio)
+        return response
+
+
+# -----------------------------
+# Endpoint de administración
+# -----------------------------
+@require_http_methods(["GET"])
+def informes_consultas(request):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+    if not es_admin(payload):
+        return JsonResponse({'error': 'Solo disponible para administradores'}, status=403)
+
+    return JsonResponse({'informes': informes_guardados()}, status=200)
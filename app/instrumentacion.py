@@ -0,0 +1,136 @@
+# app/instrumentacion.py
+"""Medición de las fases de una petición: autenticación, consultas a la base y serialización.
+
+Un único envoltorio de ejecución se instala en cada conexión física y acumula en la
+Medicion de la petición en curso (ContextVar); validar_token y JsonResponse suman sus
+tiempos a la misma medición. Lo usan las métricas, el diagnóstico de consultas y el
+encabezado Server-Timing; fuera de una petición medida solo se consulta la ContextVar.
+"""
+import functools
+import sys
+import time
+from contextvars import ContextVar
+
+from django import http
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Medición de la petición en curso (None fuera de una petición medida). sync_to_async
+# copia el contexto al hilo del ORM, así las consultas de las vistas async también cuentan.
+medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    __slots__ = ('consultas', 'tiempo_bd', 'tiempo_auth', 'tiempo_serializacion', 'detalle')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_auth = 0.0
+        self.tiempo_serializacion = 0.0
+        # Lista de ConsultaRegistrada solo cuando la petición se diagnostica
+        self.detalle = None
+
+
+class ConsultaRegistrada:
+    __slots__ = ('alias', 'sql', 'params', 'duracion', 'sitio')
+
+    def __init__(self, alias, sql, params, duracion, sitio):
+        self.alias = alias
+        self.sql = sql
+        self.params = params
+        self.duracion = duracion
+        self.sitio = sitio
+
+
+def medicion_en_curso():
+    """Medición de la petición en curso; crea una si ningún middleware lo hizo.
+
+    Devuelve (medicion, marca); la marca es None si la medición ya existía y, si no,
+    hay que pasarla a medicion_actual.reset() al terminar la petición.
+    """
+    medicion = medicion_actual.get()
+    if medicion is not None:
+        return medicion, None
+    medicion = Medicion()
+    return medicion, medicion_actual.set(medicion)
+
+
+# -----------------------------
+# Fases de autenticación y serialización
+# -----------------------------
+def medir_auth(funcion):
+    """Decorador que suma la duración de `funcion` al tiempo de autenticación."""
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        medicion = medicion_actual.get()
+        if medicion is None:
+            return funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            medicion.tiempo_auth += time.perf_counter() - inicio
+    return envoltorio
+
+
+class JsonResponse(http.JsonResponse):
+    """JsonResponse de Django que suma la codificación del cuerpo al tiempo de serialización."""
+
+    def __init__(self, *args, **kwargs):
+        medicion = medicion_actual.get()
+        if medicion is None:
+            super().__init__(*args, **kwargs)
+            return
+        inicio = time.perf_counter()
+        try:
+            super().__init__(*args, **kwargs)
+        finally:
+            medicion.tiempo_serializacion += time.perf_counter() - inicio
+
+
+# -----------------------------
+# Sitio de la llamada
+# -----------------------------
+_RAIZ = str(settings.BASE_DIR)
+
+
+def sitio_llamada():
+    """Primer marco del código del proyecto fuera de Django, desde quien ejecutó la consulta."""
+    marco = sys._getframe(2)
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(_RAIZ) and 'site-packages' not in archivo:
+            return f"{archivo[len(_RAIZ) + 1:]}:{marco.f_lineno} en {marco.f_code.co_name}"
+        marco = marco.f_back
+    return None
+
+
+# -----------------------------
+# Envoltorio de ejecución de consultas
+# -----------------------------
+def _envolver_consulta(execute, sql, params, many, context):
+    medicion = medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        medicion.tiempo_bd += duracion
+        medicion.consultas += 1
+        if medicion.detalle is not None:
+            medicion.detalle.append(ConsultaRegistrada(
+                context['connection'].alias, sql, None if many else params, duracion, sitio_llamada()
+            ))
+
+
+def _conexion_creada(sender, connection, **kwargs):
+    # Cada conexión física se envuelve una sola vez; con conexiones persistentes el
+    # envoltorio vive lo que vive la conexión
+    if _envolver_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _envolver_consulta)
+
+
+connection_created.connect(_conexion_creada, dispatch_uid='instrumentacion_conexion_creada')
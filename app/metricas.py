@@ -0,0 +1,173 @@
+# app/metricas.py
+"""Métricas por ruta (latencia, consultas a la base, tamaño y estado de la respuesta)
+expuestas en formato de texto de Prometheus en /metrics.
+
+Requiere prometheus_client; sin él el middleware se desactiva solo y /metrics responde 501.
+
+Con varios procesos (gunicorn -w N, uvicorn --workers N) cada uno guarda sus valores en
+archivos mmap y /metrics los agrega. Para activarlo, antes de arrancar el servidor:
+
+    export PROMETHEUS_MULTIPROC_DIR=/tmp/metricas   # directorio vacío y escribible
+
+y en la configuración de gunicorn, para descartar los gauges de los workers que mueren:
+
+    from app.metricas import proceso_terminado as child_exit
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from app.instrumentacion import medicion_en_curso, medicion_actual
+
+SIN_RUTA = '<sin_ruta>'
+
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+# -----------------------------
+# Registro de métricas
+# -----------------------------
+_metricas = None
+
+
+def _crear_metricas():
+    from prometheus_client import Counter, Histogram
+
+    return {
+        'duracion': Histogram(
+            'http_peticion_duracion_segundos', 'Duración de la petición por ruta',
+            ['ruta', 'metodo']
+        ),
+        'peticiones': Counter(
+            'http_peticiones', 'Peticiones atendidas por ruta y estado',
+            ['ruta', 'metodo', 'estado']
+        ),
+        'bytes': Histogram(
+            'http_respuesta_bytes', 'Tamaño del cuerpo de la respuesta',
+            ['ruta', 'metodo'], buckets=BUCKETS_BYTES
+        ),
+        'consultas': Histogram(
+            'bd_consultas_por_peticion', 'Consultas a la base de datos por petición',
+            ['ruta', 'metodo'], buckets=BUCKETS_CONSULTAS
+        ),
+        'tiempo_bd': Histogram(
+            'bd_tiempo_por_peticion_segundos', 'Tiempo en consultas a la base de datos por petición',
+            ['ruta', 'metodo']
+        ),
+    }
+
+
+def metricas():
+    """Métricas del proceso; None si prometheus_client no está instalado."""
+    global _metricas
+    if _metricas is None:
+        try:
+            _metricas = _crear_metricas()
+        except ImportError:
+            return None
+    return _metricas
+
+
+def _ruta(request):
+    # El patrón de la URL y no la ruta real, para que la cardinalidad no crezca con los ids
+    coincidencia = getattr(request, 'resolver_match', None)
+    return coincidencia.route if coincidencia and coincidencia.route else SIN_RUTA
+
+
+def _tamano(response):
+    if response.has_header('Content-Length'):
+        return int(response['Content-Length'])
+    if not response.streaming:
+        return len(response.content)
+    return None
+
+
+def _registrar(request, response, medicion, duracion):
+    m = _metricas
+    ruta, metodo = _ruta(request), request.method
+    m['duracion'].labels(ruta, metodo).observe(duracion)
+    m['peticiones'].labels(ruta, metodo, str(response.status_code)).inc()
+    m['consultas'].labels(ruta, metodo).observe(medicion.consultas)
+    m['tiempo_bd'].labels(ruta, metodo).observe(medicion.tiempo_bd)
+    tamano = _tamano(response)
+    if tamano is not None:
+        m['bytes'].labels(ruta, metodo).observe(tamano)
+
+
+# -----------------------------
+# Middleware
+# -----------------------------
+class MetricasMiddleware:
+    """Mide cada petición; debe ir primero en MIDDLEWARE para incluir a los demás."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_HABILITADAS', True) or metricas() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        medicion, marca = medicion_en_curso()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if marca is not None:
+                medicion_actual.reset(marca)
+        _registrar(request, response, medicion, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        medicion, marca = medicion_en_curso()
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if marca is not None:
+                medicion_actual.reset(marca)
+        _registrar(request, response, medicion, time.perf_counter() - inicio)
+        return response
+
+
+# -----------------------------
+# Exposición
+# -----------------------------
+def proceso_terminado(server, worker):
+    """Hook child_exit de gunicorn para el modo multiproceso."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+@require_http_methods(["GET"])
+def exponer_metricas(request):
+    try:
+        from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+    except ImportError:
+        return JsonResponse({'error': 'Las métricas requieren prometheus_client'}, status=501)
+
+    # Opcional: exigir "Authorization: Bearer <METRICAS_TOKEN>" al recolector
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return HttpResponse(generate_latest(registro), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,295 @@
+# app/perfilado.py
+"""Perfilado bajo demanda de una petición para administradores.
+
+Con PERFILADO_HABILITADO, un administrador agrega ?__profile=1 a cualquier petición de
+/app/ y recibe, en lugar del cuerpo normal, el perfil de esa petición:
+
+- ?__formato=colapsado (por defecto): pilas colapsadas ("a;b;c muestras") de un muestreador
+  de la biblioteca estándar, listas para flamegraph.pl, speedscope o inferno.
+- ?__formato=html: flamegraph interactivo de pyinstrument (501 si no está instalado).
+
+Bajo ASGI se perfila el hilo de sync_to_async de la petición (uno por petición): ahí corren
+las vistas síncronas enteras y las consultas del ORM de las asíncronas; en el hilo del bucle
+de eventos el perfil mostraría sobre todo la espera en select.
+
+Con ?__guardar=1 y PERFILADO_DIRECTORIO configurado el perfil además se guarda y se puede
+descargar después desde /app/perfiles/. Deshabilitado, el middleware se retira solo y los
+endpoints responden 404.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from app.instrumentacion import JsonResponse
+from usuarios.views import validar_token, es_admin
+
+PREFIJO = '/app/'
+FORMATOS_PERFIL = {'colapsado': ('txt', 'text/plain; charset=utf-8'), 'html': ('html', 'text/html; charset=utf-8')}
+
+_ID_PERFIL = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{12}$')
+_RAIZ = str(settings.BASE_DIR) + os.sep
+
+
+class PerfiladorNoDisponible(Exception):
+    pass
+
+
+# -----------------------------
+# Muestreador (biblioteca estándar)
+# -----------------------------
+def _nombre_marco(codigo):
+    archivo = codigo.co_filename
+    if archivo.startswith(_RAIZ):
+        archivo = archivo[len(_RAIZ):]
+    elif 'site-packages' in archivo:
+        archivo = archivo.split('site-packages' + os.sep, 1)[1]
+    return f"{codigo.co_name} ({archivo}:{codigo.co_firstlineno})"
+
+
+class Muestreador(threading.Thread):
+    """Toma la pila del hilo `hilo` cada `intervalo` segundos y cuenta las pilas iguales."""
+
+    def __init__(self, hilo, intervalo):
+        super().__init__(name='perfilado', daemon=True)
+        self.hilo = hilo
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            pila = []
+            while marco is not None:
+                pila.append(_nombre_marco(marco.f_code))
+                marco = marco.f_back
+            if pila:
+                self.pilas[';'.join(reversed(pila))] += 1
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+    def colapsadas(self):
+        return ''.join(f"{pila} {muestras}\n" for pila, muestras in self.pilas.most_common())
+
+
+class _PerfilColapsado:
+    def __init__(self):
+        self.muestreador = Muestreador(threading.get_ident(), settings.PERFILADO_INTERVALO_MS / 1000)
+
+    def iniciar(self):
+        self.muestreador.start()
+
+    def detener(self):
+        self.muestreador.detener()
+
+    def reporte(self):
+        return self.muestreador.colapsadas()
+
+
+class _PerfilHtml:
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise PerfiladorNoDisponible('El perfil HTML requiere pyinstrument')
+        self.perfil = Profiler(interval=settings.PERFILADO_INTERVALO_MS / 1000)
+
+    def iniciar(self):
+        self.perfil.start()
+
+    def detener(self):
+        self.perfil.stop()
+
+    def reporte(self):
+        return self.perfil.output_html()
+
+
+PERFILADORES = {'colapsado': _PerfilColapsado, 'html': _PerfilHtml}
+
+
+# -----------------------------
+# Almacenamiento
+# -----------------------------
+def _ruta_perfil(perfil_id, extension):
+    return os.path.join(settings.PERFILADO_DIRECTORIO, f"{perfil_id}.{extension}")
+
+
+def guardar_perfil(reporte, formato):
+    os.makedirs(settings.PERFILADO_DIRECTORIO, exist_ok=True)
+    perfil_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:12]}"
+    with open(_ruta_perfil(perfil_id, FORMATOS_PERFIL[formato][0]), 'w', encoding='utf-8') as archivo:
+        archivo.write(reporte)
+    return perfil_id
+
+
+def _buscar_perfil(perfil_id):
+    if not _ID_PERFIL.match(perfil_id):
+        return None, None
+    for formato, (extension, _) in FORMATOS_PERFIL.items():
+        ruta = _ruta_perfil(perfil_id, extension)
+        if os.path.exists(ruta):
+            return ruta, formato
+    return None, None
+
+
+# -----------------------------
+# Middleware
+# -----------------------------
+def _pide_perfil(request):
+    """Sin consultas: el resto de las peticiones no paga la verificación del administrador."""
+    return request.path.startswith(PREFIJO) and request.GET.get('__profile') == '1'
+
+
+def _solicitud(request):
+    """Formato pedido si la petición viene de un administrador, si no None."""
+    if not es_admin(validar_token(request)):
+        return None
+    return request.GET.get('__formato', 'colapsado')
+
+
+def _respuesta_perfil(request, response, perfil, formato, duracion):
+    reporte = perfil.reporte()
+    resultado = HttpResponse(reporte, content_type=FORMATOS_PERFIL[formato][1])
+    resultado['X-Perfil-Estado-Original'] = str(response.status_code)
+    resultado['X-Perfil-Duracion-Ms'] = f"{duracion * 1000:.2f}"
+    if request.GET.get('__guardar') == '1' and settings.PERFILADO_DIRECTORIO:
+        resultado['X-Perfil-Id'] = guardar_perfil(reporte, formato)
+    return resultado
+
+
+def _formato_invalido():
+    return JsonResponse({'error': f"El formato debe ser uno de: {', '.join(FORMATOS_PERFIL)}"}, status=400)
+
+
+class PerfiladoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFILADO_HABILITADO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not _pide_perfil(request):
+            return self.get_response(request)
+        formato = _solicitud(request)
+        if formato is None:
+            return self.get_response(request)
+        if formato not in PERFILADORES:
+            return _formato_invalido()
+        try:
+            perfil = PERFILADORES[formato]()
+        except PerfiladorNoDisponible as e:
+            return JsonResponse({'error': str(e)}, status=501)
+
+        inicio = time.perf_counter()
+        perfil.iniciar()
+        try:
+            response = self.get_response(request)
+            # El cuerpo de las respuestas en streaming se genera al recorrerlo
+            if response.streaming:
+                for _ in response:
+                    pass
+            response.close()
+        finally:
+            perfil.detener()
+        return _respuesta_perfil(request, response, perfil, formato, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        if not _pide_perfil(request):
+            return await self.get_response(request)
+        formato = await sync_to_async(_solicitud)(request)
+        if formato is None:
+            return await self.get_response(request)
+        if formato not in PERFILADORES:
+            return _formato_invalido()
+        # Creado, iniciado y detenido en el hilo de sync_to_async de la petición (el mismo
+        # para todas las llamadas de esta petición), que es el que se muestrea
+        try:
+            perfil = await sync_to_async(PERFILADORES[formato])()
+        except PerfiladorNoDisponible as e:
+            return JsonResponse({'error': str(e)}, status=501)
+
+        inicio = time.perf_counter()
+        await sync_to_async(perfil.iniciar)()
+        try:
+            response = await self.get_response(request)
+            if response.streaming:
+                if response.is_async:
+                    async for _ in response.streaming_content:
+                        pass
+                else:
+                    for _ in response.streaming_content:
+                        pass
+            response.close()
+        finally:
+            await sync_to_async(perfil.detener)()
+        return _respuesta_perfil(request, response, perfil, formato, time.perf_counter() - inicio)
+
+
+# -----------------------------
+# Perfiles guardados
+# -----------------------------
+def _verificar_admin(request):
+    if not settings.PERFILADO_HABILITADO or not settings.PERFILADO_DIRECTORIO:
+        return JsonResponse({'error': 'Perfilado no habilitado'}, status=404)
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+    if not es_admin(payload):
+        return JsonResponse({'error': 'Solo disponible para administradores'}, status=403)
+    return None
+
+
+@require_http_methods(["GET"])
+def listar_perfiles(request):
+    error = _verificar_admin(request)
+    if error:
+        return error
+
+    perfiles = []
+    if os.path.isdir(settings.PERFILADO_DIRECTORIO):
+        for nombre in sorted(os.listdir(settings.PERFILADO_DIRECTORIO), reverse=True):
+            perfil_id, _, extension = nombre.rpartition('.')
+            if not _ID_PERFIL.match(perfil_id):
+                continue
+            perfiles.append({
+                'id': perfil_id,
+                'formato': 'html' if extension == 'html' else 'colapsado',
+                'tamano': os.path.getsize(os.path.join(settings.PERFILADO_DIRECTORIO, nombre)),
+            })
+    return JsonResponse({'perfiles': perfiles}, status=200)
+
+
+@require_http_methods(["GET"])
+def descargar_perfil(request, perfil_id):
+    error = _verificar_admin(request)
+    if error:
+        return error
+
+    ruta, formato = _buscar_perfil(perfil_id)
+    if not ruta:
+        return JsonResponse({'error': 'Perfil no encontrado'}, status=404)
+    return FileResponse(
+        open(ruta, 'rb'), as_attachment=True, filename=os.path.basename(ruta),
+        content_type=FORMATOS_PERFIL[formato][1]
+    )
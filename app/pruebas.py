@@ -0,0 +1,221 @@
+# app/pruebas.py
+"""Soporte para las pruebas: ejecutor con base de pruebas desde plantilla y planes de consulta.
+
+EjecutorPruebas (TEST_RUNNER) construye el esquema una sola vez: migrate (bd.sql más los
+índices) sobre una base plantilla que se reconstruye solo cuando cambian bd.sql, alguna
+migración o la versión de Django. La base de pruebas se crea con CREATE DATABASE ...
+TEMPLATE y, con --parallel N, Django clona de ella una base por proceso de la misma forma.
+
+PruebaApi genera dos proyectos pequeños del admin de bd.sql y llama a los endpoints con el
+cliente de pruebas y un token JWT válido.
+
+PruebaPlanes genera datos sintéticos repartidos en varios proyectos (para que filtrar por
+uno sea selectivo, como en producción), actualiza las estadísticas y ofrece
+assertSinSeqScan, que ejecuta EXPLAIN sobre un QuerySet o SQL y falla si el plan recorre
+secuencialmente alguna de las tablas grandes.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import django
+import jwt
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.test.runner import DiscoverRunner
+
+from proyectos.sinteticos import GeneradorProyectos, analizar_tablas, copiar, generar_usuarios, reservar_ids, _linea
+
+# Tablas que crecen con los datos; en los catálogos un recorrido secuencial es lo esperable
+TABLAS_GRANDES = {
+    'usuarios', 'proyectos', 'requisitos', 'casos_uso', 'historias_usuario', 'relaciones_requisitos',
+    'relaciones_casos_uso', 'casos_uso_clausura', 'historias_estimaciones', 'casos_uso_requisitos',
+    'historias_requisitos',
+}
+
+
+# -----------------------------
+# Base de pruebas desde plantilla
+# -----------------------------
+def huella_esquema():
+    """Resumen de todo lo que define el esquema: si cambia, la plantilla se reconstruye."""
+    huella = hashlib.sha256(django.get_version().encode())
+    archivos = [settings.BASE_DIR / 'bd.sql', *sorted(settings.BASE_DIR.glob('*/migrations/*.py'))]
+    for archivo in archivos:
+        huella.update(str(archivo.relative_to(settings.BASE_DIR)).encode())
+        huella.update(archivo.read_bytes())
+    return huella.hexdigest()[:16]
+
+
+def preparar_plantilla(conexion, verbosidad=1):
+    """Devuelve el nombre de la plantilla de `conexion`, creándola si falta o está vieja."""
+    plantilla = f"{conexion.creation._get_test_db_name()}_plantilla"
+    huella = huella_esquema()
+    nombre_sql = conexion.ops.quote_name(plantilla)
+
+    with conexion._nodb_cursor() as cursor:
+        # Dos corridas simultáneas no deben construir la misma plantilla a la vez
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [plantilla])
+        try:
+            cursor.execute(
+                "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s", [plantilla]
+            )
+            fila = cursor.fetchone()
+            if fila and fila[0] == huella:
+                return plantilla
+
+            if verbosidad >= 1:
+                print(f"Construyendo la plantilla de pruebas {plantilla} (esquema {huella})...")
+            cursor.execute(f"DROP DATABASE IF EXISTS {nombre_sql}")
+            cursor.execute(f"CREATE DATABASE {nombre_sql}")
+
+            nombre_original = conexion.settings_dict['NAME']
+            conexion.close()
+            conexion.settings_dict['NAME'] = plantilla
+            try:
+                call_command('migrate', database=conexion.alias, interactive=False,
+                             run_syncdb=True, verbosity=max(verbosidad - 1, 0))
+            finally:
+                # CREATE DATABASE ... TEMPLATE exige que nadie esté conectado a la plantilla
+                conexion.close()
+                conexion.settings_dict['NAME'] = nombre_original
+
+            cursor.execute(f"COMMENT ON DATABASE {nombre_sql} IS %s", [huella])
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [plantilla])
+    return plantilla
+
+
+class EjecutorPruebas(DiscoverRunner):
+    """DiscoverRunner que crea la base de pruebas (y sus clones en paralelo) desde la plantilla.
+
+    El cache es siempre el de memoria local: los ids de la base de pruebas se repiten entre
+    corridas y no deben encontrar lo que dejó otra en un Redis compartido.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_local = override_settings(CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'pruebas-{alias}'}
+            for alias in settings.CACHES
+        })
+        self._cache_local.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_local.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        # Solo las bases que usan las pruebas seleccionadas (ninguna si son todas SimpleTestCase)
+        for alias in kwargs.get('aliases', connections):
+            conexion = connections[alias]
+            if conexion.vendor == 'postgresql' and not conexion.settings_dict['TEST'].get('MIRROR'):
+                conexion.settings_dict['TEST']['TEMPLATE'] = preparar_plantilla(conexion, self.verbosity)
+        # Con la plantilla ya migrada, el migrate de Django sobre la base de pruebas no aplica nada
+        return super().setup_databases(**kwargs)
+
+
+# -----------------------------
+# Endpoints
+# -----------------------------
+class PruebaApi(TestCase):
+    """Dos proyectos sintéticos sin vínculos de trazabilidad y un token del admin."""
+    USUARIO_ADMIN = 1
+    ARTEFACTOS = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            generador = GeneradorProyectos(cursor, densidad_vinculos=0)
+            cls.proyecto, cls.otro_proyecto = [
+                generador.proyecto(cls.USUARIO_ADMIN, cls.ARTEFACTOS, indice=i) for i in range(2)
+            ]
+        for resumen in (cls.proyecto, cls.otro_proyecto):
+            resumen['ids'] = {
+                tipo: list(range(primero, primero + resumen['artefactos'][tipo]))
+                for tipo, primero in resumen['primeros_ids'].items()
+            }
+
+        ahora = datetime.utcnow()
+        cls.token = jwt.encode(
+            {'usuario_id': cls.USUARIO_ADMIN, 'usuario': 'admin', 'rol': 'admin',
+             'exp': ahora + timedelta(hours=1), 'iat': ahora},
+            settings.SECRET_KEY, algorithm='HS256'
+        )
+
+    def post_json(self, ruta, datos):
+        return self.client.post(
+            ruta, json.dumps(datos), content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+
+
+# -----------------------------
+# Planes de consulta
+# -----------------------------
+def plan_consulta(consulta, params=None):
+    """Plan (EXPLAIN en JSON) de un QuerySet o de una consulta SQL con sus parámetros."""
+    if hasattr(consulta, 'query'):
+        consulta, params = consulta.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {consulta}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def nodos_plan(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', ()):
+        yield from nodos_plan(hijo)
+
+
+def _proyectos_vacios(cursor, usuarios, cantidad):
+    primero = reservar_ids(cursor, 'proyectos', cantidad)
+    copiar(cursor, 'proyectos', ('id', 'nombre', 'usuario_id'), (
+        _linea(primero + i, f"Proyecto vacío {i}", usuarios[i % len(usuarios)]) for i in range(cantidad)
+    ))
+
+
+class PruebaPlanes(TestCase):
+    PROYECTOS = 20
+    ARTEFACTOS = 1500
+    PROYECTOS_VACIOS = 5000
+    USUARIOS = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            usuarios = generar_usuarios(cursor, cls.USUARIOS, 'sin-contrasenia')
+            generador = GeneradorProyectos(cursor)
+            resumenes = [
+                generador.proyecto(usuarios[i % len(usuarios)], cls.ARTEFACTOS, indice=i)
+                for i in range(cls.PROYECTOS)
+            ]
+            _proyectos_vacios(cursor, usuarios, cls.PROYECTOS_VACIOS)
+            analizar_tablas(cursor)
+
+        # Un proyecto del medio y su artefacto del medio (tiene relaciones en ambos sentidos)
+        resumen = resumenes[len(resumenes) // 2]
+        cls.usuario_id = usuarios[len(resumenes) // 2]
+        cls.proyecto_id = resumen['proyecto_id']
+        cls.ids = {
+            tipo: list(range(primero, primero + resumen['artefactos'][tipo]))
+            for tipo, primero in resumen['primeros_ids'].items()
+        }
+        cls.requisito_id = cls.ids['requisito'][len(cls.ids['requisito']) // 2]
+        cls.caso_uso_id = cls.ids['caso_uso'][len(cls.ids['caso_uso']) // 2]
+        cls.historia_id = cls.ids['historia_usuario'][len(cls.ids['historia_usuario']) // 2]
+
+    def assertSinSeqScan(self, consulta, params=None, tablas=TABLAS_GRANDES):
+        plan = plan_consulta(consulta, params)
+        secuenciales = sorted({
+            nodo['Relation Name'] for nodo in nodos_plan(plan)
+            if nodo['Node Type'] == 'Seq Scan' and nodo.get('Relation Name') in tablas
+        })
+        self.assertFalse(
+            secuenciales,
+            f"Recorrido secuencial sobre {', '.join(secuenciales)}:\n{json.dumps(plan, indent=2)}"
+        )
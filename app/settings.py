@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.metricas.MetricasMiddleware',
+    'app.diagnostico.DiagnosticoConsultasMiddleware',
+    'app.tiempos.ServerTimingMiddleware',
+    'app.perfilado.PerfiladoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'app.basedatos.ReplicaLecturaMiddleware',
 ]
 
 # Configuración de CORS
@@ -106,14 +112,128 @@ WSGI_APPLICATION = 'app.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'db_tddmachine',
-        'USER': 'postgres',
-        'PASSWORD': '12345',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('BD_NAME', 'db_tddmachine'),
+        'USER': os.environ.get('BD_USER', 'postgres'),
+        'PASSWORD': os.environ.get('BD_PASSWORD', '12345'),
+        'HOST': os.environ.get('BD_HOST', 'localhost'),
+        'PORT': os.environ.get('BD_PORT', '5432'),
+        # Conexiones persistentes: se reutilizan entre peticiones y se verifican antes de
+        # reutilizarlas. Solo con WSGI: app/asgi.py las desactiva (ver más abajo)
+        'CONN_MAX_AGE': int(os.environ.get('BD_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Réplica de solo lectura (opcional). Para probarla en local basta con una segunda base:
+#   BD_REPLICA_HOST=localhost BD_REPLICA_NAME=db_tddmachine_replica python manage.py runserver
+if os.environ.get('BD_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('BD_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('BD_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('BD_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.environ['BD_REPLICA_HOST'],
+        'PORT': os.environ.get('BD_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Pool de conexiones nativo de Django (BD_POOL=1). Requiere psycopg 3 y psycopg_pool
+# y reemplaza a las conexiones persistentes; cada conexión se verifica al salir del pool.
+if os.environ.get('BD_POOL') == '1':
+    from psycopg_pool import ConnectionPool
+
+    for _bd in DATABASES.values():
+        _bd['CONN_MAX_AGE'] = 0
+        _bd['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('BD_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('BD_POOL_MAX', 10)),
+                'timeout': 10,
+                'check': ConnectionPool.check_connection,
+            }
+        }
+
+# Servido por app/asgi.py, cada petición hace sus consultas en un hilo distinto y una conexión
+# persistente queda atada al hilo que la abrió, sin volver a usarse: bajo ASGI se cierran al
+# terminar cada petición. Para reutilizarlas, BD_POOL=1 (el pool es del proceso) o pgbouncer.
+if os.environ.get('SERVIDOR_ASGI') == '1':
+    for _bd in DATABASES.values():
+        _bd['CONN_MAX_AGE'] = 0
+
+# Las lecturas del ORM en peticiones GET van a la réplica si está configurada; tras una
+# escritura, el mismo usuario lee del primario durante REPLICA_VENTANA_ESCRITURA segundos.
+REPLICA_ALIAS = 'replica'
+REPLICA_VENTANA_ESCRITURA = 5
+DATABASE_ROUTERS = ['app.basedatos.EnrutadorReplica']
+
+# Cache compartido por todos los procesos del servidor: guarda el grafo de requisitos, los
+# fragmentos de la especificación, la marca de escritura reciente de la réplica y los
+# informes de diagnóstico, así que con un cache por proceso cada worker vería y descartaría
+# solo lo suyo. Con varios procesos CACHE_URL debe apuntar a Redis (conviene
+# maxmemory-policy allkeys-lru: todo lo guardado se puede recalcular). Sin CACHE_URL se usa
+# la memoria del proceso, que solo sirve con un único proceso (runserver); las pruebas
+# siempre usan memoria local (app/pruebas.py).
+#
+# Los fragmentos renderizados de la especificación (proyectos/especificacion.py) van en un
+# alias aparte: son uno por artefacto y formato, decenas de miles en un proyecto grande.
+# CACHE_FRAGMENTOS_URL permite llevarlos a otro Redis; por omisión usan el de CACHE_URL.
+CACHE_URL = os.environ.get('CACHE_URL')
+if not CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'fragmentos': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fragmentos',
+            'OPTIONS': {'MAX_ENTRIES': 200000},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            # Bases distintas en el mismo Redis no comparten claves (ids de proyecto, etc.)
+            'KEY_PREFIX': DATABASES['default']['NAME'],
+        },
+        'fragmentos': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_FRAGMENTOS_URL', CACHE_URL),
+            'KEY_PREFIX': DATABASES['default']['NAME'],
+        },
+    }
+
+# Las pruebas crean su base (y un clon por proceso con --parallel) desde una plantilla con
+# el esquema ya migrado, que se reconstruye solo si cambia el esquema (app/pruebas.py)
+TEST_RUNNER = 'app.pruebas.EjecutorPruebas'
+
+# Métricas por ruta en /metrics (formato Prometheus). Con METRICAS_TOKEN el recolector
+# debe enviar "Authorization: Bearer <token>"; con varios procesos ver app/metricas.py.
+METRICAS_HABILITADAS = os.environ.get('METRICAS', '1') == '1'
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+# Diagnóstico de consultas (app/diagnostico.py): fracción de peticiones muestreadas
+# (0 lo desactiva, 1 diagnostica todas), repeticiones de una misma consulta a partir de
+# las que se sospecha un N+1 y duración a partir de la que se captura el plan.
+DIAGNOSTICO_MUESTREO = float(os.environ.get('DIAGNOSTICO_MUESTREO', 0))
+DIAGNOSTICO_REPETICIONES_N1 = 5
+DIAGNOSTICO_CONSULTA_LENTA_MS = 200
+DIAGNOSTICO_MAX_EXPLAIN = 3
+DIAGNOSTICO_INFORMES_GUARDADOS = 200
+
+# Encabezado Server-Timing (auth, db, serialize, total): en todas las respuestas con
+# SERVER_TIMING=1; si no, solo para administradores que agregan ?__timing=1.
+SERVER_TIMING_TODAS = os.environ.get('SERVER_TIMING') == '1'
+
+# Perfilado bajo demanda (app/perfilado.py): con PERFILADO=1 los administradores pueden
+# agregar ?__profile=1 a una petición de /app/; con PERFILADO_DIRECTORIO los perfiles
+# pedidos con ?__guardar=1 se guardan para descargarlos desde /app/perfiles/.
+PERFILADO_HABILITADO = os.environ.get('PERFILADO') == '1'
+PERFILADO_INTERVALO_MS = 2
+PERFILADO_DIRECTORIO = os.environ.get('PERFILADO_DIRECTORIO')
+
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -124,6 +244,14 @@ REST_FRAMEWORK = {
 # CORS (para permitir peticiones desde frontend)
 CORS_ALLOW_ALL_ORIGINS = True  # Solo para desarrollo
 
+# Rechazar al guardar requisitos las relaciones depende/bloquea que formen un ciclo.
+# Cada petición puede activarlo o desactivarlo con el campo booleano "validar_ciclos".
+VALIDAR_CICLOS_REQUISITOS = False
+
+# Cada cuántas revisiones de un artefacto se guarda una revisión completa;
+# reconstruir cualquier revisión aplica como máximo este número menos uno de deltas.
+REVISIONES_INTERVALO_COMPLETA = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,92 @@
+# app/tiempos.py
+"""Encabezado Server-Timing con el desglose de la petición: auth, db, serialize y total.
+
+Se agrega a todas las respuestas con SERVER_TIMING_TODAS o, si no, a las peticiones de
+administradores que lo piden con ?__timing=1. Las herramientas de desarrollo del
+navegador lo muestran en la pestaña de tiempos de la petición.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from app.instrumentacion import medicion_actual, medicion_en_curso
+from usuarios.views import validar_token, es_admin
+
+PARAMETRO = '__timing'
+
+
+def _solicitado(request):
+    return settings.SERVER_TIMING_TODAS or request.GET.get(PARAMETRO) == '1'
+
+
+def _permitido(request):
+    return settings.SERVER_TIMING_TODAS or es_admin(validar_token(request))
+
+
+def valor_server_timing(medicion, total):
+    fases = [
+        ('auth', medicion.tiempo_auth, None),
+        ('db', medicion.tiempo_bd, f'{medicion.consultas} consultas'),
+        ('serialize', medicion.tiempo_serializacion, None),
+        ('total', total, None),
+    ]
+    return ', '.join(
+        f'{nombre};dur={segundos * 1000:.2f}' + (f';desc="{descripcion}"' if descripcion else '')
+        for nombre, segundos, descripcion in fases
+    )
+
+
+def _agregar(request, response, valor):
+    response['Server-Timing'] = valor
+    # Sin Timing-Allow-Origin el navegador oculta los tiempos a un frontend de otro origen
+    origen = request.headers.get('Origin')
+    if origen:
+        response['Timing-Allow-Origin'] = origen
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _solicitado(request):
+            return self.get_response(request)
+
+        medicion, marca = medicion_en_curso()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if marca is not None:
+                medicion_actual.reset(marca)
+        valor = valor_server_timing(medicion, time.perf_counter() - inicio)
+
+        # La verificación del rol ocurre fuera de la medición
+        if _permitido(request):
+            _agregar(request, response, valor)
+        return response
+
+    async def __acall__(self, request):
+        if not _solicitado(request):
+            return await self.get_response(request)
+
+        medicion, marca = medicion_en_curso()
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if marca is not None:
+                medicion_actual.reset(marca)
+        valor = valor_server_timing(medicion, time.perf_counter() - inicio)
+
+        if await sync_to_async(_permitido)(request):
+            _agregar(request, response, valor)
+        return response
@@ -16,6 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from app.basedatos import salud_base_datos
+from app.metricas import exponer_metricas
+from app.diagnostico import informes_consultas
+from app.perfilado import listar_perfiles, descargar_perfil
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,4 +29,9 @@ urlpatterns = [
     path('app/casosdeuso/', include('casosdeuso.urls')),
     path('app/historiasdeusuario/', include('historiasdeusuario.urls')),
     path('app/catalogos/', include('catalogos.urls')),
+    path('app/salud/bd/', salud_base_datos, name='salud_base_datos'),
+    path('app/diagnostico/consultas/', informes_consultas, name='informes_consultas'),
+    path('app/perfiles/', listar_perfiles, name='listar_perfiles'),
+    path('app/perfiles/<str:perfil_id>/', descargar_perfil, name='descargar_perfil'),
+    path('metrics', exponer_metricas, name='metricas'),
 ]
@@ -1,3 +1,7 @@
+-- Esquema para instalaciones nuevas (lo carga la migración proyectos 0001). Toda tabla o
+-- índice que se agregue aquí necesita también su migración con IF NOT EXISTS, para que
+-- python manage.py migrate actualice las bases que ya existen.
+
 -- Tabla de roles
 CREATE TABLE roles (
     id SERIAL PRIMARY KEY,
@@ -86,18 +90,6 @@ CREATE TABLE tipos_estimacion (
     activo BOOLEAN DEFAULT TRUE
 );
 
--- Tabla relación entre historia de usuario y estimaciones
-CREATE TABLE historias_estimaciones (
-    id SERIAL PRIMARY KEY,
-    historia_id INTEGER NOT NULL REFERENCES historias_usuario(id) ON DELETE CASCADE,
-    tipo_estimacion_id INTEGER NOT NULL REFERENCES tipos_estimacion(id),
-    valor NUMERIC(10,2) NOT NULL, -- puede ser puntos, horas, días o costo en $
-    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    activo BOOLEAN DEFAULT TRUE,
-    UNIQUE(historia_id, tipo_estimacion_id) -- Evita duplicados para un mismo tipo en una historia
-);
-
 -- Tabla de proyectos
 CREATE TABLE proyectos (
     id SERIAL PRIMARY KEY,
@@ -151,6 +143,18 @@ CREATE TABLE historias_usuario (
     activo BOOLEAN DEFAULT TRUE
 );
 
+-- Tabla relación entre historia de usuario y estimaciones
+CREATE TABLE historias_estimaciones (
+    id SERIAL PRIMARY KEY,
+    historia_id INTEGER NOT NULL REFERENCES historias_usuario(id) ON DELETE CASCADE,
+    tipo_estimacion_id INTEGER NOT NULL REFERENCES tipos_estimacion(id),
+    valor NUMERIC(10,2) NOT NULL, -- puede ser puntos, horas, días o costo en $
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    activo BOOLEAN DEFAULT TRUE,
+    UNIQUE(historia_id, tipo_estimacion_id) -- Evita duplicados para un mismo tipo en una historia
+);
+
 -- Tabla de requisitos
 CREATE TABLE requisitos (
     id SERIAL PRIMARY KEY,
@@ -180,6 +184,18 @@ CREATE TABLE relaciones_casos_uso (
     CONSTRAINT check_different_cu CHECK (caso_uso_origen_id != caso_uso_destino_id)
 );
 
+-- Clausura transitiva de las jerarquías include/extend/generalizacion entre casos de uso
+-- (mantenida por la aplicación al crear, actualizar o eliminar casos de uso)
+CREATE TABLE casos_uso_clausura (
+    id SERIAL PRIMARY KEY,
+    ancestro_id INTEGER NOT NULL REFERENCES casos_uso(id),
+    descendiente_id INTEGER NOT NULL REFERENCES casos_uso(id),
+    tipo_relacion_id INTEGER NOT NULL REFERENCES tipos_relacion_cu(id),
+    profundidad INTEGER NOT NULL CHECK (profundidad > 0),
+    UNIQUE(ancestro_id, descendiente_id, tipo_relacion_id)
+);
+CREATE INDEX idx_casos_uso_clausura_descendiente ON casos_uso_clausura (descendiente_id, tipo_relacion_id);
+
 -- Tabla de relaciones entre requisitos
 CREATE TABLE relaciones_requisitos (
     id SERIAL PRIMARY KEY,
@@ -192,6 +208,10 @@ CREATE TABLE relaciones_requisitos (
     CONSTRAINT check_different_requisitos CHECK (requisito_origen_id != requisito_destino_id)
 );
 
+-- Índices para recorrer relaciones en ambos sentidos (análisis de impacto)
+CREATE INDEX idx_relaciones_requisitos_origen ON relaciones_requisitos (requisito_origen_id, tipo_relacion_id);
+CREATE INDEX idx_relaciones_requisitos_destino ON relaciones_requisitos (requisito_destino_id, tipo_relacion_id);
+
 -- Tabla de relación entre casos de uso y requisitos
 CREATE TABLE casos_uso_requisitos (
     id SERIAL PRIMARY KEY,
@@ -201,6 +221,7 @@ CREATE TABLE casos_uso_requisitos (
     activo BOOLEAN DEFAULT TRUE,
     UNIQUE(caso_uso_id, requisito_id)
 );
+CREATE INDEX idx_casos_uso_requisitos_requisito ON casos_uso_requisitos (requisito_id);
 
 -- Tabla de relación entre historias de usuario y requisitos
 CREATE TABLE historias_requisitos (
@@ -211,6 +232,60 @@ CREATE TABLE historias_requisitos (
     activo BOOLEAN DEFAULT TRUE,
     UNIQUE(historia_id, requisito_id)
 );
+CREATE INDEX idx_historias_requisitos_requisito ON historias_requisitos (requisito_id);
+
+-- Índices parciales sobre filas activas (listados por proyecto y reportes de cobertura).
+-- El resto del conjunto de índices se mantiene en las migraciones: python manage.py migrate
+CREATE INDEX idx_requisitos_proyecto_activo ON requisitos (proyecto_id) WHERE activo = TRUE;
+CREATE INDEX idx_casos_uso_proyecto_activo ON casos_uso (proyecto_id) WHERE activo = TRUE;
+CREATE INDEX idx_historias_usuario_proyecto_activo ON historias_usuario (proyecto_id) WHERE activo = TRUE;
+CREATE INDEX idx_relaciones_casos_uso_destino_activo ON relaciones_casos_uso (caso_uso_destino_id, tipo_relacion_id) WHERE activo = TRUE;
+
+-- Líneas base: versión congelada de los artefactos de un proyecto
+CREATE TABLE lineas_base (
+    id SERIAL PRIMARY KEY,
+    proyecto_id INTEGER NOT NULL REFERENCES proyectos(id),
+    nombre VARCHAR(100) NOT NULL,
+    descripcion TEXT,
+    total_elementos INTEGER NOT NULL DEFAULT 0,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    activo BOOLEAN DEFAULT TRUE
+);
+CREATE INDEX idx_lineas_base_proyecto ON lineas_base (proyecto_id);
+
+-- Contenido de cada artefacto, direccionado por su hash (se comparte entre líneas base)
+CREATE TABLE contenidos_linea_base (
+    id SERIAL PRIMARY KEY,
+    hash CHAR(64) NOT NULL UNIQUE,     -- sha256 del JSON canónico
+    contenido BYTEA NOT NULL,          -- JSON canónico comprimido con zlib
+    tamano INTEGER NOT NULL,           -- bytes del JSON sin comprimir
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE lineas_base_elementos (
+    id SERIAL PRIMARY KEY,
+    linea_base_id INTEGER NOT NULL REFERENCES lineas_base(id),
+    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('requisito', 'caso_uso', 'historia_usuario')),
+    elemento_id INTEGER NOT NULL,      -- sin llave foránea: la línea base sobrevive a la purga del artefacto
+    contenido_id INTEGER NOT NULL REFERENCES contenidos_linea_base(id),
+    UNIQUE(linea_base_id, tipo, elemento_id)
+);
+CREATE INDEX idx_lineas_base_elementos_contenido ON lineas_base_elementos (contenido_id);
+
+-- Historial de revisiones de requisitos, casos de uso e historias:
+-- revisiones completas periódicas y, entre ellas, solo los campos que cambiaron
+CREATE TABLE revisiones (
+    id SERIAL PRIMARY KEY,
+    tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('requisito', 'caso_uso', 'historia_usuario')),
+    elemento_id INTEGER NOT NULL,
+    numero INTEGER NOT NULL,
+    completa BOOLEAN NOT NULL,
+    datos JSONB NOT NULL,
+    usuario_id INTEGER REFERENCES usuarios(id),
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(tipo, elemento_id, numero)
+);
 
 
 -- Insertar algunos roles básicos
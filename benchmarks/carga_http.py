@@ -0,0 +1,137 @@
+# benchmarks/carga_http.py
+"""Compara el rendimiento del mismo API servido por WSGI y por ASGI con clientes concurrentes.
+
+Solo usa la biblioteca estándar. Levantar los dos servidores contra la misma base, p. ej.:
+
+    gunicorn app.wsgi:application -w 4 --threads 1 -b 127.0.0.1:8001
+    uvicorn app.asgi:application --workers 4 --port 8002
+
+(app/asgi.py desactiva las conexiones persistentes; con BD_POOL=1 en ambos servidores la
+comparación no mide además el costo de abrir una conexión por petición bajo ASGI)
+
+y ejecutar:
+
+    python benchmarks/carga_http.py --token <jwt> \\
+        --servidor wsgi=http://127.0.0.1:8001 --servidor asgi=http://127.0.0.1:8002 \\
+        --ruta /app/proyectos/listar/ --ruta /app/requisitos/listar/1/ \\
+        --clientes 64 --duracion 20
+
+Cada cliente es un hilo con su propia conexión keep-alive que encadena peticiones
+durante la duración indicada; se informan peticiones por segundo, p50, p95 y errores.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _conectar(url):
+    partes = urlsplit(url)
+    clase = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+    return clase(partes.hostname, partes.port, timeout=60)
+
+
+def _cliente(url_base, rutas, cabeceras, fin, indice, resultados):
+    latencias, errores = [], 0
+    conexion = _conectar(url_base)
+    prefijo = urlsplit(url_base).path.rstrip('/')
+    i = indice
+    while time.monotonic() < fin:
+        ruta = prefijo + rutas[i % len(rutas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            conexion.request('GET', ruta, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status >= 400:
+                errores += 1
+            else:
+                latencias.append(time.perf_counter() - inicio)
+        except (OSError, http.client.HTTPException):
+            errores += 1
+            conexion.close()
+            conexion = _conectar(url_base)
+    conexion.close()
+    resultados[indice] = (latencias, errores)
+
+
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+def medir(url_base, rutas, token=None, clientes=32, duracion=10.0, calentamiento=2.0):
+    """Ejecuta la carga contra `url_base` y devuelve las métricas agregadas."""
+    cabeceras = {'Accept': 'application/json'}
+    if token:
+        cabeceras['Authorization'] = f'Bearer {token}'
+
+    if calentamiento:
+        _cliente(url_base, rutas, cabeceras, time.monotonic() + calentamiento, 0, [None])
+
+    resultados = [None] * clientes
+    fin = time.monotonic() + duracion
+    hilos = [
+        threading.Thread(target=_cliente, args=(url_base, rutas, cabeceras, fin, i, resultados), daemon=True)
+        for i in range(clientes)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - inicio
+
+    latencias = sorted(l for lat, _ in resultados for l in lat)
+    errores = sum(e for _, e in resultados)
+    return {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'segundos': round(transcurrido, 2),
+        'peticiones_por_segundo': round(len(latencias) / transcurrido, 1),
+        'p50_ms': round(_percentil(latencias, 50) * 1000, 2) if latencias else None,
+        'p95_ms': round(_percentil(latencias, 95) * 1000, 2) if latencias else None,
+        'media_ms': round(statistics.fmean(latencias) * 1000, 2) if latencias else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servidor', action='append', required=True, metavar='NOMBRE=URL',
+                        help='Servidor a medir (repetible), p. ej. wsgi=http://127.0.0.1:8001')
+    parser.add_argument('--ruta', action='append', required=True,
+                        help='Ruta GET a pedir (repetible); los clientes las recorren en orden')
+    parser.add_argument('--token', default=os.environ.get('BENCH_TOKEN'), help='JWT (o BENCH_TOKEN)')
+    parser.add_argument('--clientes', type=int, default=32)
+    parser.add_argument('--duracion', type=float, default=10.0, help='Segundos de carga por servidor')
+    parser.add_argument('--calentamiento', type=float, default=2.0)
+    parser.add_argument('--json', help='Archivo donde guardar los resultados')
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for servidor in args.servidor:
+        nombre, _, url = servidor.partition('=')
+        if not url:
+            parser.error(f'Servidor inválido: {servidor}')
+        resultados[nombre] = medir(url, args.ruta, args.token, args.clientes, args.duracion, args.calentamiento)
+
+    print(f"{'servidor':<10} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'errores':>8}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<10} {r['peticiones_por_segundo']:>10} {r['p50_ms'] or '-':>10} "
+              f"{r['p95_ms'] or '-':>10} {r['errores']:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump({'clientes': args.clientes, 'rutas': args.ruta, 'resultados': resultados}, archivo, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
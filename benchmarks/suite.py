@@ -0,0 +1,533 @@
+# benchmarks/suite.py
+"""Benchmark de todos los endpoints sobre proyectos sintéticos de varios tamaños.
+
+Crea una base nueva en el PostgreSQL local (bd.sql y los índices, con migrate), genera un
+proyecto por cada escala (artefactos con relaciones, estimaciones y vínculos; ver
+proyectos/sinteticos.py) y mide cada ruta de los seis urls.py con el cliente de pruebas de Django, sin servidor HTTP:
+
+    BD_PASSWORD=12345 python benchmarks/suite.py --escalas 100 5000 50000 \\
+        --salida benchmarks/resultados/2025-01-10.json --comparar benchmarks/resultados/anterior.json
+
+Por ruta y escala se informan latencia (mín, p50, p95, máx y media en ms), consultas por
+petición, códigos de estado y el pico de memoria asignada durante la petición (tracemalloc,
+en una pasada aparte para no inflar las latencias). Las rutas que no tienen escenario se
+listan en el resultado para que el catálogo de escenarios no se quede atrás.
+
+La conexión se toma de las variables BD_HOST, BD_PORT, BD_USER y BD_PASSWORD (como el
+resto de la aplicación); la base se borra al terminar salvo con --conservar.
+"""
+import argparse
+import gc
+import importlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from contextlib import closing
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+MODULOS = ('usuarios', 'proyectos', 'requisitos', 'casosdeuso', 'historiasdeusuario', 'catalogos')
+USUARIO_ADMIN = 1
+CONTRASENIA_ADMIN = '123456'  # la del usuario admin de bd.sql
+
+# formato: 'json', 'form', 'multipart' o None (sin cuerpo)
+Peticion = namedtuple('Peticion', 'metodo ruta datos formato', defaults=(None, None))
+
+
+# -----------------------------
+# Base de datos
+# -----------------------------
+def _conexion_servidor():
+    import psycopg2
+
+    conexion = psycopg2.connect(
+        dbname='postgres',
+        user=os.environ.get('BD_USER', 'postgres'),
+        password=os.environ.get('BD_PASSWORD', '12345'),
+        host=os.environ.get('BD_HOST', 'localhost'),
+        port=os.environ.get('BD_PORT', '5432'),
+    )
+    conexion.autocommit = True
+    return conexion
+
+
+def crear_base(nombre):
+    """Crea la base `nombre` vacía (la borra antes si existe); el esquema lo carga migrate."""
+    with closing(_conexion_servidor()) as servidor, servidor.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{nombre}"')
+        cursor.execute(f'CREATE DATABASE "{nombre}"')
+
+
+def borrar_base(nombre):
+    from django.db import connections
+
+    connections.close_all()
+    with closing(_conexion_servidor()) as servidor, servidor.cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{nombre}"')
+
+
+def preparar_django(nombre_base):
+    os.environ['BD_NAME'] = nombre_base
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    # Los middlewares de instrumentación se miden aparte; aquí solo interesan las vistas
+    os.environ.setdefault('METRICAS', '0')
+    os.environ.setdefault('DIAGNOSTICO_MUESTREO', '0')
+    # Un solo proceso y una base nueva: cada corrida empieza con el cache vacío y no ve lo
+    # que otra dejó en Redis para los mismos ids
+    os.environ.pop('CACHE_URL', None)
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    # Con DEBUG cada consulta queda en connection.queries durante toda la corrida
+    settings.DEBUG = False
+
+    from django.core.management import call_command
+    # bd.sql (migración proyectos 0001) y el conjunto de índices de las migraciones
+    call_command('migrate', interactive=False, verbosity=0)
+
+
+def token_admin():
+    import jwt
+    from django.conf import settings
+
+    ahora = datetime.utcnow()
+    return jwt.encode(
+        {'usuario_id': USUARIO_ADMIN, 'usuario': 'admin', 'rol': 'admin',
+         'exp': ahora + timedelta(hours=24), 'iat': ahora},
+        settings.SECRET_KEY, algorithm='HS256'
+    )
+
+
+# -----------------------------
+# Datos
+# -----------------------------
+class Contexto:
+    """Ids del proyecto generado para una escala y utilidades para preparar escenarios."""
+
+    def __init__(self, cliente, generador, resumen):
+        self.cliente = cliente
+        self.generador = generador
+        self.proyecto_id = resumen['proyecto_id']
+        self.artefactos = resumen['artefactos']
+        primeros = resumen['primeros_ids']
+        # El artefacto del medio tiene relaciones hacia atrás y otros que lo referencian
+        self.requisito_id = primeros['requisito'] + self.artefactos['requisito'] // 2
+        self.caso_uso_id = primeros['caso_uso'] + self.artefactos['caso_uso'] // 2
+        self.historia_id = primeros['historia_usuario'] + self.artefactos['historia_usuario'] // 2
+        self.requisitos_cercanos = [self.requisito_id - i for i in range(1, 4)]
+        self._contador = itertools.count(1)
+
+    def unico(self, prefijo='bench'):
+        return f"{prefijo}-{next(self._contador)}"
+
+    def numero(self):
+        return 1000 + next(self._contador)
+
+    def ultimo_id(self, tabla):
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT max(id) FROM {tabla}")
+            return cursor.fetchone()[0]
+
+    def crear(self, peticion, tabla):
+        """Ejecuta `peticion` (fuera de la medición) y devuelve el id creado en `tabla`."""
+        respuesta = ejecutar(self.cliente, peticion)
+        if respuesta.status_code >= 400:
+            raise RuntimeError(f"No se pudo preparar {peticion.ruta}: {respuesta.status_code} {respuesta.content[:200]!r}")
+        return self.ultimo_id(tabla)
+
+
+def generar_escala(artefactos, semilla):
+    from django.db import connection, transaction
+    from proyectos.sinteticos import GeneradorProyectos, analizar_tablas
+
+    inicio = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        generador = GeneradorProyectos(cursor, semilla=semilla)
+        resumen = generador.proyecto(USUARIO_ADMIN, artefactos, indice=artefactos)
+    with connection.cursor() as cursor:
+        analizar_tablas(cursor)
+    resumen['segundos_generacion'] = round(time.perf_counter() - inicio, 2)
+    return generador, resumen
+
+
+def preparar_lineas_base(ctx):
+    """Dos líneas base con un cambio entre ellas, para comparar y leer elementos."""
+    ruta = f'/app/proyectos/lineas_base/crear/{ctx.proyecto_id}/'
+    ctx.linea_base_anterior = ctx.crear(Peticion('post', ruta, {'nombre': 'bench-anterior'}, 'form'), 'lineas_base')
+    # Deja además una revisión para el historial
+    ejecutar(ctx.cliente, _actualizar_requisito(ctx))
+    ctx.linea_base_posterior = ctx.crear(Peticion('post', ruta, {'nombre': 'bench-posterior'}, 'form'), 'lineas_base')
+
+
+# -----------------------------
+# Escenarios
+# -----------------------------
+def _crear_requisito(ctx):
+    return Peticion('post', '/app/requisitos/crear/', dict(
+        nombre=ctx.unico('Requisito'), descripcion='Descripción del requisito de benchmark',
+        tipo_id=ctx.generador.tipos_requisito[0], criterios='Criterios de aceptación de benchmark',
+        proyecto_id=ctx.proyecto_id, prioridad_id=ctx.generador.prioridades[0],
+        estado_id=ctx.generador.estados['requisito'][0],
+        relaciones_requisitos=[
+            {'requisito_id': r, 'tipo_relacion_id': ctx.generador.tipos_relacion_requisito[0], 'descripcion': ''}
+            for r in ctx.requisitos_cercanos[:2]
+        ],
+    ), 'json')
+
+
+def _crear_caso_uso(ctx):
+    return Peticion('post', '/app/casosdeuso/crear/', dict(
+        nombre=ctx.unico('Caso de uso'), proyecto_id=ctx.proyecto_id, actores=['Usuario'],
+        precondiciones='El usuario inició sesión',
+        flujo_principal=[{'paso': i, 'actor': 'Usuario', 'accion': f'Paso {i}'} for i in range(1, 6)],
+        estado_id=ctx.generador.estados['caso_uso'][0],
+        relaciones=[{'casoUsoRelacionado': ctx.caso_uso_id, 'tipo': ctx.generador.tipos_relacion_cu[0], 'descripcion': ''}],
+    ), 'json')
+
+
+def _crear_historia(ctx):
+    return Peticion('post', '/app/historiasdeusuario/crear/', dict(
+        titulo=ctx.unico('Historia de usuario'), proyecto_id=ctx.proyecto_id,
+        criterios_aceptacion='Dado un usuario cuando consulta entonces ve el resultado',
+        estado_id=ctx.generador.estados['historia_usuario'][0], valor_negocio=50,
+        estimaciones=[{'tipo_estimacion_id': ctx.generador.tipos_estimacion[0], 'valor': 5}],
+    ), 'json')
+
+
+def _actualizar_requisito(ctx):
+    return Peticion('patch', f'/app/requisitos/actualizar/{ctx.requisito_id}/',
+                    dict(descripcion=f'Descripción actualizada {ctx.unico()}'), 'json')
+
+
+def _eliminar(ruta, crear, tabla, metodo='delete'):
+    def escenario(ctx):
+        return Peticion(metodo, ruta.format(ctx.crear(crear(ctx), tabla)))
+    return escenario
+
+
+def _eliminar_proyecto(ctx):
+    from django.db import connection
+    from proyectos.sinteticos import GeneradorProyectos
+
+    with connection.cursor() as cursor:
+        GeneradorProyectos(cursor, semilla=ctx.generador.semilla).proyecto(USUARIO_ADMIN, 20, indice=ctx.numero())
+    return Peticion('post', f"/app/proyectos/eliminar/{ctx.ultimo_id('proyectos')}/")
+
+
+def _importar(ctx):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    filas = [{'nombre': f'Importado {ctx.unico()}', 'descripcion': 'Requisito importado en el benchmark',
+              'criterios': 'Criterios del requisito importado', 'tipo': ctx.generador.tipos_requisito[0]}
+             for _ in range(20)]
+    archivo = SimpleUploadedFile('requisitos.json', json.dumps(filas).encode('utf-8'), 'application/json')
+    return Peticion('post', f'/app/proyectos/importar/{ctx.proyecto_id}/requisitos/', {'archivo': archivo}, 'multipart')
+
+
+# Catálogos: (prefijo de la ruta, tabla, campos extra al crear, nombre en singular y en plural
+# de las rutas, si tiene ruta obtener)
+CATALOGOS = (
+    ('', 'tipos_requisito', lambda ctx: {}, 'tipo_requisito', 'tipos_requisito', True),
+    ('prioridades/', 'prioridades', lambda ctx: {'nivel': ctx.numero()}, 'prioridad', 'prioridades', True),
+    ('estados/', 'estados_proyecto', lambda ctx: {'orden': ctx.numero()}, 'estado_proyecto', 'estados_proyecto', True),
+    ('estados_elemento/', 'estados_elemento', lambda ctx: {'tipo': 'requisito'}, 'estado_elemento', 'estados_elemento', True),
+    ('tipos_relacion_cu/', 'tipos_relacion_cu', lambda ctx: {}, 'tipo_relacion_cu', 'tipos_relacion_cu', False),
+    ('tipos_relacion_requisito/', 'tipos_relacion_requisito', lambda ctx: {}, 'tipo_relacion_requisito', 'tipos_relacion_requisito', False),
+    ('tipos_estimacion/', 'tipos_estimacion', lambda ctx: {}, 'tipo_estimacion', 'tipos_estimacion', False),
+)
+
+
+def _escenarios_catalogos():
+    escenarios = {}
+    for prefijo, tabla, extra, singular, plural, con_obtener in CATALOGOS:
+        base = f'/app/catalogos/{prefijo}'
+
+        def crear(ctx, base=base, extra=extra):
+            return Peticion('post', f'{base}crear/', {'nombre': ctx.unico(), 'descripcion': 'bench', **extra(ctx)}, 'form')
+
+        escenarios[f'listar_{plural}'] = lambda ctx, base=base: Peticion('get', f'{base}listar/')
+        escenarios[f'crear_{singular}'] = crear
+        escenarios[f'editar_{singular}'] = lambda ctx, base=base: Peticion(
+            'post', f'{base}editar/1/', {'descripcion': f'Editado {ctx.unico()}'}, 'form')
+        if con_obtener:
+            escenarios[f'obtener_{singular}'] = lambda ctx, base=base: Peticion('get', f'{base}obtener/1/')
+        escenarios[f'deshabilitar_{singular}'] = lambda ctx, base=base, crear=crear, tabla=tabla: Peticion(
+            'post', f'{base}deshabilitar/{ctx.crear(crear(ctx), tabla)}/')
+    return escenarios
+
+
+ESCENARIOS = {
+    # usuarios
+    'registrar_usuario': lambda ctx: Peticion('post', '/app/usuarios/registrar/', {
+        'usuario': ctx.unico('usuario'), 'contrasenia': 'contrasenia-bench', 'nombre': 'Bench', 'apellido': 'Usuario'}, 'form'),
+    'login_usuario': lambda ctx: Peticion('post', '/app/usuarios/login/', {'usuario': 'admin', 'contraseña': CONTRASENIA_ADMIN}, 'form'),
+    'perfil_usuario': lambda ctx: Peticion('get', '/app/usuarios/perfil/'),
+
+    # proyectos
+    'listar_proyectos': lambda ctx: Peticion('get', '/app/proyectos/listar/'),
+    'crear_proyecto': lambda ctx: Peticion('post', '/app/proyectos/crear/', {
+        'nombre': ctx.unico('Proyecto'), 'descripcion': 'Proyecto de benchmark', 'estado': 'Requisitos'}, 'form'),
+    'editar_proyecto': lambda ctx: Peticion('post', f'/app/proyectos/editar/{ctx.proyecto_id}/', {
+        'descripcion': f'Editado {ctx.unico()}'}, 'form'),
+    'obtener_proyecto': lambda ctx: Peticion('get', f'/app/proyectos/obtener_proyecto/{ctx.proyecto_id}/'),
+    'eliminar_proyecto': _eliminar_proyecto,
+    'clonar_proyecto': lambda ctx: Peticion('post', f'/app/proyectos/clonar/{ctx.proyecto_id}/', {'nombre': ctx.unico('Clon')}, 'form'),
+    'exportar_proyecto': lambda ctx: Peticion('get', f'/app/proyectos/exportar/{ctx.proyecto_id}/requisitos/?formato=csv'),
+    'importar_proyecto': _importar,
+    'especificacion_proyecto': lambda ctx: Peticion('get', f'/app/proyectos/especificacion/{ctx.proyecto_id}/?formato=html'),
+    'crear_linea_base_proyecto': lambda ctx: Peticion(
+        'post', f'/app/proyectos/lineas_base/crear/{ctx.proyecto_id}/', {'nombre': ctx.unico('Línea base')}, 'form'),
+    'listar_lineas_base': lambda ctx: Peticion('get', f'/app/proyectos/lineas_base/{ctx.proyecto_id}/'),
+    'comparar_lineas_base_proyecto': lambda ctx: Peticion(
+        'get', f'/app/proyectos/lineas_base/comparar/{ctx.linea_base_anterior}/{ctx.linea_base_posterior}/'),
+    'elemento_linea_base': lambda ctx: Peticion(
+        'get', f'/app/proyectos/lineas_base/elemento/{ctx.linea_base_posterior}/requisito/{ctx.requisito_id}/'),
+    'historial_elemento': lambda ctx: Peticion('get', f'/app/proyectos/revisiones/requisito/{ctx.requisito_id}/'),
+    'revision_elemento': lambda ctx: Peticion('get', f'/app/proyectos/revisiones/requisito/{ctx.requisito_id}/1/'),
+
+    # requisitos
+    'crear_requisito': _crear_requisito,
+    'listar_requisitos': lambda ctx: Peticion('get', f'/app/requisitos/listar/{ctx.proyecto_id}/'),
+    'obtener_requisito': lambda ctx: Peticion('get', f'/app/requisitos/obtener/{ctx.requisito_id}/'),
+    'actualizar_requisito': _actualizar_requisito,
+    'eliminar_requisito': _eliminar('/app/requisitos/eliminar/{}/', _crear_requisito, 'requisitos'),
+    'obtener_relaciones_requisito': lambda ctx: Peticion('get', f'/app/requisitos/relaciones/{ctx.requisito_id}/'),
+    'impacto_requisito': lambda ctx: Peticion('get', f'/app/requisitos/impacto/{ctx.requisito_id}/'),
+    'vincular_requisito': lambda ctx: Peticion('post', f'/app/requisitos/vinculos/{ctx.requisito_id}/', dict(
+        accion='reemplazar', casos_uso=[ctx.caso_uso_id], historias=[ctx.historia_id]), 'json'),
+    'grafo_requisitos': lambda ctx: Peticion('get', f'/app/requisitos/grafo/{ctx.proyecto_id}/'),
+    'matriz_trazabilidad_proyecto': lambda ctx: Peticion('get', f'/app/requisitos/trazabilidad/{ctx.proyecto_id}/'),
+    'matriz_trazabilidad_csv': lambda ctx: Peticion('get', f'/app/requisitos/trazabilidad/{ctx.proyecto_id}/csv/'),
+    'cobertura_proyecto': lambda ctx: Peticion('get', f'/app/requisitos/cobertura/{ctx.proyecto_id}/'),
+
+    # casos de uso
+    'crear_caso_uso': _crear_caso_uso,
+    'listar_casos_uso': lambda ctx: Peticion('get', f'/app/casosdeuso/listar/{ctx.proyecto_id}/'),
+    'obtener_caso_uso': lambda ctx: Peticion('get', f'/app/casosdeuso/obtener/{ctx.caso_uso_id}/'),
+    'actualizar_caso_uso': lambda ctx: Peticion('patch', f'/app/casosdeuso/actualizar/{ctx.caso_uso_id}/', dict(
+        descripcion=f'Descripción actualizada {ctx.unico()}'), 'json'),
+    'eliminar_caso_uso': _eliminar('/app/casosdeuso/eliminar/{}/', _crear_caso_uso, 'casos_uso'),
+    'obtener_relaciones_caso_uso': lambda ctx: Peticion('get', f'/app/casosdeuso/relaciones/{ctx.caso_uso_id}/'),
+    'jerarquia_caso_uso': lambda ctx: Peticion('get', f'/app/casosdeuso/jerarquia/{ctx.caso_uso_id}/?direccion=ancestros'),
+    'vincular_requisitos_caso_uso': lambda ctx: Peticion('post', f'/app/casosdeuso/vinculos/{ctx.caso_uso_id}/', dict(
+        accion='reemplazar', requisitos=ctx.requisitos_cercanos), 'json'),
+
+    # historias de usuario
+    'crear_historia_usuario': _crear_historia,
+    'listar_historias_usuario': lambda ctx: Peticion('get', f'/app/historiasdeusuario/listar/{ctx.proyecto_id}/'),
+    'obtener_historia_usuario': lambda ctx: Peticion('get', f'/app/historiasdeusuario/obtener/{ctx.historia_id}/'),
+    'actualizar_historia_usuario': lambda ctx: Peticion('patch', f'/app/historiasdeusuario/actualizar/{ctx.historia_id}/', dict(
+        descripcion=f'Descripción actualizada {ctx.unico()}'), 'json'),
+    'eliminar_historia_usuario': _eliminar('/app/historiasdeusuario/eliminar/{}/', _crear_historia, 'historias_usuario'),
+    'vincular_requisitos_historia': lambda ctx: Peticion('post', f'/app/historiasdeusuario/vinculos/{ctx.historia_id}/', dict(
+        accion='reemplazar', requisitos=ctx.requisitos_cercanos), 'json'),
+
+    **_escenarios_catalogos(),
+}
+
+
+def rutas_declaradas():
+    """Nombres de todas las rutas de los seis módulos de la aplicación."""
+    nombres = []
+    for modulo in MODULOS:
+        for patron in importlib.import_module(f'{modulo}.urls').urlpatterns:
+            if patron.name:
+                nombres.append(patron.name)
+    return nombres
+
+
+# -----------------------------
+# Medición
+# -----------------------------
+def ejecutar(cliente, peticion):
+    metodo = getattr(cliente, peticion.metodo)
+    if peticion.formato == 'json':
+        return metodo(peticion.ruta, data=json.dumps(peticion.datos), content_type='application/json')
+    if peticion.formato in ('form', 'multipart'):
+        return metodo(peticion.ruta, data=peticion.datos)
+    return metodo(peticion.ruta)
+
+
+def _consumir(respuesta):
+    """Recorre el cuerpo (el de las respuestas en streaming se genera aquí) y devuelve su tamaño."""
+    if respuesta.streaming:
+        return sum(len(parte) for parte in respuesta.streaming_content)
+    return len(respuesta.content)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir_ruta(ctx, escenario, repeticiones, calentamiento, pasadas_memoria):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(calentamiento):
+        _consumir(ejecutar(ctx.cliente, escenario(ctx)))
+
+    latencias, consultas, estados, bytes_respuesta = [], [], Counter(), []
+    for _ in range(repeticiones):
+        peticion = escenario(ctx)
+        gc.collect()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = ejecutar(ctx.cliente, peticion)
+            bytes_respuesta.append(_consumir(respuesta))
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(len(capturadas))
+        estados[respuesta.status_code] += 1
+
+    picos = []
+    for _ in range(pasadas_memoria):
+        peticion = escenario(ctx)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            _consumir(ejecutar(ctx.cliente, peticion))
+            picos.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'repeticiones': repeticiones,
+        'estados': {str(estado): cantidad for estado, cantidad in sorted(estados.items())},
+        'latencia_ms': {
+            'min': round(min(latencias), 3),
+            'p50': round(statistics.median(latencias), 3),
+            'p95': round(_percentil(latencias, 95), 3),
+            'max': round(max(latencias), 3),
+            'media': round(statistics.fmean(latencias), 3),
+        },
+        'consultas': {'min': min(consultas), 'max': max(consultas), 'media': round(statistics.fmean(consultas), 2)},
+        'bytes_respuesta': max(bytes_respuesta),
+        'memoria_pico_kb': round(max(picos) / 1024, 1) if picos else None,
+    }
+
+
+def _orden(nombre):
+    """Primero las lecturas y al final las escrituras, que cambian los datos medidos después."""
+    escritura = nombre.split('_', 1)[0] in ('crear', 'editar', 'eliminar', 'deshabilitar', 'clonar',
+                                            'importar', 'actualizar', 'vincular', 'registrar')
+    return (escritura, nombre == 'eliminar_proyecto', nombre)
+
+
+# -----------------------------
+# Comparación
+# -----------------------------
+def comparar(actual, anterior, umbral):
+    """Rutas cuya p50 empeoró más que `umbral` (fracción) o que hacen más consultas."""
+    regresiones = []
+    for escala, datos in actual['escalas'].items():
+        previas = anterior.get('escalas', {}).get(escala, {}).get('rutas', {})
+        for nombre, medicion in datos['rutas'].items():
+            previa = previas.get(nombre)
+            if not previa:
+                continue
+            p50, p50_previa = medicion['latencia_ms']['p50'], previa['latencia_ms']['p50']
+            if p50_previa and p50 > p50_previa * (1 + umbral):
+                regresiones.append(f"{escala:>7} {nombre}: p50 {p50_previa:.1f} -> {p50:.1f} ms")
+            if medicion['consultas']['max'] > previa['consultas']['max']:
+                regresiones.append(
+                    f"{escala:>7} {nombre}: consultas {previa['consultas']['max']} -> {medicion['consultas']['max']}"
+                )
+    return regresiones
+
+
+def _version():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escalas', type=int, nargs='+', default=[100, 5000, 50000],
+                        help='Artefactos por proyecto generado (uno por escala)')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--calentamiento', type=int, default=2)
+    parser.add_argument('--memoria', type=int, default=2, help='Pasadas con tracemalloc por ruta (0 la omite)')
+    parser.add_argument('--rutas', nargs='*', help='Solo estas rutas (nombres de urls.py)')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--base', default=f'bench_tddmachine_{os.getpid()}')
+    parser.add_argument('--conservar', action='store_true', help='No borrar la base al terminar')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto, a la salida estándar)')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior contra la que comparar')
+    parser.add_argument('--umbral', type=float, default=0.2, help='Empeoramiento de p50 que se informa (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    crear_base(args.base)
+    preparar_django(args.base)
+
+    from django.test import Client
+
+    declaradas = rutas_declaradas()
+    desconocidas = set(args.rutas or ()) - set(declaradas)
+    if desconocidas:
+        parser.error(f"Rutas inexistentes: {', '.join(sorted(desconocidas))}")
+    rutas = sorted((n for n in declaradas if n in ESCENARIOS and (not args.rutas or n in args.rutas)), key=_orden)
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'version': _version(),
+        'python': platform.python_version(),
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('salida', 'comparar')},
+        'sin_escenario': sorted(set(declaradas) - set(ESCENARIOS)),
+        'escalas': {},
+    }
+
+    try:
+        for escala in args.escalas:
+            print(f"Generando proyecto de {escala} artefactos...", file=sys.stderr)
+            generador, resumen = generar_escala(escala, args.semilla)
+            cliente = Client(HTTP_AUTHORIZATION=f'Bearer {token_admin()}')
+            ctx = Contexto(cliente, generador, resumen)
+            preparar_lineas_base(ctx)
+
+            mediciones = {}
+            for nombre in rutas:
+                print(f"  {escala:>7} {nombre}", file=sys.stderr)
+                mediciones[nombre] = medir_ruta(ctx, ESCENARIOS[nombre], args.repeticiones,
+                                                args.calentamiento, args.memoria)
+            resultado['escalas'][str(escala)] = {'datos': resumen, 'rutas': mediciones}
+    finally:
+        if not args.conservar:
+            borrar_base(args.base)
+
+    salida = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(salida)
+    else:
+        print(salida)
+
+    if resultado['sin_escenario']:
+        print(f"Rutas sin escenario: {', '.join(resultado['sin_escenario'])}", file=sys.stderr)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = comparar(resultado, json.load(archivo), args.umbral)
+        print('\n'.join(['Regresiones:', *regresiones]) if regresiones else 'Sin regresiones', file=sys.stderr)
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
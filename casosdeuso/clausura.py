@@ -0,0 +1,115 @@
+# casosdeuso/clausura.py
+"""Mantenimiento de la tabla casos_uso_clausura.
+
+Cada fila (ancestro, descendiente, tipo, profundidad) indica que existe un camino
+de relaciones de un mismo tipo jerárquico entre dos casos de uso, con la distancia
+mínima. En "A include B" el padre es A; en "A extend B" y "A generalizacion B" el
+padre es B (el caso base o el caso padre).
+"""
+
+# Tipos de relación que forman jerarquías, y si el padre es el origen de la relación
+TIPOS_JERARQUICOS = {
+    'include': True,
+    'extend': False,
+    'generalizacion': False,
+}
+
+# Tope de la recursión. UNION (sin ALL) descarta las filas (ancestro, descendiente, tipo,
+# profundidad) ya generadas, así los caminos que llegan al mismo par con la misma longitud
+# (diamantes) se recorren una sola vez y los ciclos quedan acotados por este tope.
+PROFUNDIDAD_MAXIMA = 64
+
+# Primera llave del pg_advisory_xact_lock que serializa los recálculos de un proyecto
+LLAVE_BLOQUEO = 31031
+
+SQL_RECALCULAR = """
+    WITH RECURSIVE aristas AS (
+        SELECT
+            CASE WHEN t.nombre = ANY(%(padre_origen)s) THEN r.caso_uso_origen_id ELSE r.caso_uso_destino_id END AS padre,
+            CASE WHEN t.nombre = ANY(%(padre_origen)s) THEN r.caso_uso_destino_id ELSE r.caso_uso_origen_id END AS hijo,
+            r.tipo_relacion_id AS tipo
+        FROM relaciones_casos_uso r
+        JOIN tipos_relacion_cu t ON t.id = r.tipo_relacion_id
+        JOIN casos_uso o ON o.id = r.caso_uso_origen_id
+        JOIN casos_uso d ON d.id = r.caso_uso_destino_id
+        WHERE r.activo = TRUE
+          AND t.nombre = ANY(%(jerarquicos)s)
+          AND o.activo = TRUE AND d.activo = TRUE
+          AND o.proyecto_id = %(proyecto)s
+    ),
+    cierre(ancestro, descendiente, tipo, profundidad) AS (
+        SELECT padre, hijo, tipo, 1
+        FROM aristas
+        WHERE %(todos)s OR padre = ANY(%(origenes)s::int[])
+        UNION
+        SELECT c.ancestro, a.hijo, c.tipo, c.profundidad + 1
+        FROM cierre c
+        JOIN aristas a ON a.padre = c.descendiente AND a.tipo = c.tipo
+        WHERE c.profundidad < %(maxima)s
+    )
+    INSERT INTO casos_uso_clausura (ancestro_id, descendiente_id, tipo_relacion_id, profundidad)
+    SELECT ancestro, descendiente, tipo, MIN(profundidad)
+    FROM cierre
+    WHERE ancestro <> descendiente
+    GROUP BY ancestro, descendiente, tipo
+"""
+
+
+def _parametros_tipos():
+    return {
+        'padre_origen': [nombre for nombre, es_origen in TIPOS_JERARQUICOS.items() if es_origen],
+        'jerarquicos': list(TIPOS_JERARQUICOS),
+    }
+
+
+def _recalcular(cursor, proyecto_id, origenes):
+    cursor.execute(SQL_RECALCULAR, dict(
+        _parametros_tipos(),
+        proyecto=proyecto_id,
+        todos=origenes is None,
+        origenes=list(origenes or []),
+        maxima=PROFUNDIDAD_MAXIMA,
+    ))
+
+
+def actualizar_clausura(cursor, caso_uso_id, proyecto_id):
+    """Recalcula la clausura tras cambiar las relaciones de un caso de uso.
+
+    Solo pueden cambiar las filas cuyo ancestro es el propio caso de uso, uno de
+    sus ancestros previos, o uno de sus padres actuales (y los ancestros de
+    estos), así que se borran y se recalculan únicamente esas. Debe llamarse
+    dentro de transaction.atomic(), después de modificar relaciones_casos_uso.
+    """
+    # Serializa los recálculos concurrentes del mismo proyecto
+    cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [LLAVE_BLOQUEO, proyecto_id])
+
+    cursor.execute("""
+        WITH padres AS (
+            SELECT CASE WHEN t.nombre = ANY(%(padre_origen)s)
+                        THEN r.caso_uso_origen_id ELSE r.caso_uso_destino_id END AS padre
+            FROM relaciones_casos_uso r
+            JOIN tipos_relacion_cu t ON t.id = r.tipo_relacion_id
+            WHERE r.activo = TRUE
+              AND t.nombre = ANY(%(jerarquicos)s)
+              AND CASE WHEN t.nombre = ANY(%(padre_origen)s)
+                       THEN r.caso_uso_destino_id ELSE r.caso_uso_origen_id END = %(caso)s
+        )
+        SELECT padre FROM padres
+        UNION
+        SELECT ancestro_id FROM casos_uso_clausura
+        WHERE descendiente_id = %(caso)s OR descendiente_id IN (SELECT padre FROM padres)
+    """, dict(_parametros_tipos(), caso=caso_uso_id))
+    origenes = {caso_uso_id} | {fila[0] for fila in cursor.fetchall()}
+
+    cursor.execute("DELETE FROM casos_uso_clausura WHERE ancestro_id = ANY(%s::int[])", [list(origenes)])
+    _recalcular(cursor, proyecto_id, origenes)
+
+
+def reconstruir_clausura_proyecto(cursor, proyecto_id):
+    """Recalcula desde cero la clausura de todos los casos de uso de un proyecto."""
+    cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [LLAVE_BLOQUEO, proyecto_id])
+    cursor.execute("""
+        DELETE FROM casos_uso_clausura
+        WHERE ancestro_id IN (SELECT id FROM casos_uso WHERE proyecto_id = %s)
+    """, [proyecto_id])
+    _recalcular(cursor, proyecto_id, None)
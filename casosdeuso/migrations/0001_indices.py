@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('proyectos', '0001_esquema_base'),
+    ]
+
+    operations = [
+        # Listado por proyecto ordenado por fecha (reemplaza al parcial solo por proyecto_id)
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_casos_uso_proyecto_fecha_activo "
+            "ON casos_uso (proyecto_id, fecha_creacion DESC) WHERE activo = TRUE",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_casos_uso_proyecto_fecha_activo",
+        ),
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_casos_uso_proyecto_activo",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_casos_uso_proyecto_activo "
+            "ON casos_uso (proyecto_id) WHERE activo = TRUE",
+        ),
+        # Relaciones salientes de un caso de uso (obtener, listar y reemplazo al actualizar);
+        # se consultan también las inactivas, por eso no es parcial
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_relaciones_casos_uso_origen "
+            "ON relaciones_casos_uso (caso_uso_origen_id, tipo_relacion_id)",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_relaciones_casos_uso_origen",
+        ),
+    ]
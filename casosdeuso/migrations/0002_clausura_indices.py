@@ -0,0 +1,64 @@
+# Tabla de clausura e índices de bd.sql posteriores a la primera versión del esquema, para
+# las instalaciones que ya existían: en una base nueva ya están y IF NOT EXISTS no hace nada.
+# Al revertir no se borran, porque en ese caso pertenecen a bd.sql.
+from django.db import migrations, transaction
+
+from casosdeuso.clausura import reconstruir_clausura_proyecto
+
+
+def poblar_clausura(apps, schema_editor):
+    """Calcula la clausura de los proyectos con relaciones, un proyecto por transacción."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT c.proyecto_id
+            FROM relaciones_casos_uso r
+            JOIN casos_uso c ON c.id = r.caso_uso_origen_id
+            WHERE r.activo = TRUE
+              AND NOT EXISTS (SELECT 1 FROM casos_uso_clausura cl WHERE cl.ancestro_id = c.id)
+        """)
+        proyectos = [fila[0] for fila in cursor.fetchall()]
+        for proyecto_id in proyectos:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                reconstruir_clausura_proyecto(cursor, proyecto_id)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('casosdeuso', '0001_indices'),
+    ]
+
+    operations = [
+        migrations.RunSQL("""
+            CREATE TABLE IF NOT EXISTS casos_uso_clausura (
+                id SERIAL PRIMARY KEY,
+                ancestro_id INTEGER NOT NULL REFERENCES casos_uso(id),
+                descendiente_id INTEGER NOT NULL REFERENCES casos_uso(id),
+                tipo_relacion_id INTEGER NOT NULL REFERENCES tipos_relacion_cu(id),
+                profundidad INTEGER NOT NULL CHECK (profundidad > 0),
+                UNIQUE(ancestro_id, descendiente_id, tipo_relacion_id)
+            )
+        """, migrations.RunSQL.noop),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_casos_uso_clausura_descendiente "
+            "ON casos_uso_clausura (descendiente_id, tipo_relacion_id)",
+            migrations.RunSQL.noop,
+        ),
+        # Jerarquías ya existentes en las relaciones (en una base nueva no hay proyectos)
+        migrations.RunPython(poblar_clausura, migrations.RunPython.noop),
+        # Relaciones entrantes de un caso de uso
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_relaciones_casos_uso_destino_activo "
+            "ON relaciones_casos_uso (caso_uso_destino_id, tipo_relacion_id) WHERE activo = TRUE",
+            migrations.RunSQL.noop,
+        ),
+        # Casos de uso vinculados a un requisito (trazabilidad y cobertura)
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_casos_uso_requisitos_requisito "
+            "ON casos_uso_requisitos (requisito_id)",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,6 +1,7 @@
 # casosdeuso/models.py
 from django.db import models
 from proyectos.models import Proyectos
+from requisitos.models import Requisitos
 from django.utils import timezone
 
 
@@ -82,4 +83,34 @@ class RelacionesCasosUso(models.Model):
         db_table = 'relaciones_casos_uso'
 
     def __str__(self):
-        return f"{self.caso_uso_origen.nombre} -> {self.caso_uso_destino.nombre}"
\ No newline at end of file
+        return f"{self.caso_uso_origen.nombre} -> {self.caso_uso_destino.nombre}"
+
+
+class CasosUsoClausura(models.Model):
+    ancestro = models.ForeignKey(CasosUso, related_name="clausura_descendientes", on_delete=models.DO_NOTHING, db_column='ancestro_id')
+    descendiente = models.ForeignKey(CasosUso, related_name="clausura_ancestros", on_delete=models.DO_NOTHING, db_column='descendiente_id')
+    tipo_relacion = models.ForeignKey(TiposRelacionCu, models.DO_NOTHING, db_column='tipo_relacion_id')
+    profundidad = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'casos_uso_clausura'
+        unique_together = (('ancestro', 'descendiente', 'tipo_relacion'),)
+
+    def __str__(self):
+        return f"{self.ancestro_id} -> {self.descendiente_id} ({self.profundidad})"
+
+
+class CasosUsoRequisitos(models.Model):
+    caso_uso = models.ForeignKey(CasosUso, related_name="requisitos_vinculados", on_delete=models.DO_NOTHING, db_column='caso_uso_id')
+    requisito = models.ForeignKey(Requisitos, related_name="casos_uso_vinculados", on_delete=models.DO_NOTHING, db_column='requisito_id')
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        managed = False
+        db_table = 'casos_uso_requisitos'
+        unique_together = (('caso_uso', 'requisito'),)
+
+    def __str__(self):
+        return f"CU {self.caso_uso_id} -> RQ {self.requisito_id}"
@@ -1,3 +1,120 @@
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from app.pruebas import PruebaApi, PruebaPlanes
+from casosdeuso.clausura import reconstruir_clausura_proyecto
+from casosdeuso.models import CasosUso, CasosUsoClausura, CasosUsoRequisitos, RelacionesCasosUso, TiposRelacionCu
+from proyectos.sinteticos import GeneradorProyectos
+
+
+class PlanesConsultasTests(PruebaPlanes):
+    """Las consultas frecuentes de casos de uso no deben recorrer tablas grandes enteras."""
+
+    def test_listar_casos_uso(self):
+        self.assertSinSeqScan(
+            CasosUso.objects.filter(proyecto_id=self.proyecto_id, activo=True)
+            .select_related('estado', 'prioridad').order_by('-fecha_creacion')
+        )
+
+    def test_relaciones_de_los_casos_listados(self):
+        self.assertSinSeqScan(
+            RelacionesCasosUso.objects.filter(caso_uso_origen_id__in=self.ids['caso_uso'], caso_uso_destino__activo=True)
+            .select_related('tipo_relacion', 'caso_uso_destino')
+        )
+
+    def test_relaciones_salientes(self):
+        self.assertSinSeqScan(
+            RelacionesCasosUso.objects.filter(caso_uso_origen_id=self.caso_uso_id, caso_uso_destino__activo=True)
+            .select_related('tipo_relacion')
+        )
+
+    def test_relaciones_entrantes(self):
+        self.assertSinSeqScan(RelacionesCasosUso.objects.filter(caso_uso_destino_id=self.caso_uso_id, activo=True))
+
+    def test_jerarquia(self):
+        self.assertSinSeqScan(CasosUsoClausura.objects.filter(descendiente_id=self.caso_uso_id))
+        self.assertSinSeqScan(CasosUsoClausura.objects.filter(ancestro_id=self.caso_uso_id))
+
+    def test_requisitos_vinculados(self):
+        self.assertSinSeqScan(CasosUsoRequisitos.objects.filter(caso_uso_id=self.caso_uso_id, activo=True))
+
+
+class VinculosTests(PruebaApi):
+    """Acciones de /casosdeuso/vinculos/ sobre los requisitos de un caso de uso."""
+
+    def setUp(self):
+        self.caso_uso_id = self.proyecto['ids']['caso_uso'][0]
+        self.requisitos = self.proyecto['ids']['requisito'][:3]
+        self.ruta = f'/app/casosdeuso/vinculos/{self.caso_uso_id}/'
+
+    def vinculados(self):
+        return sorted(CasosUsoRequisitos.objects.filter(caso_uso_id=self.caso_uso_id, activo=True)
+                      .values_list('requisito_id', flat=True))
+
+    def test_agregar_quitar_y_reemplazar(self):
+        respuesta = self.post_json(self.ruta, {'accion': 'agregar', 'requisitos': self.requisitos[:2]})
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(respuesta.json()['requisitos'], self.requisitos[:2])
+
+        respuesta = self.post_json(self.ruta, {'accion': 'quitar', 'requisitos': [self.requisitos[0]]})
+        self.assertEqual(respuesta.json()['requisitos'], [self.requisitos[1]])
+
+        respuesta = self.post_json(self.ruta, {'accion': 'reemplazar', 'requisitos': [self.requisitos[2]]})
+        self.assertEqual(respuesta.json()['requisitos'], [self.requisitos[2]])
+        self.assertEqual(self.vinculados(), [self.requisitos[2]])
+
+    def test_requisito_de_otro_proyecto(self):
+        ajeno = self.otro_proyecto['ids']['requisito'][0]
+        respuesta = self.post_json(self.ruta, {'accion': 'agregar', 'requisitos': [self.requisitos[0], ajeno]})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['invalidos'], {'requisitos': [ajeno]})
+        self.assertEqual(self.vinculados(), [])
+
+    def test_accion_invalida(self):
+        respuesta = self.post_json(self.ruta, {'accion': 'mover', 'requisitos': self.requisitos})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ClausuraTests(TestCase):
+    """Clausura de una cadena de diamantes: 2^29 caminos entre el primer y el último nivel."""
+    NIVELES = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            generador = GeneradorProyectos(cursor, densidad_relaciones=0, densidad_vinculos=0, estimaciones=0)
+            # El 20 % de los artefactos son casos de uso: dos por nivel
+            resumen = generador.proyecto(1, cls.NIVELES * 10)
+        cls.proyecto_id = resumen['proyecto_id']
+        primero = resumen['primeros_ids']['caso_uso']
+        cls.niveles = [[primero + 2 * i, primero + 2 * i + 1] for i in range(cls.NIVELES)]
+        cls.include = TiposRelacionCu.objects.get(nombre='include').id
+        RelacionesCasosUso.objects.bulk_create([
+            RelacionesCasosUso(caso_uso_origen_id=padre, caso_uso_destino_id=hijo, tipo_relacion_id=cls.include)
+            for nivel, siguiente in zip(cls.niveles, cls.niveles[1:])
+            for padre in nivel for hijo in siguiente
+        ])
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            reconstruir_clausura_proyecto(cursor, self.proyecto_id)
+        return {
+            (fila.ancestro_id, fila.descendiente_id): fila.profundidad
+            for fila in CasosUsoClausura.objects.filter(tipo_relacion_id=self.include)
+        }
+
+    def test_diamantes(self):
+        clausura = self.reconstruir()
+        # Cada caso de uso es ancestro de los dos de cada nivel inferior
+        self.assertEqual(len(clausura), 4 * self.NIVELES * (self.NIVELES - 1) // 2)
+        self.assertEqual(clausura[self.niveles[0][0], self.niveles[-1][1]], self.NIVELES - 1)
+        self.assertEqual(clausura[self.niveles[3][1], self.niveles[5][0]], 2)
+
+    def test_ciclo(self):
+        RelacionesCasosUso.objects.create(
+            caso_uso_origen_id=self.niveles[-1][0], caso_uso_destino_id=self.niveles[0][0], tipo_relacion_id=self.include
+        )
+        clausura = self.reconstruir()
+        self.assertFalse([par for par in clausura if par[0] == par[1]])
+        self.assertEqual(clausura[self.niveles[-1][0], self.niveles[0][0]], 1)
+        self.assertEqual(clausura[self.niveles[1][0], self.niveles[0][0]], self.NIVELES - 1)
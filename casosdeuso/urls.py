@@ -12,4 +12,8 @@ urlpatterns = [
     
     # Relaciones entre casos de uso
     path('relaciones/<int:caso_uso_id>/', views.obtener_relaciones_caso_uso, name='obtener_relaciones_caso_uso'),
+    path('jerarquia/<int:caso_uso_id>/', views.jerarquia_caso_uso, name='jerarquia_caso_uso'),
+
+    # Trazabilidad con requisitos
+    path('vinculos/<int:caso_uso_id>/', views.vincular_requisitos_caso_uso, name='vincular_requisitos_caso_uso'),
 ]
\ No newline at end of file
@@ -1,10 +1,13 @@
-from django.http import JsonResponse
+from app.instrumentacion import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
-from django.shortcuts import get_object_or_404
-from casosdeuso.models import CasosUso, RelacionesCasosUso, EstadosElemento, TiposRelacionCu, Prioridades
+from django.db import transaction, connection
+from django.shortcuts import get_object_or_404, aget_object_or_404
+from casosdeuso.models import CasosUso, RelacionesCasosUso, EstadosElemento, TiposRelacionCu, Prioridades, CasosUsoClausura, CasosUsoRequisitos
+from requisitos.vinculos import ACCIONES, VinculosInvalidos, normalizar_ids, ids_fuera_de_proyecto, aplicar_vinculos
+from casosdeuso.clausura import actualizar_clausura, TIPOS_JERARQUICOS
 from proyectos.models import Proyectos
+from proyectos.revisiones import instantanea, registrar_revision
 from usuarios.views import validar_token
 import json
 
@@ -115,6 +118,7 @@ def crear_caso_uso(request):
                 estado_id=estado_id,
                 activo=True
             )
+            registrar_revision('caso_uso', caso_uso, usuario_id=payload.get('usuario_id'))
 
             # Guardar relaciones
             relaciones_creadas = []
@@ -147,6 +151,10 @@ def crear_caso_uso(request):
                     except Exception:
                         continue
 
+            # Mantener la clausura de jerarquías
+            with connection.cursor() as cursor:
+                actualizar_clausura(cursor, caso_uso.id, caso_uso.proyecto_id)
+
         response_data = {
             'mensaje': 'Caso de uso creado exitosamente',
             'caso_uso_id': caso_uso.id,
@@ -167,34 +175,31 @@ def crear_caso_uso(request):
 # Obtener un caso de uso específico
 # -----------------------------
 @require_http_methods(["GET"])
-def obtener_caso_uso(request, caso_uso_id):
+async def obtener_caso_uso(request, caso_uso_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        # Obtener el caso de uso
-        caso_uso = get_object_or_404(CasosUso, id=caso_uso_id, activo=True)
+        # Obtener el caso de uso (con sus catálogos: en async no hay carga perezosa)
+        caso_uso = await aget_object_or_404(
+            CasosUso.objects.select_related('estado', 'prioridad'), id=caso_uso_id, activo=True
+        )
 
-        # Obtener las relaciones del caso de uso (usar campo correcto)
+        # Obtener las relaciones del caso de uso, omitiendo las que apuntan a casos eliminados
         relaciones = RelacionesCasosUso.objects.filter(
-            caso_uso_origen_id=caso_uso.id
+            caso_uso_origen_id=caso_uso.id,
+            caso_uso_destino__activo=True
         ).select_related('tipo_relacion')
 
         relaciones_data = []
-        for rel in relaciones:
-            # Obtener caso de uso destino
-            try:
-                caso_destino = CasosUso.objects.get(id=rel.caso_uso_destino_id, activo=True)
-                relaciones_data.append({
-                    'id': rel.id,
-                    'casoUsoRelacionado': rel.caso_uso_destino_id,
-                    'tipo': str(rel.tipo_relacion_id),
-                    'descripcion': rel.descripcion or ''
-                })
-            except CasosUso.DoesNotExist:
-                # Skip relaciones con casos de uso eliminados
-                continue
+        async for rel in relaciones:
+            relaciones_data.append({
+                'id': rel.id,
+                'casoUsoRelacionado': rel.caso_uso_destino_id,
+                'tipo': str(rel.tipo_relacion_id),
+                'descripcion': rel.descripcion or ''
+            })
 
         data = {
             'id': caso_uso.id,
@@ -233,72 +238,76 @@ def actualizar_caso_uso(request, caso_uso_id):
         data = json.loads(request.body.decode('utf-8'))
         
         # Obtener el caso de uso existente
-        caso_uso = get_object_or_404(CasosUso, id=caso_uso_id, activo=True)
-
-        # Actualizar campos si vienen en la petición
-        if 'nombre' in data:
-            if not data['nombre'] or len(data['nombre'].strip()) == 0:
-                return JsonResponse({'error': 'El nombre es obligatorio'}, status=400)
-            if len(data['nombre'].strip()) > 100:
-                return JsonResponse({'error': 'El nombre no puede exceder 100 caracteres'}, status=400)
-            caso_uso.nombre = data['nombre'].strip()
-
-        if 'descripcion' in data:
-            caso_uso.descripcion = data['descripcion'] or ''
-
-        if 'actores' in data:
-            actores = data['actores']
-            if isinstance(actores, list):
-                actores = ', '.join(actores)
-            if not actores or len(actores.strip()) == 0:
-                return JsonResponse({'error': 'Los actores son obligatorios'}, status=400)
-            caso_uso.actores = actores
-
-        if 'precondiciones' in data:
-            if not data['precondiciones'] or len(data['precondiciones'].strip()) == 0:
-                return JsonResponse({'error': 'Las precondiciones son obligatorias'}, status=400)
-            caso_uso.precondiciones = data['precondiciones']
-
-        if 'flujo_principal' in data:
-            caso_uso.flujo_principal = data['flujo_principal'] or []
-
-        if 'flujos_alternativos' in data:
-            caso_uso.flujos_alternativos = data['flujos_alternativos'] or []
-
-        if 'postcondiciones' in data:
-            caso_uso.postcondiciones = data['postcondiciones'] or ''
-
-        if 'requisitos_especiales' in data:
-            caso_uso.requisitos_especiales = data['requisitos_especiales'] or ''
-
-        if 'riesgos_consideraciones' in data:
-            caso_uso.riesgos_consideraciones = data['riesgos_consideraciones'] or ''
-
-        if 'prioridad_id' in data:
-            if data['prioridad_id']:
+        with transaction.atomic():
+            # Fila bloqueada hasta el final: la instantánea es exactamente el estado que
+            # reemplaza este cambio, también con actualizaciones concurrentes
+            caso_uso = get_object_or_404(CasosUso.objects.select_for_update(), id=caso_uso_id, activo=True)
+            anterior = instantanea('caso_uso', caso_uso)
+
+            # Actualizar campos si vienen en la petición
+            if 'nombre' in data:
+                if not data['nombre'] or len(data['nombre'].strip()) == 0:
+                    return JsonResponse({'error': 'El nombre es obligatorio'}, status=400)
+                if len(data['nombre'].strip()) > 100:
+                    return JsonResponse({'error': 'El nombre no puede exceder 100 caracteres'}, status=400)
+                caso_uso.nombre = data['nombre'].strip()
+
+            if 'descripcion' in data:
+                caso_uso.descripcion = data['descripcion'] or ''
+
+            if 'actores' in data:
+                actores = data['actores']
+                if isinstance(actores, list):
+                    actores = ', '.join(actores)
+                if not actores or len(actores.strip()) == 0:
+                    return JsonResponse({'error': 'Los actores son obligatorios'}, status=400)
+                caso_uso.actores = actores
+
+            if 'precondiciones' in data:
+                if not data['precondiciones'] or len(data['precondiciones'].strip()) == 0:
+                    return JsonResponse({'error': 'Las precondiciones son obligatorias'}, status=400)
+                caso_uso.precondiciones = data['precondiciones']
+
+            if 'flujo_principal' in data:
+                caso_uso.flujo_principal = data['flujo_principal'] or []
+
+            if 'flujos_alternativos' in data:
+                caso_uso.flujos_alternativos = data['flujos_alternativos'] or []
+
+            if 'postcondiciones' in data:
+                caso_uso.postcondiciones = data['postcondiciones'] or ''
+
+            if 'requisitos_especiales' in data:
+                caso_uso.requisitos_especiales = data['requisitos_especiales'] or ''
+
+            if 'riesgos_consideraciones' in data:
+                caso_uso.riesgos_consideraciones = data['riesgos_consideraciones'] or ''
+
+            if 'prioridad_id' in data:
+                if data['prioridad_id']:
+                    try:
+                        Prioridades.objects.get(id=data['prioridad_id'])
+                        caso_uso.prioridad_id = data['prioridad_id']
+                    except Prioridades.DoesNotExist:
+                        return JsonResponse({'error': 'La prioridad especificada no existe'}, status=400)
+                else:
+                    caso_uso.prioridad_id = None
+
+            # Manejar estado_id correctamente
+            estado_id = data.get('estado_id') or data.get('estado')
+            if estado_id:
                 try:
-                    Prioridades.objects.get(id=data['prioridad_id'])
-                    caso_uso.prioridad_id = data['prioridad_id']
-                except Prioridades.DoesNotExist:
-                    return JsonResponse({'error': 'La prioridad especificada no existe'}, status=400)
-            else:
-                caso_uso.prioridad_id = None
-
-        # Manejar estado_id correctamente
-        estado_id = data.get('estado_id') or data.get('estado')
-        if estado_id:
-            try:
-                estado_id = int(estado_id)
-                EstadosElemento.objects.get(id=estado_id, tipo='caso_uso')
-                caso_uso.estado_id = estado_id
-            except (ValueError, TypeError):
-                pass  # si no es válido, simplemente no lo actualiza
-            except EstadosElemento.DoesNotExist:
-                return JsonResponse({'error': 'El estado especificado no existe'}, status=400)
+                    estado_id = int(estado_id)
+                    EstadosElemento.objects.get(id=estado_id, tipo='caso_uso')
+                    caso_uso.estado_id = estado_id
+                except (ValueError, TypeError):
+                    pass  # si no es válido, simplemente no lo actualiza
+                except EstadosElemento.DoesNotExist:
+                    return JsonResponse({'error': 'El estado especificado no existe'}, status=400)
 
-        with transaction.atomic():
             # Guardar los cambios del caso de uso
             caso_uso.save()
+            registrar_revision('caso_uso', caso_uso, anterior, payload.get('usuario_id'))
 
             # Actualizar relaciones si vienen en la petición
             if 'relaciones' in data:
@@ -336,6 +345,10 @@ def actualizar_caso_uso(request, caso_uso_id):
                         except (ValueError, TypeError, CasosUso.DoesNotExist, TiposRelacionCu.DoesNotExist):
                             continue
 
+                # Mantener la clausura de jerarquías
+                with connection.cursor() as cursor:
+                    actualizar_clausura(cursor, caso_uso.id, caso_uso.proyecto_id)
+
         return JsonResponse({
             'mensaje': 'Caso de uso actualizado exitosamente',
             'caso_uso_id': caso_uso.id
@@ -357,12 +370,14 @@ def eliminar_caso_uso(request, caso_uso_id):
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        caso_uso = get_object_or_404(CasosUso, id=caso_uso_id, activo=True)
-
         with transaction.atomic():
+            caso_uso = get_object_or_404(CasosUso.objects.select_for_update(), id=caso_uso_id, activo=True)
+            anterior = instantanea('caso_uso', caso_uso)
+
             # Soft delete del caso de uso
             caso_uso.activo = False
             caso_uso.save()
+            registrar_revision('caso_uso', caso_uso, anterior, payload.get('usuario_id'))
 
             # Eliminar todas las relaciones donde este caso de uso aparece
             RelacionesCasosUso.objects.filter(
@@ -373,6 +388,10 @@ def eliminar_caso_uso(request, caso_uso_id):
                 caso_uso_destino_id=caso_uso.id
             ).delete()
 
+            # Quitar el caso de uso de la clausura de jerarquías
+            with connection.cursor() as cursor:
+                actualizar_clausura(cursor, caso_uso.id, caso_uso.proyecto_id)
+
         return JsonResponse({
             'mensaje': 'Caso de uso eliminado exitosamente'
         }, status=200)
@@ -384,46 +403,36 @@ def eliminar_caso_uso(request, caso_uso_id):
 # Listar casos de uso de un proyecto
 # -----------------------------
 @require_http_methods(["GET"])
-def listar_casos_uso(request, proyecto_id):
+async def listar_casos_uso(request, proyecto_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
         # Validar que el proyecto existe
-        try:
-            Proyectos.objects.get(id=proyecto_id, activo=True)
-        except Proyectos.DoesNotExist:
+        if not await Proyectos.objects.filter(id=proyecto_id, activo=True).aexists():
             return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
 
         # Obtener casos de uso del proyecto
-        casos_uso = CasosUso.objects.filter(
-            proyecto_id=proyecto_id, 
-         activo=True
-        ).select_related('estado').prefetch_related('prioridad').order_by('-fecha_creacion')
-        
-        # Obtener todas las relaciones para incluir el conteo
+        casos_uso = [cu async for cu in CasosUso.objects.filter(
+            proyecto_id=proyecto_id,
+            activo=True
+        ).select_related('estado', 'prioridad').order_by('-fecha_creacion')]
+
+        # Obtener todas las relaciones (con el nombre del caso destino en la misma consulta)
         relaciones_por_caso = {}
         relaciones = RelacionesCasosUso.objects.filter(
-            caso_uso_origen_id__in=[cu.id for cu in casos_uso]
-        ).select_related('tipo_relacion')
-        
-        for rel in relaciones:
-            caso_id = rel.caso_uso_origen_id
-            if caso_id not in relaciones_por_caso:
-                relaciones_por_caso[caso_id] = []
-            
-            # Obtener info del caso de uso destino
-            try:
-                caso_destino = CasosUso.objects.get(id=rel.caso_uso_destino_id, activo=True)
-                relaciones_por_caso[caso_id].append({
-                    'id': rel.id,
-                    'tipo': rel.tipo_relacion.nombre if rel.tipo_relacion else '',
-                    'descripcion': rel.descripcion or '',
-                    'caso_destino': caso_destino.nombre
-                })
-            except CasosUso.DoesNotExist:
-                continue
+            caso_uso_origen_id__in=[cu.id for cu in casos_uso],
+            caso_uso_destino__activo=True
+        ).select_related('tipo_relacion', 'caso_uso_destino')
+
+        async for rel in relaciones:
+            relaciones_por_caso.setdefault(rel.caso_uso_origen_id, []).append({
+                'id': rel.id,
+                'tipo': rel.tipo_relacion.nombre if rel.tipo_relacion else '',
+                'descripcion': rel.descripcion or '',
+                'caso_destino': rel.caso_uso_destino.nombre
+            })
 
         data = []
         for cu in casos_uso:
@@ -456,35 +465,121 @@ def listar_casos_uso(request, proyecto_id):
 # Obtener relaciones de un caso de uso específico
 # -----------------------------
 @require_http_methods(["GET"])
-def obtener_relaciones_caso_uso(request, caso_uso_id):
+async def obtener_relaciones_caso_uso(request, caso_uso_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
         # Validar que el caso de uso existe
-        caso_uso = get_object_or_404(CasosUso, id=caso_uso_id, activo=True)
+        caso_uso = await aget_object_or_404(CasosUso, id=caso_uso_id, activo=True)
 
-        # Obtener relaciones donde este caso de uso es el origen
+        # Obtener relaciones donde este caso de uso es el origen y el destino sigue activo
         relaciones = RelacionesCasosUso.objects.filter(
-            caso_uso_origen_id=caso_uso.id
+            caso_uso_origen_id=caso_uso.id,
+            caso_uso_destino__activo=True
         ).select_related('tipo_relacion')
 
         data = []
-        for rel in relaciones:
-            # Verificar que el caso de uso destino existe
-            try:
-                caso_destino = CasosUso.objects.get(id=rel.caso_uso_destino_id, activo=True)
-                data.append({
-                    'id': rel.id,
-                    'casoUsoRelacionado': rel.caso_uso_destino_id,
-                    'tipo': str(rel.tipo_relacion_id),
-                    'descripcion': rel.descripcion or ''
-                })
-            except CasosUso.DoesNotExist:
-                continue
+        async for rel in relaciones:
+            data.append({
+                'id': rel.id,
+                'casoUsoRelacionado': rel.caso_uso_destino_id,
+                'tipo': str(rel.tipo_relacion_id),
+                'descripcion': rel.descripcion or ''
+            })
 
         return JsonResponse({'relaciones': data}, status=200)
 
     except Exception as e:
-        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+# -----------------------------
+# Ancestros o descendientes de un caso de uso (clausura de jerarquías)
+# -----------------------------
+@require_http_methods(["GET"])
+def jerarquia_caso_uso(request, caso_uso_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        caso_uso = get_object_or_404(CasosUso, id=caso_uso_id, activo=True)
+
+        # ?direccion=ancestros|descendientes y ?tipo=include|extend|generalizacion (opcional)
+        direccion = request.GET.get('direccion', 'descendientes')
+        if direccion not in ('ancestros', 'descendientes'):
+            return JsonResponse({'error': 'La dirección debe ser ancestros o descendientes'}, status=400)
+
+        tipo = request.GET.get('tipo')
+        if tipo and tipo not in TIPOS_JERARQUICOS:
+            return JsonResponse({'error': 'El tipo de relación especificado no es jerárquico'}, status=400)
+
+        if direccion == 'ancestros':
+            filas = CasosUsoClausura.objects.filter(descendiente_id=caso_uso.id)
+            relacionado = 'ancestro'
+        else:
+            filas = CasosUsoClausura.objects.filter(ancestro_id=caso_uso.id)
+            relacionado = 'descendiente'
+
+        if tipo:
+            filas = filas.filter(tipo_relacion__nombre=tipo)
+
+        filas = filas.values_list(
+            f'{relacionado}_id', f'{relacionado}__nombre', 'tipo_relacion__nombre', 'profundidad'
+        ).order_by('profundidad', f'{relacionado}_id')
+
+        data = [
+            {'id': cu_id, 'nombre': nombre, 'tipo': tipo_nombre, 'profundidad': profundidad}
+            for cu_id, nombre, tipo_nombre, profundidad in filas
+        ]
+
+        return JsonResponse({'caso_uso_id': caso_uso.id, 'direccion': direccion, direccion: data}, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+# -----------------------------
+# Vínculos de trazabilidad de un caso de uso (agregar / quitar / reemplazar)
+# -----------------------------
+@csrf_exempt
+@require_http_methods(["POST"])
+def vincular_requisitos_caso_uso(request, caso_uso_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        caso_uso = get_object_or_404(CasosUso, id=caso_uso_id, activo=True)
+
+        accion = data.get('accion')
+        if accion not in ACCIONES:
+            return JsonResponse({'error': 'La acción debe ser agregar, quitar o reemplazar'}, status=400)
+
+        try:
+            requisitos_ids = normalizar_ids(data.get('requisitos', []), 'requisitos')
+        except VinculosInvalidos as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Todos los requisitos deben pertenecer al mismo proyecto (una consulta)
+        invalidos = ids_fuera_de_proyecto(caso_uso.proyecto_id, {'requisitos': requisitos_ids})
+        if invalidos:
+            return JsonResponse({
+                'error': 'Hay requisitos que no existen o no pertenecen al proyecto',
+                'invalidos': invalidos
+            }, status=400)
+
+        with transaction.atomic():
+            vinculados = aplicar_vinculos(CasosUsoRequisitos, 'caso_uso', caso_uso.id, 'requisito', requisitos_ids, accion)
+
+        return JsonResponse({
+            'mensaje': 'Vínculos actualizados exitosamente',
+            'caso_uso_id': caso_uso.id,
+            'requisitos': vinculados
+        }, status=200)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
@@ -1,4 +1,4 @@
-from django.http import JsonResponse
+from app.instrumentacion import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
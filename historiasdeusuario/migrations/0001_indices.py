@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('proyectos', '0001_esquema_base'),
+    ]
+
+    operations = [
+        # Listado por proyecto ordenado por fecha (reemplaza al parcial solo por proyecto_id).
+        # historias_estimaciones.historia_id ya está cubierto por UNIQUE(historia_id, tipo_estimacion_id)
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_historias_usuario_proyecto_fecha_activo "
+            "ON historias_usuario (proyecto_id, fecha_creacion DESC) WHERE activo = TRUE",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_historias_usuario_proyecto_fecha_activo",
+        ),
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_historias_usuario_proyecto_activo",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_historias_usuario_proyecto_activo "
+            "ON historias_usuario (proyecto_id) WHERE activo = TRUE",
+        ),
+    ]
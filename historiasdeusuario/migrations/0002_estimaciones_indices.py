@@ -0,0 +1,36 @@
+# Tabla e índice de bd.sql que pueden faltar en las instalaciones que ya existían: la
+# primera versión de bd.sql creaba historias_estimaciones antes que historias_usuario y
+# fallaba, y el índice por requisito llegó después. En una base nueva ya están y
+# IF NOT EXISTS no hace nada; al revertir no se borran porque pertenecen a bd.sql.
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('historiasdeusuario', '0001_indices'),
+    ]
+
+    operations = [
+        migrations.RunSQL("""
+            CREATE TABLE IF NOT EXISTS historias_estimaciones (
+                id SERIAL PRIMARY KEY,
+                historia_id INTEGER NOT NULL REFERENCES historias_usuario(id) ON DELETE CASCADE,
+                tipo_estimacion_id INTEGER NOT NULL REFERENCES tipos_estimacion(id),
+                valor NUMERIC(10,2) NOT NULL,
+                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                activo BOOLEAN DEFAULT TRUE,
+                UNIQUE(historia_id, tipo_estimacion_id)
+            )
+        """, migrations.RunSQL.noop),
+        # Historias vinculadas a un requisito (trazabilidad y cobertura)
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_historias_requisitos_requisito "
+            "ON historias_requisitos (requisito_id)",
+            migrations.RunSQL.noop,
+        ),
+    ]
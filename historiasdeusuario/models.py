@@ -1,6 +1,7 @@
 # historias/models.py
 from django.db import models
 from proyectos.models import Proyectos
+from requisitos.models import Requisitos
 from django.utils import timezone
 
 class EstadosElemento(models.Model):
@@ -84,4 +85,19 @@ class HistoriasEstimaciones(models.Model):
         unique_together = (('historia', 'tipo_estimacion'),)
 
     def __str__(self):
-        return f"{self.historia.titulo} - {self.tipo_estimacion.nombre}: {self.valor}"
\ No newline at end of file
+        return f"{self.historia.titulo} - {self.tipo_estimacion.nombre}: {self.valor}"
+
+
+class HistoriasRequisitos(models.Model):
+    historia = models.ForeignKey(HistoriasUsuario, related_name="requisitos_vinculados", on_delete=models.DO_NOTHING, db_column='historia_id')
+    requisito = models.ForeignKey(Requisitos, related_name="historias_vinculadas", on_delete=models.DO_NOTHING, db_column='requisito_id')
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        managed = False
+        db_table = 'historias_requisitos'
+        unique_together = (('historia', 'requisito'),)
+
+    def __str__(self):
+        return f"HU {self.historia_id} -> RQ {self.requisito_id}"
@@ -1,3 +1,58 @@
-from django.test import TestCase
+from app.pruebas import PruebaApi, PruebaPlanes
+from historiasdeusuario.models import HistoriasEstimaciones, HistoriasRequisitos, HistoriasUsuario
 
-# Create your tests here.
+
+class PlanesConsultasTests(PruebaPlanes):
+    """Las consultas frecuentes de historias de usuario no deben recorrer tablas grandes enteras."""
+
+    def test_listar_historias(self):
+        self.assertSinSeqScan(
+            HistoriasUsuario.objects.filter(proyecto_id=self.proyecto_id, activo=True)
+            .select_related('prioridad', 'estado').order_by('-fecha_creacion')
+        )
+
+    def test_estimaciones_de_las_historias_listadas(self):
+        self.assertSinSeqScan(
+            HistoriasEstimaciones.objects.filter(historia_id__in=self.ids['historia_usuario'], activo=True)
+            .select_related('tipo_estimacion').order_by('historia_id', 'id')
+        )
+
+    def test_estimaciones_de_una_historia(self):
+        self.assertSinSeqScan(
+            HistoriasEstimaciones.objects.filter(historia_id=self.historia_id, activo=True).select_related('tipo_estimacion')
+        )
+
+    def test_requisitos_vinculados(self):
+        self.assertSinSeqScan(HistoriasRequisitos.objects.filter(historia_id=self.historia_id, activo=True))
+
+
+class VinculosTests(PruebaApi):
+    """Acciones de /historiasdeusuario/vinculos/ sobre los requisitos de una historia."""
+
+    def setUp(self):
+        self.historia_id = self.proyecto['ids']['historia_usuario'][0]
+        self.requisitos = self.proyecto['ids']['requisito'][:3]
+        self.ruta = f'/app/historiasdeusuario/vinculos/{self.historia_id}/'
+
+    def vinculados(self):
+        return sorted(HistoriasRequisitos.objects.filter(historia_id=self.historia_id, activo=True)
+                      .values_list('requisito_id', flat=True))
+
+    def test_agregar_quitar_y_reemplazar(self):
+        respuesta = self.post_json(self.ruta, {'accion': 'agregar', 'requisitos': self.requisitos[:2]})
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(respuesta.json()['requisitos'], self.requisitos[:2])
+
+        respuesta = self.post_json(self.ruta, {'accion': 'quitar', 'requisitos': [self.requisitos[0]]})
+        self.assertEqual(respuesta.json()['requisitos'], [self.requisitos[1]])
+
+        respuesta = self.post_json(self.ruta, {'accion': 'reemplazar', 'requisitos': [self.requisitos[2]]})
+        self.assertEqual(respuesta.json()['requisitos'], [self.requisitos[2]])
+        self.assertEqual(self.vinculados(), [self.requisitos[2]])
+
+    def test_requisito_de_otro_proyecto(self):
+        ajeno = self.otro_proyecto['ids']['requisito'][0]
+        respuesta = self.post_json(self.ruta, {'accion': 'agregar', 'requisitos': [ajeno]})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['invalidos'], {'requisitos': [ajeno]})
+        self.assertEqual(self.vinculados(), [])
@@ -9,4 +9,7 @@ urlpatterns = [
     path('obtener/<int:historia_id>/', views.obtener_historia_usuario, name='obtener_historia_usuario'),
     path('actualizar/<int:historia_id>/', views.actualizar_historia_usuario, name='actualizar_historia_usuario'),
     path('eliminar/<int:historia_id>/', views.eliminar_historia_usuario, name='eliminar_historia_usuario'),
+
+    # Trazabilidad con requisitos
+    path('vinculos/<int:historia_id>/', views.vincular_requisitos_historia, name='vincular_requisitos_historia'),
 ]
\ No newline at end of file
@@ -1,21 +1,33 @@
 # historias/views.py
-from django.http import JsonResponse
+from app.instrumentacion import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, aget_object_or_404
 from historiasdeusuario.models import (
     HistoriasUsuario, 
     EstadosElemento, 
     Prioridades, 
     TiposEstimacion, 
-    HistoriasEstimaciones
+    HistoriasEstimaciones,
+    HistoriasRequisitos
 )
+from requisitos.vinculos import ACCIONES, VinculosInvalidos, normalizar_ids, ids_fuera_de_proyecto, aplicar_vinculos
 from proyectos.models import Proyectos
+from proyectos.revisiones import instantanea, registrar_revision
 from usuarios.views import validar_token
 import json
 from decimal import Decimal, InvalidOperation
 
+
+def _datos_estimacion(est):
+    return {
+        'id': est.id,
+        'tipo_estimacion_id': est.tipo_estimacion.id,
+        'tipo_estimacion_nombre': est.tipo_estimacion.nombre,
+        'valor': float(est.valor)
+    }
+
 # -----------------------------
 # Crear historia de usuario
 # -----------------------------
@@ -98,6 +110,7 @@ def crear_historia_usuario(request):
                 proyecto_id=proyecto_id,
                 activo=True
             )
+            registrar_revision('historia_usuario', historia, usuario_id=payload.get('usuario_id'))
 
             # CORRECCIÓN: Procesar estimaciones correctamente
             estimaciones_creadas = []
@@ -167,14 +180,16 @@ def crear_historia_usuario(request):
 # Obtener una historia de usuario específica
 # -----------------------------
 @require_http_methods(["GET"])
-def obtener_historia_usuario(request, historia_id):
+async def obtener_historia_usuario(request, historia_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        # Obtener la historia de usuario
-        historia = get_object_or_404(HistoriasUsuario, id=historia_id, activo=True)
+        # Obtener la historia de usuario (con sus catálogos: en async no hay carga perezosa)
+        historia = await aget_object_or_404(
+            HistoriasUsuario.objects.select_related('prioridad', 'estado'), id=historia_id, activo=True
+        )
 
         def safe_key_conversion(value):
             if not value:
@@ -188,13 +203,8 @@ def obtener_historia_usuario(request, historia_id):
         ).select_related('tipo_estimacion')
 
         estimaciones_data = []
-        for est in estimaciones:
-            estimaciones_data.append({
-                'id': est.id,
-                'tipo_estimacion_id': est.tipo_estimacion.id,
-                'tipo_estimacion_nombre': est.tipo_estimacion.nombre,
-                'valor': float(est.valor)
-            })
+        async for est in estimaciones:
+            estimaciones_data.append(_datos_estimacion(est))
 
         data = {
             'id': historia.id,
@@ -242,73 +252,77 @@ def actualizar_historia_usuario(request, historia_id):
         data = json.loads(request.body.decode('utf-8'))
         
         # Obtener la historia existente
-        historia = get_object_or_404(HistoriasUsuario, id=historia_id, activo=True)
-
-        # Campos que se pueden actualizar
-        if 'titulo' in data:
-            if not data['titulo'] or len(data['titulo']) < 5:
-                return JsonResponse({'error': 'El título debe tener al menos 5 caracteres'}, status=400)
-            historia.titulo = data['titulo']
-
-        if 'descripcion' in data:
-            historia.descripcion = data['descripcion'] or ''
-
-        if 'actor_rol' in data:
-            historia.actor_rol = data['actor_rol'] or ''
-
-        if 'funcionalidad_accion' in data:
-            historia.funcionalidad_accion = data['funcionalidad_accion'] or ''
-
-        if 'beneficio_razon' in data:
-            historia.beneficio_razon = data['beneficio_razon'] or ''
-
-        if 'criterios_aceptacion' in data:
-            if not data['criterios_aceptacion'] or len(data['criterios_aceptacion']) < 10:
-                return JsonResponse({'error': 'Los criterios de aceptación deben tener al menos 10 caracteres'}, status=400)
-            historia.criterios_aceptacion = data['criterios_aceptacion']
-
-        if 'dependencias_relaciones' in data:
-            historia.dependencias_relaciones = data['dependencias_relaciones'] or ''
-
-        if 'componentes_relacionados' in data:
-            historia.componentes_relacionados = data['componentes_relacionados'] or ''
-
-        if 'notas_adicionales' in data:
-            historia.notas_adicionales = data['notas_adicionales'] or ''
-
-        if 'prioridad_id' in data:
-            if data['prioridad_id']:
-                try:
-                    Prioridades.objects.get(id=data['prioridad_id'])
-                    historia.prioridad_id = data['prioridad_id']
-                except Prioridades.DoesNotExist:
-                    return JsonResponse({'error': 'La prioridad especificada no existe'}, status=400)
-            else:
-                historia.prioridad_id = None
-
-        if 'estado_id' in data and data['estado_id']:
-            try:
-                EstadosElemento.objects.get(id=data['estado_id'])
-                historia.estado_id = data['estado_id']
-            except EstadosElemento.DoesNotExist:
-                return JsonResponse({'error': 'El estado especificado no existe'}, status=400)
-
-        if 'valor_negocio' in data:
-            valor_negocio = data['valor_negocio']
-            if valor_negocio is not None:
+        with transaction.atomic():
+            # Fila bloqueada hasta el final: la instantánea es exactamente el estado que
+            # reemplaza este cambio, también con actualizaciones concurrentes
+            historia = get_object_or_404(HistoriasUsuario.objects.select_for_update(), id=historia_id, activo=True)
+            anterior = instantanea('historia_usuario', historia)
+
+            # Campos que se pueden actualizar
+            if 'titulo' in data:
+                if not data['titulo'] or len(data['titulo']) < 5:
+                    return JsonResponse({'error': 'El título debe tener al menos 5 caracteres'}, status=400)
+                historia.titulo = data['titulo']
+
+            if 'descripcion' in data:
+                historia.descripcion = data['descripcion'] or ''
+
+            if 'actor_rol' in data:
+                historia.actor_rol = data['actor_rol'] or ''
+
+            if 'funcionalidad_accion' in data:
+                historia.funcionalidad_accion = data['funcionalidad_accion'] or ''
+
+            if 'beneficio_razon' in data:
+                historia.beneficio_razon = data['beneficio_razon'] or ''
+
+            if 'criterios_aceptacion' in data:
+                if not data['criterios_aceptacion'] or len(data['criterios_aceptacion']) < 10:
+                    return JsonResponse({'error': 'Los criterios de aceptación deben tener al menos 10 caracteres'}, status=400)
+                historia.criterios_aceptacion = data['criterios_aceptacion']
+
+            if 'dependencias_relaciones' in data:
+                historia.dependencias_relaciones = data['dependencias_relaciones'] or ''
+
+            if 'componentes_relacionados' in data:
+                historia.componentes_relacionados = data['componentes_relacionados'] or ''
+
+            if 'notas_adicionales' in data:
+                historia.notas_adicionales = data['notas_adicionales'] or ''
+
+            if 'prioridad_id' in data:
+                if data['prioridad_id']:
+                    try:
+                        Prioridades.objects.get(id=data['prioridad_id'])
+                        historia.prioridad_id = data['prioridad_id']
+                    except Prioridades.DoesNotExist:
+                        return JsonResponse({'error': 'La prioridad especificada no existe'}, status=400)
+                else:
+                    historia.prioridad_id = None
+
+            if 'estado_id' in data and data['estado_id']:
                 try:
-                    valor_negocio = int(valor_negocio)
-                    if valor_negocio < 1 or valor_negocio > 100:
-                        return JsonResponse({'error': 'El valor de negocio debe estar entre 1 y 100'}, status=400)
-                    historia.valor_negocio = valor_negocio
-                except (ValueError, TypeError):
-                    return JsonResponse({'error': 'El valor de negocio debe ser un número entero'}, status=400)
-            else:
-                historia.valor_negocio = None
+                    EstadosElemento.objects.get(id=data['estado_id'])
+                    historia.estado_id = data['estado_id']
+                except EstadosElemento.DoesNotExist:
+                    return JsonResponse({'error': 'El estado especificado no existe'}, status=400)
+
+            if 'valor_negocio' in data:
+                valor_negocio = data['valor_negocio']
+                if valor_negocio is not None:
+                    try:
+                        valor_negocio = int(valor_negocio)
+                        if valor_negocio < 1 or valor_negocio > 100:
+                            return JsonResponse({'error': 'El valor de negocio debe estar entre 1 y 100'}, status=400)
+                        historia.valor_negocio = valor_negocio
+                    except (ValueError, TypeError):
+                        return JsonResponse({'error': 'El valor de negocio debe ser un número entero'}, status=400)
+                else:
+                    historia.valor_negocio = None
 
-        with transaction.atomic():
             # Guardar los cambios de la historia
             historia.save()
+            registrar_revision('historia_usuario', historia, anterior, payload.get('usuario_id'))
             
             # CORRECCIÓN: Actualizar estimaciones correctamente
             estimaciones_actualizadas = 0
@@ -317,63 +331,65 @@ def actualizar_historia_usuario(request, historia_id):
                 estimaciones = data['estimaciones']
                 print(f"Actualizando estimaciones: recibidas {len(estimaciones) if estimaciones else 0}")
                 
-                # Marcar todas las estimaciones existentes como inactivas
-                estimaciones_previas = HistoriasEstimaciones.objects.filter(historia=historia, activo=True).count()
-                HistoriasEstimaciones.objects.filter(historia=historia).update(activo=False)
-                print(f"Marcadas como inactivas: {estimaciones_previas} estimaciones previas")
-
-                # Procesar las nuevas estimaciones
+                # Normalizar las estimaciones recibidas (la última por tipo prevalece)
+                valores_por_tipo = {}
                 if estimaciones and isinstance(estimaciones, list):
                     for i, est in enumerate(estimaciones):
                         tipo_estimacion_id = est.get('tipo_estimacion_id')
                         valor = est.get('valor')
 
-                        print(f"Procesando estimación {i}: tipo_id={tipo_estimacion_id}, valor={valor}")
+                        if not tipo_estimacion_id or valor is None:
+                            continue
 
-                        if tipo_estimacion_id and valor is not None:
-                            try:
-                                # Validar que el tipo de estimación existe
-                                tipo_estimacion = TiposEstimacion.objects.get(id=tipo_estimacion_id, activo=True)
-                                
-                                # Convertir y validar valor
-                                valor_decimal = Decimal(str(valor))
-                                if valor_decimal <= 0:
-                                    print(f"Valor inválido: {valor}")
-                                    continue
-
-                                # Buscar si ya existe una estimación para este tipo
-                                estimacion_existente = HistoriasEstimaciones.objects.filter(
-                                    historia=historia,
-                                    tipo_estimacion=tipo_estimacion
-                                ).first()
-
-                                if estimacion_existente:
-                                    # Actualizar la existente
-                                    estimacion_existente.valor = valor_decimal
-                                    estimacion_existente.activo = True
-                                    estimacion_existente.save()
-                                    print(f"Estimación actualizada: ID={estimacion_existente.id}")
-                                else:
-                                    # Crear nueva
-                                    estimacion_existente = HistoriasEstimaciones.objects.create(
-                                        historia=historia,
-                                        tipo_estimacion=tipo_estimacion,
-                                        valor=valor_decimal,
-                                        activo=True
-                                    )
-                                    print(f"Nueva estimación creada: ID={estimacion_existente.id}")
-
-                                estimaciones_actualizadas += 1
-
-                            except TiposEstimacion.DoesNotExist:
-                                print(f"Tipo de estimación {tipo_estimacion_id} no existe")
-                                continue
-                            except (InvalidOperation, ValueError) as e:
-                                print(f"Error al procesar estimación: {e}")
-                                continue
-                            except Exception as e:
-                                print(f"Error inesperado al procesar estimación: {e}")
-                                continue
+                        try:
+                            tipo_estimacion_id = int(tipo_estimacion_id)
+                            valor_decimal = Decimal(str(valor))
+                        except (InvalidOperation, ValueError, TypeError) as e:
+                            print(f"Error al procesar estimación {i}: {e}")
+                            continue
+
+                        if valor_decimal <= 0:
+                            print(f"Valor inválido: {valor}")
+                            continue
+
+                        valores_por_tipo[tipo_estimacion_id] = valor_decimal
+
+                # Validar todos los tipos de estimación en una sola consulta
+                tipos_validos = set(
+                    TiposEstimacion.objects.filter(
+                        id__in=valores_por_tipo.keys(),
+                        activo=True
+                    ).values_list('id', flat=True)
+                ) if valores_por_tipo else set()
+
+                for tipo_estimacion_id in set(valores_por_tipo) - tipos_validos:
+                    print(f"Tipo de estimación {tipo_estimacion_id} no existe")
+                    del valores_por_tipo[tipo_estimacion_id]
+
+                # Desactivar las estimaciones de los tipos que ya no vienen
+                HistoriasEstimaciones.objects.filter(
+                    historia=historia,
+                    activo=True
+                ).exclude(tipo_estimacion_id__in=valores_por_tipo.keys()).update(activo=False)
+
+                # INSERT ... ON CONFLICT (historia_id, tipo_estimacion_id) DO UPDATE
+                if valores_por_tipo:
+                    HistoriasEstimaciones.objects.bulk_create(
+                        [
+                            HistoriasEstimaciones(
+                                historia=historia,
+                                tipo_estimacion_id=tipo_estimacion_id,
+                                valor=valor_decimal,
+                                activo=True
+                            )
+                            for tipo_estimacion_id, valor_decimal in valores_por_tipo.items()
+                        ],
+                        update_conflicts=True,
+                        unique_fields=['historia', 'tipo_estimacion'],
+                        update_fields=['valor', 'activo', 'fecha_actualizacion']
+                    )
+
+                estimaciones_actualizadas = len(valores_por_tipo)
 
         print(f"Historia actualizada: ID={historia.id}, Estimaciones actualizadas: {estimaciones_actualizadas}")
 
@@ -400,12 +416,14 @@ def eliminar_historia_usuario(request, historia_id):
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        historia = get_object_or_404(HistoriasUsuario, id=historia_id, activo=True)
-
         with transaction.atomic():
+            historia = get_object_or_404(HistoriasUsuario.objects.select_for_update(), id=historia_id, activo=True)
+            anterior = instantanea('historia_usuario', historia)
+
             # Soft delete de la historia
             historia.activo = False
             historia.save()
+            registrar_revision('historia_usuario', historia, anterior, payload.get('usuario_id'))
 
             # Eliminar todas las estimaciones relacionadas (hard delete)
             HistoriasEstimaciones.objects.filter(historia=historia).delete()
@@ -421,45 +439,39 @@ def eliminar_historia_usuario(request, historia_id):
 # Listar historias de usuario de un proyecto
 # -----------------------------
 @require_http_methods(["GET"])
-def listar_historias_usuario(request, proyecto_id):
+async def listar_historias_usuario(request, proyecto_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
         # Validar que el proyecto existe
-        try:
-            Proyectos.objects.get(id=proyecto_id, activo=True)
-        except Proyectos.DoesNotExist:
+        if not await Proyectos.objects.filter(id=proyecto_id, activo=True).aexists():
             return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
 
         # Obtener historias de usuario del proyecto
-        historias = HistoriasUsuario.objects.filter(
-            proyecto_id=proyecto_id, 
+        historias = [h async for h in HistoriasUsuario.objects.filter(
+            proyecto_id=proyecto_id,
             activo=True
-        ).select_related('prioridad', 'estado').order_by('-fecha_creacion')
+        ).select_related('prioridad', 'estado').order_by('-fecha_creacion')]
+
+        def safe_key_conversion(value):
+            if not value:
+                return None
+            return value.lower().replace(' ', '-').replace('ó', 'o').replace('í', 'i')
+
+        # Estimaciones de todas las historias en una sola consulta, agrupadas por historia
+        estimaciones_por_historia = {}
+        estimaciones = HistoriasEstimaciones.objects.filter(
+            historia_id__in=[h.id for h in historias],
+            activo=True
+        ).select_related('tipo_estimacion').order_by('historia_id', 'id')
+        async for est in estimaciones:
+            estimaciones_por_historia.setdefault(est.historia_id, []).append(_datos_estimacion(est))
 
         data = []
         for h in historias:
-            def safe_key_conversion(value):
-                if not value:
-                    return None
-                return value.lower().replace(' ', '-').replace('ó', 'o').replace('í', 'i')
-
-            # CORRECCIÓN: Obtener estimaciones para la lista
-            estimaciones = HistoriasEstimaciones.objects.filter(
-                historia=h,
-                activo=True
-            ).select_related('tipo_estimacion')
-
-            estimaciones_data = []
-            for est in estimaciones:
-                estimaciones_data.append({
-                    'id': est.id,
-                    'tipo_estimacion_id': est.tipo_estimacion.id,
-                    'tipo_estimacion_nombre': est.tipo_estimacion.nombre,
-                    'valor': float(est.valor)
-                })
+            estimaciones_data = estimaciones_por_historia.get(h.id, [])
 
             historia_data = {
                 'id': h.id,
@@ -494,14 +506,14 @@ def listar_historias_usuario(request, proyecto_id):
 # Obtener estimaciones de una historia específica
 # -----------------------------
 @require_http_methods(["GET"])
-def obtener_estimaciones_historia(request, historia_id):
+async def obtener_estimaciones_historia(request, historia_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
         # Validar que la historia existe
-        historia = get_object_or_404(HistoriasUsuario, id=historia_id, activo=True)
+        historia = await aget_object_or_404(HistoriasUsuario, id=historia_id, activo=True)
 
         # Obtener estimaciones de la historia
         estimaciones = HistoriasEstimaciones.objects.filter(
@@ -509,16 +521,54 @@ def obtener_estimaciones_historia(request, historia_id):
             activo=True
         ).select_related('tipo_estimacion')
 
-        data = []
-        for est in estimaciones:
-            data.append({
-                'id': est.id,
-                'tipo_estimacion_id': est.tipo_estimacion.id,
-                'tipo_estimacion_nombre': est.tipo_estimacion.nombre,
-                'valor': float(est.valor)
-            })
+        data = [_datos_estimacion(est) async for est in estimaciones]
 
         return JsonResponse({'estimaciones': data}, status=200)
 
     except Exception as e:
-        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+# -----------------------------
+# Vínculos de trazabilidad de una historia de usuario (agregar / quitar / reemplazar)
+# -----------------------------
+@csrf_exempt
+@require_http_methods(["POST"])
+def vincular_requisitos_historia(request, historia_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        historia = get_object_or_404(HistoriasUsuario, id=historia_id, activo=True)
+
+        accion = data.get('accion')
+        if accion not in ACCIONES:
+            return JsonResponse({'error': 'La acción debe ser agregar, quitar o reemplazar'}, status=400)
+
+        try:
+            requisitos_ids = normalizar_ids(data.get('requisitos', []), 'requisitos')
+        except VinculosInvalidos as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Todos los requisitos deben pertenecer al mismo proyecto (una consulta)
+        invalidos = ids_fuera_de_proyecto(historia.proyecto_id, {'requisitos': requisitos_ids})
+        if invalidos:
+            return JsonResponse({
+                'error': 'Hay requisitos que no existen o no pertenecen al proyecto',
+                'invalidos': invalidos
+            }, status=400)
+
+        with transaction.atomic():
+            vinculados = aplicar_vinculos(HistoriasRequisitos, 'historia', historia.id, 'requisito', requisitos_ids, accion)
+
+        return JsonResponse({
+            'mensaje': 'Vínculos actualizados exitosamente',
+            'historia_id': historia.id,
+            'requisitos': vinculados
+        }, status=200)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
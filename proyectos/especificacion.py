@@ -0,0 +1,309 @@
+# proyectos/especificacion.py
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.html import escape
+
+from requisitos.models import Requisitos, RelacionesRequisitos
+from casosdeuso.models import CasosUso
+from historiasdeusuario.models import HistoriasUsuario
+from requisitos.trazabilidad import vinculos_casos_uso, vinculos_historias
+
+FORMATOS_ESPECIFICACION = ('md', 'html', 'pdf')
+
+# Subir la versión invalida todos los fragmentos (cambio de plantilla o de catálogos)
+VERSION_FRAGMENTOS = 1
+TIEMPO_CACHE_FRAGMENTO = 60 * 60 * 24 * 7
+# Alias de CACHES compartido por todos los procesos (ver app/settings.py)
+CACHE_FRAGMENTOS = 'fragmentos'
+TAMANO_LOTE = 500
+
+
+# -----------------------------
+# Estructura de cada artefacto (independiente del formato)
+# -----------------------------
+def _estructura_requisito(r):
+    return {
+        'ancla': f"req-{r['id']}",
+        'titulo': f"REQ-{r['id']} {r['nombre']}",
+        'meta': [
+            ('Tipo', r['tipo__nombre']),
+            ('Prioridad', r['prioridad__nombre']),
+            ('Estado', r['estado__nombre']),
+            ('Origen', r['origen']),
+        ],
+        'secciones': [
+            ('Descripción', r['descripcion']),
+            ('Criterios de aceptación', r['criterios']),
+            ('Condiciones previas', r['condiciones_previas']),
+        ],
+    }
+
+
+def _estructura_caso_uso(c):
+    return {
+        'ancla': f"cu-{c['id']}",
+        'titulo': f"CU-{c['id']} {c['nombre']}",
+        'meta': [
+            ('Actores', c['actores']),
+            ('Prioridad', c['prioridad__nombre']),
+            ('Estado', c['estado__nombre']),
+        ],
+        'secciones': [
+            ('Descripción', c['descripcion']),
+            ('Precondiciones', c['precondiciones']),
+            ('Flujo principal', c['flujo_principal']),
+            ('Flujos alternativos', c['flujos_alternativos']),
+            ('Postcondiciones', c['postcondiciones']),
+            ('Requisitos especiales', c['requisitos_especiales']),
+            ('Riesgos y consideraciones', c['riesgos_consideraciones']),
+        ],
+    }
+
+
+def _estructura_historia(h):
+    enunciado = None
+    if h['actor_rol'] or h['funcionalidad_accion'] or h['beneficio_razon']:
+        enunciado = (
+            f"Como {h['actor_rol'] or '...'}, quiero {h['funcionalidad_accion'] or '...'} "
+            f"para {h['beneficio_razon'] or '...'}."
+        )
+    return {
+        'ancla': f"hu-{h['id']}",
+        'titulo': f"HU-{h['id']} {h['titulo']}",
+        'meta': [
+            ('Prioridad', h['prioridad__nombre']),
+            ('Estado', h['estado__nombre']),
+            ('Valor de negocio', h['valor_negocio']),
+        ],
+        'secciones': [
+            ('Enunciado', enunciado),
+            ('Descripción', h['descripcion']),
+            ('Criterios de aceptación', h['criterios_aceptacion']),
+            ('Dependencias', h['dependencias_relaciones']),
+            ('Componentes relacionados', h['componentes_relacionados']),
+            ('Notas', h['notas_adicionales']),
+        ],
+    }
+
+
+# (título del capítulo, modelo, columnas, función de estructura)
+CAPITULOS = {
+    'requisitos': (
+        'Requisitos', Requisitos,
+        ['id', 'nombre', 'descripcion', 'criterios', 'origen', 'condiciones_previas',
+         'tipo__nombre', 'prioridad__nombre', 'estado__nombre'],
+        _estructura_requisito,
+    ),
+    'casos_uso': (
+        'Casos de uso', CasosUso,
+        ['id', 'nombre', 'descripcion', 'actores', 'precondiciones', 'flujo_principal',
+         'flujos_alternativos', 'postcondiciones', 'requisitos_especiales',
+         'riesgos_consideraciones', 'prioridad__nombre', 'estado__nombre'],
+        _estructura_caso_uso,
+    ),
+    'historias': (
+        'Historias de usuario', HistoriasUsuario,
+        ['id', 'titulo', 'descripcion', 'actor_rol', 'funcionalidad_accion', 'beneficio_razon',
+         'criterios_aceptacion', 'valor_negocio', 'dependencias_relaciones',
+         'componentes_relacionados', 'notas_adicionales', 'prioridad__nombre', 'estado__nombre'],
+        _estructura_historia,
+    ),
+}
+
+
+def _vacio(valor):
+    return valor is None or valor == '' or valor == [] or valor == {}
+
+
+# -----------------------------
+# Markdown
+# -----------------------------
+def _md_valor(valor, sangria=''):
+    if isinstance(valor, list):
+        return '\n'.join(
+            f"{sangria}{i}. " + _md_valor(v, sangria + '   ').lstrip()
+            for i, v in enumerate(valor, start=1)
+        )
+    if isinstance(valor, dict):
+        return '\n'.join(
+            f"{sangria}- **{k}:**\n" + _md_valor(v, sangria + '   ') if isinstance(v, (list, dict))
+            else f"{sangria}- **{k}:** {v}"
+            for k, v in valor.items() if not _vacio(v)
+        )
+    return str(valor)
+
+
+def _md_fragmento(estructura):
+    partes = [f"### {estructura['titulo']}\n"]
+    meta = ' · '.join(f"**{k}:** {v}" for k, v in estructura['meta'] if not _vacio(v))
+    if meta:
+        partes.append(meta + '\n')
+    for titulo, valor in estructura['secciones']:
+        if not _vacio(valor):
+            partes.append(f"**{titulo}**\n\n{_md_valor(valor)}\n")
+    return '\n'.join(partes) + '\n'
+
+
+# -----------------------------
+# HTML
+# -----------------------------
+def _html_valor(valor):
+    if isinstance(valor, list):
+        return '<ol>' + ''.join(f"<li>{_html_valor(v)}</li>" for v in valor) + '</ol>'
+    if isinstance(valor, dict):
+        return '<dl>' + ''.join(
+            f"<dt>{escape(k)}</dt><dd>{_html_valor(v)}</dd>" for k, v in valor.items() if not _vacio(v)
+        ) + '</dl>'
+    return escape(str(valor)).replace('\n', '<br>')
+
+
+def _html_fragmento(estructura):
+    partes = [f"<section id=\"{estructura['ancla']}\"><h3>{escape(estructura['titulo'])}</h3>"]
+    meta = ' · '.join(
+        f"<strong>{k}:</strong> {escape(str(v))}" for k, v in estructura['meta'] if not _vacio(v)
+    )
+    if meta:
+        partes.append(f"<p class=\"meta\">{meta}</p>")
+    for titulo, valor in estructura['secciones']:
+        if not _vacio(valor):
+            partes.append(f"<h4>{titulo}</h4><div>{_html_valor(valor)}</div>")
+    partes.append('</section>\n')
+    return ''.join(partes)
+
+
+ESTILO_HTML = """
+body { font-family: sans-serif; max-width: 60em; margin: 2em auto; line-height: 1.4; }
+section { border-top: 1px solid #ccc; padding-top: .5em; }
+.meta { color: #555; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #ccc; padding: .2em .5em; text-align: left; }
+"""
+
+RENDERIZADORES = {'md': _md_fragmento, 'html': _html_fragmento}
+
+
+# -----------------------------
+# Fragmentos en caché
+# -----------------------------
+def _clave_fragmento(formato, capitulo, elemento_id, fecha_actualizacion):
+    marca = fecha_actualizacion.isoformat() if fecha_actualizacion else ''
+    return f"srs:{VERSION_FRAGMENTOS}:{formato}:{capitulo}:{elemento_id}:{marca}"
+
+
+def _lote_fragmentos(formato, capitulo, lote):
+    """Fragmentos de un lote de (id, fecha_actualizacion): se piden en bloque a la caché
+    y solo los que faltan se consultan completos y se renderizan."""
+    _, modelo, columnas, estructura = CAPITULOS[capitulo]
+    claves = {elemento_id: _clave_fragmento(formato, capitulo, elemento_id, fecha) for elemento_id, fecha in lote}
+    cache = caches[CACHE_FRAGMENTOS]
+    en_cache = cache.get_many(list(claves.values()))
+
+    faltantes = [elemento_id for elemento_id, clave in claves.items() if clave not in en_cache]
+    if faltantes:
+        nuevos = {
+            claves[fila['id']]: RENDERIZADORES[formato](estructura(fila))
+            for fila in modelo.objects.filter(id__in=faltantes).values(*columnas)
+        }
+        cache.set_many(nuevos, timeout=TIEMPO_CACHE_FRAGMENTO)
+        en_cache.update(nuevos)
+
+    return [en_cache[claves[elemento_id]] for elemento_id, _ in lote if claves[elemento_id] in en_cache]
+
+
+def fragmentos_capitulo(proyecto_id, formato, capitulo):
+    modelo = CAPITULOS[capitulo][1]
+    lote = []
+    for fila in (
+        modelo.objects.filter(proyecto_id=proyecto_id, activo=True)
+        .order_by('id').values_list('id', 'fecha_actualizacion').iterator(chunk_size=2000)
+    ):
+        lote.append(fila)
+        if len(lote) >= TAMANO_LOTE:
+            yield from _lote_fragmentos(formato, capitulo, lote)
+            lote = []
+    if lote:
+        yield from _lote_fragmentos(formato, capitulo, lote)
+
+
+# -----------------------------
+# Anexo de relaciones y trazabilidad (sin caché: no cambia fecha_actualizacion)
+# -----------------------------
+def _filas_anexo(proyecto_id):
+    relaciones = RelacionesRequisitos.objects.filter(
+        activo=True,
+        requisito_origen__proyecto_id=proyecto_id,
+        requisito_origen__activo=True,
+        requisito_destino__activo=True
+    ).order_by('requisito_origen_id', 'requisito_destino_id').values_list(
+        'requisito_origen_id', 'tipo_relacion__nombre', 'requisito_destino_id'
+    )
+    yield 'relaciones', [
+        (f"REQ-{origen}", tipo, f"REQ-{destino}") for origen, tipo, destino in relaciones.iterator(chunk_size=2000)
+    ]
+
+    trazas = {}
+    for requisito_id, caso_uso_id in vinculos_casos_uso(proyecto_id).iterator(chunk_size=2000):
+        trazas.setdefault(requisito_id, ([], []))[0].append(f"CU-{caso_uso_id}")
+    for requisito_id, historia_id in vinculos_historias(proyecto_id).iterator(chunk_size=2000):
+        trazas.setdefault(requisito_id, ([], []))[1].append(f"HU-{historia_id}")
+    yield 'trazabilidad', [
+        (f"REQ-{requisito_id}", ', '.join(casos), ', '.join(historias))
+        for requisito_id, (casos, historias) in sorted(trazas.items())
+    ]
+
+
+ANEXOS = {
+    'relaciones': ('Relaciones entre requisitos', ('Origen', 'Relación', 'Destino')),
+    'trazabilidad': ('Matriz de trazabilidad', ('Requisito', 'Casos de uso', 'Historias de usuario')),
+}
+
+
+# -----------------------------
+# Documento completo
+# -----------------------------
+def generar_especificacion(proyecto, formato):
+    """Genera el documento por partes: encabezado, un capítulo por tipo de artefacto
+    (fragmentos en caché) y los anexos."""
+    fecha = timezone.localtime().strftime('%Y-%m-%d %H:%M')
+
+    if formato == 'md':
+        yield f"# Especificación de requisitos de software\n\n## {proyecto.nombre}\n\n"
+        if proyecto.descripcion:
+            yield f"{proyecto.descripcion}\n\n"
+        yield f"_Generado el {fecha}_\n\n"
+    else:
+        yield (
+            f"<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\">"
+            f"<title>ERS - {escape(proyecto.nombre)}</title><style>{ESTILO_HTML}</style></head><body>"
+            f"<h1>Especificación de requisitos de software</h1><h2>{escape(proyecto.nombre)}</h2>"
+        )
+        if proyecto.descripcion:
+            yield f"<p>{_html_valor(proyecto.descripcion)}</p>"
+        yield f"<p class=\"meta\">Generado el {fecha}</p>\n"
+
+    for numero, (capitulo, (titulo, _, _, _)) in enumerate(CAPITULOS.items(), start=1):
+        yield f"## {numero}. {titulo}\n\n" if formato == 'md' else f"<h2>{numero}. {titulo}</h2>\n"
+        yield from fragmentos_capitulo(proyecto.id, formato, capitulo)
+
+    for anexo, filas in _filas_anexo(proyecto.id):
+        if not filas:
+            continue
+        titulo, encabezados = ANEXOS[anexo]
+        if formato == 'md':
+            yield f"## Anexo: {titulo}\n\n| {' | '.join(encabezados)} |\n|{'---|' * len(encabezados)}\n"
+            yield ''.join(f"| {' | '.join(str(c) for c in fila)} |\n" for fila in filas) + '\n'
+        else:
+            yield f"<h2>Anexo: {titulo}</h2><table><tr>" + ''.join(f"<th>{e}</th>" for e in encabezados) + '</tr>'
+            yield ''.join(
+                '<tr>' + ''.join(f"<td>{escape(str(c))}</td>" for c in fila) + '</tr>' for fila in filas
+            ) + '</table>\n'
+
+    if formato == 'html':
+        yield '</body></html>'
+
+
+def generar_pdf(proyecto):
+    """PDF a partir del HTML; requiere WeasyPrint instalado (ImportError si no lo está)."""
+    from weasyprint import HTML
+
+    return HTML(string=''.join(generar_especificacion(proyecto, 'html'))).write_pdf()
@@ -0,0 +1,166 @@
+# proyectos/exportacion.py
+import csv
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import connection
+
+TIPOS_EXPORTACION = ('requisitos', 'casos_uso', 'historias')
+FORMATOS_EXPORTACION = ('csv', 'xlsx')
+
+
+def _consulta_requisitos(cursor, proyecto_id):
+    encabezados = [
+        'id', 'nombre', 'descripcion', 'tipo', 'criterios', 'prioridad', 'estado', 'origen',
+        'condiciones_previas', 'fecha_creacion', 'fecha_actualizacion', 'relaciones',
+        'casos_uso', 'historias',
+    ]
+    sql = """
+        SELECT r.id, r.nombre, r.descripcion, t.nombre, r.criterios, p.nombre, e.nombre, r.origen,
+               r.condiciones_previas, r.fecha_creacion, r.fecha_actualizacion,
+               (SELECT string_agg(tr.nombre || ':' || rr.requisito_destino_id, ';' ORDER BY rr.id)
+                FROM relaciones_requisitos rr
+                JOIN tipos_relacion_requisito tr ON tr.id = rr.tipo_relacion_id
+                WHERE rr.requisito_origen_id = r.id AND rr.activo = TRUE),
+               (SELECT string_agg(l.caso_uso_id::text, ';' ORDER BY l.caso_uso_id)
+                FROM casos_uso_requisitos l
+                WHERE l.requisito_id = r.id AND l.activo = TRUE),
+               (SELECT string_agg(l.historia_id::text, ';' ORDER BY l.historia_id)
+                FROM historias_requisitos l
+                WHERE l.requisito_id = r.id AND l.activo = TRUE)
+        FROM requisitos r
+        LEFT JOIN tipos_requisito t ON t.id = r.tipo_id
+        LEFT JOIN prioridades p ON p.id = r.prioridad_id
+        LEFT JOIN estados_elemento e ON e.id = r.estado_id
+        WHERE r.proyecto_id = %s AND r.activo = TRUE
+        ORDER BY r.id
+    """
+    return encabezados, sql, [proyecto_id]
+
+
+def _consulta_casos_uso(cursor, proyecto_id):
+    encabezados = [
+        'id', 'nombre', 'descripcion', 'actores', 'precondiciones', 'flujo_principal',
+        'flujos_alternativos', 'postcondiciones', 'requisitos_especiales',
+        'riesgos_consideraciones', 'prioridad', 'estado', 'fecha_creacion',
+        'fecha_actualizacion', 'relaciones', 'requisitos',
+    ]
+    sql = """
+        SELECT c.id, c.nombre, c.descripcion, c.actores, c.precondiciones, c.flujo_principal,
+               c.flujos_alternativos, c.postcondiciones, c.requisitos_especiales,
+               c.riesgos_consideraciones, p.nombre, e.nombre, c.fecha_creacion, c.fecha_actualizacion,
+               (SELECT string_agg(tr.nombre || ':' || rc.caso_uso_destino_id, ';' ORDER BY rc.id)
+                FROM relaciones_casos_uso rc
+                JOIN tipos_relacion_cu tr ON tr.id = rc.tipo_relacion_id
+                WHERE rc.caso_uso_origen_id = c.id AND rc.activo = TRUE),
+               (SELECT string_agg(l.requisito_id::text, ';' ORDER BY l.requisito_id)
+                FROM casos_uso_requisitos l
+                WHERE l.caso_uso_id = c.id AND l.activo = TRUE)
+        FROM casos_uso c
+        LEFT JOIN prioridades p ON p.id = c.prioridad_id
+        LEFT JOIN estados_elemento e ON e.id = c.estado_id
+        WHERE c.proyecto_id = %s AND c.activo = TRUE
+        ORDER BY c.id
+    """
+    return encabezados, sql, [proyecto_id]
+
+
+def _consulta_historias(cursor, proyecto_id):
+    # Una columna por tipo de estimación activo (catálogo pequeño)
+    cursor.execute("SELECT id, nombre FROM tipos_estimacion WHERE activo = TRUE ORDER BY id")
+    tipos_estimacion = cursor.fetchall()
+
+    columnas_estimacion = ''.join(
+        """,
+               (SELECT he.valor FROM historias_estimaciones he
+                WHERE he.historia_id = h.id AND he.tipo_estimacion_id = %s AND he.activo = TRUE)"""
+        for _ in tipos_estimacion
+    )
+    encabezados = [
+        'id', 'titulo', 'descripcion', 'actor_rol', 'funcionalidad_accion', 'beneficio_razon',
+        'criterios_aceptacion', 'prioridad', 'estado', 'valor_negocio', 'dependencias_relaciones',
+        'componentes_relacionados', 'notas_adicionales', 'fecha_creacion', 'fecha_actualizacion',
+        'requisitos',
+    ] + [f'estimacion_{nombre}' for _, nombre in tipos_estimacion]
+    sql = f"""
+        SELECT h.id, h.titulo, h.descripcion, h.actor_rol, h.funcionalidad_accion, h.beneficio_razon,
+               h.criterios_aceptacion, p.nombre, e.nombre, h.valor_negocio, h.dependencias_relaciones,
+               h.componentes_relacionados, h.notas_adicionales, h.fecha_creacion, h.fecha_actualizacion,
+               (SELECT string_agg(l.requisito_id::text, ';' ORDER BY l.requisito_id)
+                FROM historias_requisitos l
+                WHERE l.historia_id = h.id AND l.activo = TRUE){columnas_estimacion}
+        FROM historias_usuario h
+        LEFT JOIN prioridades p ON p.id = h.prioridad_id
+        LEFT JOIN estados_elemento e ON e.id = h.estado_id
+        WHERE h.proyecto_id = %s AND h.activo = TRUE
+        ORDER BY h.id
+    """
+    return encabezados, sql, [tipo_id for tipo_id, _ in tipos_estimacion] + [proyecto_id]
+
+
+CONSULTAS = {
+    'requisitos': _consulta_requisitos,
+    'casos_uso': _consulta_casos_uso,
+    'historias': _consulta_historias,
+}
+
+
+def _valor_celda(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def filas_exportacion(proyecto_id, tipo):
+    """Encabezados y luego cada fila, leídas de un cursor de servidor (memoria constante)."""
+    with connection.cursor() as cursor:
+        encabezados, sql, params = CONSULTAS[tipo](cursor, proyecto_id)
+    yield encabezados
+
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        for fila in cursor:
+            yield [_valor_celda(v) for v in fila]
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(proyecto_id, tipo):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel detecte UTF-8
+    yield '\ufeff'
+    for fila in filas_exportacion(proyecto_id, tipo):
+        yield escritor.writerow(fila)
+
+
+def generar_xlsx(proyecto_id, tipo):
+    """Escribe el libro con el modo write_only de openpyxl en un archivo temporal.
+
+    En write_only cada fila se serializa al agregarla, así la memoria no crece
+    con el número de filas. Devuelve el archivo posicionado al inicio.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=tipo)
+    for fila in filas_exportacion(proyecto_id, tipo):
+        hoja.append([ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v for v in fila])
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
@@ -0,0 +1,453 @@
+# proyectos/importacion.py
+import csv
+import io
+import json
+
+from django.db import connection, transaction
+
+from proyectos.revisiones import sql_revisiones_completas
+from requisitos.grafo import invalidar_grafo
+
+STAGING = 'importacion_staging'
+FORMATOS_IMPORTACION = ('csv', 'json')
+LIMITE_ERRORES = 1000
+
+# Columnas por tipo de artefacto:
+#   textos: (columna, longitud máxima, obligatoria al crear)
+#   catalogos: (columna, tabla, obligatoria al crear); la celda puede traer el id o el nombre
+ESPECIFICACIONES = {
+    'requisitos': {
+        'tabla': 'requisitos',
+        'tipo_elemento': 'requisito',
+        'textos': [
+            ('nombre', 200, True),
+            ('descripcion', None, True),
+            ('criterios', None, True),
+            ('origen', 100, False),
+            ('condiciones_previas', None, False),
+        ],
+        'json': [],
+        'enteros': [],
+        'catalogos': [('tipo', 'tipos_requisito', True)],
+    },
+    'casos_uso': {
+        'tabla': 'casos_uso',
+        'tipo_elemento': 'caso_uso',
+        'textos': [
+            ('nombre', 100, True),
+            ('descripcion', None, False),
+            ('actores', None, True),
+            ('precondiciones', None, True),
+            ('postcondiciones', None, False),
+            ('requisitos_especiales', None, False),
+            ('riesgos_consideraciones', None, False),
+        ],
+        'json': ['flujo_principal', 'flujos_alternativos'],
+        'enteros': [],
+        'catalogos': [],
+    },
+    'historias': {
+        'tabla': 'historias_usuario',
+        'tipo_elemento': 'historia_usuario',
+        'textos': [
+            ('titulo', 200, True),
+            ('descripcion', None, False),
+            ('actor_rol', 100, False),
+            ('funcionalidad_accion', 200, False),
+            ('beneficio_razon', 200, False),
+            ('criterios_aceptacion', None, True),
+            ('dependencias_relaciones', None, False),
+            ('componentes_relacionados', 200, False),
+            ('notas_adicionales', None, False),
+        ],
+        'json': [],
+        # (columna, mínimo, máximo)
+        'enteros': [('valor_negocio', 1, 100)],
+        'catalogos': [],
+    },
+}
+TIPOS_IMPORTACION = tuple(ESPECIFICACIONES)
+
+CATALOGOS_COMUNES = [('prioridad', 'prioridades', False), ('estado', 'estados_elemento', False)]
+
+# Encabezados alternativos aceptados (los de la API usan el sufijo _id)
+ALIAS = {'tipo_id': 'tipo', 'prioridad_id': 'prioridad', 'estado_id': 'estado'}
+
+ENTERO = r'^\s*\d{1,9}\s*$'
+
+
+class ImportacionInvalida(Exception):
+    pass
+
+
+# -----------------------------
+# Lectura incremental del archivo
+# -----------------------------
+def registros_csv(texto):
+    """(línea, dict) por cada fila del CSV; la línea es donde empieza el registro."""
+    lector = csv.DictReader(texto)
+    inicio = 2
+    for fila in lector:
+        yield inicio, fila
+        inicio = lector.line_num + 1
+
+
+def _objetos_json(texto, tam=65536):
+    """Recorre un arreglo JSON elemento a elemento sin cargar el archivo completo.
+
+    Mantiene un buffer con lo leído y decodifica cada elemento con raw_decode; si el
+    elemento queda cortado al final del buffer, lee más (al menos lo que ya hay, para
+    no volver a decodificar el mismo elemento demasiadas veces) y reintenta.
+    """
+    decodificador = json.JSONDecoder()
+    estado = {'buffer': '', 'fin': False}
+
+    def leer(minimo):
+        bloque = texto.read(max(tam, minimo))
+        if not bloque:
+            estado['fin'] = True
+        estado['buffer'] += bloque
+
+    def saltar_espacios(pos):
+        while True:
+            buffer = estado['buffer']
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or estado['fin']:
+                return pos
+            leer(0)
+
+    pos = saltar_espacios(0)
+    if estado['buffer'][pos:pos + 1] != '[':
+        raise ImportacionInvalida('El JSON debe ser un arreglo de objetos')
+    pos = saltar_espacios(pos + 1)
+    if estado['buffer'][pos:pos + 1] == ']':
+        return
+
+    while True:
+        try:
+            objeto, pos = decodificador.raw_decode(estado['buffer'], pos)
+        except json.JSONDecodeError as e:
+            if estado['fin']:
+                raise ImportacionInvalida(f'JSON inválido: {e.msg}')
+            leer(len(estado['buffer']) - pos)
+            continue
+
+        yield objeto
+
+        pos = saltar_espacios(pos)
+        separador = estado['buffer'][pos:pos + 1]
+        if separador == ']':
+            return
+        if separador != ',':
+            raise ImportacionInvalida('JSON inválido: se esperaba "," o "]" entre elementos')
+        # Descarta lo ya consumido para que el buffer no crezca con el archivo
+        estado['buffer'] = estado['buffer'][pos + 1:]
+        pos = saltar_espacios(0)
+
+
+def registros_json(texto):
+    """(posición, dict) por cada elemento del arreglo JSON."""
+    for posicion, objeto in enumerate(_objetos_json(texto), start=1):
+        if not isinstance(objeto, dict):
+            raise ImportacionInvalida(f'El elemento {posicion} del arreglo no es un objeto')
+        yield posicion, objeto
+
+
+def leer_registros(archivo, formato):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    return registros_csv(texto) if formato == 'csv' else registros_json(texto)
+
+
+# -----------------------------
+# Carga en la tabla de staging (COPY)
+# -----------------------------
+def _columnas(especificacion):
+    catalogos = especificacion['catalogos'] + CATALOGOS_COMUNES
+    return (
+        [c for c, _, _ in especificacion['textos']]
+        + especificacion['json']
+        + [c for c, _, _ in especificacion['enteros']]
+        + [c for c, _, _ in catalogos]
+    )
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    valor = str(valor).replace('\x00', '')
+    return valor if valor.strip() else None
+
+
+def _json(valor):
+    """Texto JSON válido: las celdas que no son JSON se guardan como cadena."""
+    if isinstance(valor, (list, dict)):
+        return json.dumps(valor, ensure_ascii=False)
+    valor = _texto(valor)
+    if valor is None:
+        return None
+    try:
+        json.loads(valor)
+        return valor
+    except ValueError:
+        return json.dumps(valor, ensure_ascii=False)
+
+
+def _filas_staging(registros, especificacion):
+    columnas = _columnas(especificacion)
+    columnas_json = set(especificacion['json'])
+    escritor = csv.writer(_Eco())
+
+    for linea, registro in registros:
+        normal = {}
+        for clave, valor in registro.items():
+            if clave is None:
+                continue
+            clave = clave.strip().lower()
+            normal[ALIAS.get(clave, clave)] = valor
+
+        fila = [linea, _texto(normal.get('id'))]
+        fila += [
+            _json(normal.get(c)) if c in columnas_json else _texto(normal.get(c))
+            for c in columnas
+        ]
+        yield escritor.writerow(fila)
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+class _FlujoCopia:
+    """Pseudo-archivo de solo lectura sobre un generador de líneas, para copy_expert."""
+
+    def __init__(self, lineas):
+        self._lineas = lineas
+        self._pendiente = ''
+
+    def read(self, tam=-1):
+        partes = [self._pendiente]
+        largo = len(self._pendiente)
+        while tam < 0 or largo < tam:
+            linea = next(self._lineas, None)
+            if linea is None:
+                break
+            partes.append(linea)
+            largo += len(linea)
+
+        datos = ''.join(partes)
+        if tam < 0:
+            self._pendiente = ''
+            return datos
+        self._pendiente = datos[tam:]
+        return datos[:tam]
+
+
+def _crear_staging(cursor, especificacion):
+    catalogos = especificacion['catalogos'] + CATALOGOS_COMUNES
+    columnas = ', '.join(f'{c} TEXT' for c in _columnas(especificacion))
+    resueltas = ', '.join(f'{c}_id INTEGER' for c, _, _ in catalogos)
+    cursor.execute(f"""
+        CREATE TEMP TABLE {STAGING} (
+            linea INTEGER NOT NULL,
+            id_texto TEXT,
+            {columnas},
+            destino_id INTEGER,
+            {resueltas},
+            error TEXT
+        ) ON COMMIT DROP
+    """)
+
+
+def _copiar(cursor, registros, especificacion):
+    columnas = ', '.join(['linea', 'id_texto'] + _columnas(especificacion))
+    flujo = _FlujoCopia(_filas_staging(registros, especificacion))
+    cursor.copy_expert(f"COPY {STAGING} ({columnas}) FROM STDIN WITH (FORMAT csv)", flujo, size=65536)
+    cursor.execute(f"ANALYZE {STAGING}")
+
+
+# -----------------------------
+# Validación por conjuntos
+# -----------------------------
+def _marcar(cursor, condicion, mensaje, params=None):
+    """Agrega un mensaje de error a todas las filas que cumplen la condición (un solo UPDATE)."""
+    cursor.execute(
+        f"UPDATE {STAGING} SET error = concat_ws('; ', error, %(mensaje)s) WHERE {condicion}",
+        dict(params or {}, mensaje=mensaje)
+    )
+
+
+def _validar(cursor, proyecto_id, especificacion):
+    tabla = especificacion['tabla']
+    params = {'proyecto': proyecto_id, 'tipo_elemento': especificacion['tipo_elemento']}
+
+    # Filas con id: deben existir, estar activas y pertenecer al proyecto
+    _marcar(cursor, f"id_texto IS NOT NULL AND id_texto !~ '{ENTERO}'", 'El id no es un entero')
+    cursor.execute(f"""
+        UPDATE {STAGING} s SET destino_id = t.id
+        FROM {tabla} t
+        WHERE t.id = CASE WHEN s.id_texto ~ '{ENTERO}' THEN btrim(s.id_texto)::int END
+          AND t.proyecto_id = %(proyecto)s AND t.activo = TRUE
+    """, params)
+    _marcar(
+        cursor,
+        f"id_texto ~ '{ENTERO}' AND destino_id IS NULL",
+        'El id no corresponde a un elemento activo del proyecto'
+    )
+    _marcar(cursor, f"""
+        linea IN (
+            SELECT linea FROM (
+                SELECT linea, row_number() OVER (PARTITION BY destino_id ORDER BY linea) AS n
+                FROM {STAGING} WHERE destino_id IS NOT NULL
+            ) repetidas WHERE n > 1
+        )
+    """, 'El id aparece más de una vez en el archivo')
+
+    # Obligatorios (solo al crear) y longitudes
+    for columna, maximo, obligatoria in especificacion['textos']:
+        if obligatoria:
+            _marcar(cursor, f"destino_id IS NULL AND {columna} IS NULL", f'El campo {columna} es obligatorio')
+        if maximo:
+            _marcar(
+                cursor,
+                f"char_length({columna}) > {maximo}",
+                f'El campo {columna} no puede exceder {maximo} caracteres'
+            )
+
+    for columna, minimo, maximo in especificacion['enteros']:
+        _marcar(
+            cursor,
+            f"""{columna} IS NOT NULL AND (
+                {columna} !~ '{ENTERO}'
+                OR CASE WHEN {columna} ~ '{ENTERO}' THEN btrim({columna})::int NOT BETWEEN {minimo} AND {maximo} END
+            )""",
+            f'El campo {columna} debe ser un número entero entre {minimo} y {maximo}'
+        )
+
+    # Catálogos: se resuelven por id o por nombre en un UPDATE ... FROM por catálogo
+    for columna, catalogo, obligatoria in especificacion['catalogos'] + CATALOGOS_COMUNES:
+        filtro = "AND c.tipo = %(tipo_elemento)s" if catalogo == 'estados_elemento' else ''
+        cursor.execute(f"""
+            UPDATE {STAGING} s SET {columna}_id = c.id
+            FROM {catalogo} c
+            WHERE s.{columna} IS NOT NULL {filtro}
+              AND (
+                  c.id = CASE WHEN s.{columna} ~ '{ENTERO}' THEN btrim(s.{columna})::int END
+                  OR lower(c.nombre) = lower(btrim(s.{columna}))
+              )
+        """, params)
+        _marcar(
+            cursor,
+            f"{columna} IS NOT NULL AND {columna}_id IS NULL",
+            f'El valor de {columna} no existe en el catálogo'
+        )
+        if obligatoria:
+            _marcar(cursor, f"destino_id IS NULL AND {columna} IS NULL", f'El campo {columna} es obligatorio')
+
+
+# -----------------------------
+# Fusión con las tablas reales
+# -----------------------------
+def _fusionar(cursor, proyecto_id, especificacion):
+    tabla = especificacion['tabla']
+    textos = [c for c, _, _ in especificacion['textos']]
+    obligatorias = {c for c, _, o in especificacion['textos'] if o}
+    enteros = [c for c, _, _ in especificacion['enteros']]
+    catalogos = [c for c, _, _ in especificacion['catalogos'] + CATALOGOS_COMUNES]
+
+    # Actualización: las celdas vacías conservan el valor actual
+    asignaciones = (
+        [f"{c} = COALESCE(s.{c}, t.{c})" for c in textos]
+        + [f"{c} = COALESCE(s.{c}::jsonb, t.{c})" for c in especificacion['json']]
+        + [f"{c} = COALESCE(btrim(s.{c})::int, t.{c})" for c in enteros]
+        + [f"{c}_id = COALESCE(s.{c}_id, t.{c}_id)" for c in catalogos]
+    )
+    # Cada fila tocada recibe una revisión completa en la misma sentencia (CTE con RETURNING)
+    revision = sql_revisiones_completas(especificacion['tipo_elemento'], 'cambiados')
+    cursor.execute(f"""
+        WITH cambiados AS (
+            UPDATE {tabla} t SET {', '.join(asignaciones)}, fecha_actualizacion = CURRENT_TIMESTAMP
+            FROM {STAGING} s
+            WHERE t.id = s.destino_id AND s.error IS NULL
+            RETURNING t.*
+        )
+        {revision}
+    """)
+    actualizados = cursor.rowcount
+
+    # Inserción: mismos valores por defecto que los endpoints de creación
+    columnas = textos + especificacion['json'] + enteros + [f'{c}_id' for c in catalogos]
+    valores = (
+        [f"s.{c}" if c in obligatorias else f"COALESCE(s.{c}, '')" for c in textos]
+        + [f"COALESCE(s.{c}::jsonb, '[]'::jsonb)" for c in especificacion['json']]
+        + [f"btrim(s.{c})::int" for c in enteros]
+        + [f"COALESCE(s.{c}_id, 1)" if c == 'estado' else f"s.{c}_id" for c in catalogos]
+    )
+    cursor.execute(f"""
+        WITH cambiados AS (
+            INSERT INTO {tabla} ({', '.join(columnas)}, proyecto_id, fecha_creacion, fecha_actualizacion, activo)
+            SELECT {', '.join(valores)}, %(proyecto)s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, TRUE
+            FROM {STAGING} s
+            WHERE s.destino_id IS NULL AND s.error IS NULL
+            ORDER BY s.linea
+            RETURNING *
+        )
+        {revision}
+    """, {'proyecto': proyecto_id})
+    insertados = cursor.rowcount
+
+    return actualizados, insertados
+
+
+def importar(proyecto_id, tipo, registros, parcial=False):
+    """Importa los registros a la tabla del tipo indicado en una sola transacción.
+
+    Los registros se copian con COPY a una tabla temporal (sin WAL), se validan con
+    un UPDATE por regla y se fusionan: las filas con id actualizan el elemento del
+    proyecto, el resto se insertan. Si hay errores y no se pidió una importación
+    parcial, no se modifica nada. Si cambian requisitos, el grafo cacheado del proyecto se
+    descarta al confirmar la transacción.
+    """
+    especificacion = ESPECIFICACIONES[tipo]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            _crear_staging(cursor, especificacion)
+            _copiar(cursor, registros, especificacion)
+            _validar(cursor, proyecto_id, especificacion)
+
+            cursor.execute(f"""
+                SELECT COUNT(*), COUNT(*) FILTER (WHERE error IS NOT NULL) FROM {STAGING}
+            """)
+            total_filas, total_errores = cursor.fetchone()
+
+            cursor.execute(f"""
+                SELECT linea, error FROM {STAGING}
+                WHERE error IS NOT NULL
+                ORDER BY linea
+                LIMIT %s
+            """, [LIMITE_ERRORES])
+            errores = [{'linea': linea, 'error': error} for linea, error in cursor.fetchall()]
+
+            actualizados = insertados = 0
+            if parcial or total_errores == 0:
+                actualizados, insertados = _fusionar(cursor, proyecto_id, especificacion)
+
+            # analizar_grafo incluye todos los requisitos activos, no solo los relacionados
+            if tipo == 'requisitos' and (actualizados or insertados):
+                invalidar_grafo(proyecto_id)
+
+            cursor.execute(f"DROP TABLE {STAGING}")
+
+    return {
+        'total_filas': total_filas,
+        'insertados': insertados,
+        'actualizados': actualizados,
+        'total_errores': total_errores,
+        'errores': errores,
+    }
@@ -0,0 +1,181 @@
+# proyectos/lineas_base.py
+import hashlib
+import json
+import zlib
+
+from django.db import connection, transaction
+
+from proyectos.models import LineasBase, ContenidosLineaBase, LineasBaseElementos
+
+TAMANO_LOTE = 1000
+
+# Columnas que no forman parte del contenido (cambian sin que cambie el artefacto)
+EXCLUIDAS = "- 'id' - 'proyecto_id' - 'fecha_creacion' - 'fecha_actualizacion' - 'activo'"
+
+# Contenido de cada artefacto como jsonb, construido en Postgres. Las relaciones
+# salientes viajan con su origen y los vínculos de trazabilidad con el requisito,
+# así un cambio en ellos cambia el hash del artefacto que los posee.
+CONTENIDOS = {
+    'requisito': f"""
+        SELECT r.id, (to_jsonb(r) {EXCLUIDAS}) || jsonb_build_object(
+            'relaciones', COALESCE((
+                SELECT jsonb_agg(jsonb_build_array(rr.tipo_relacion_id, rr.requisito_destino_id, rr.descripcion)
+                                 ORDER BY rr.tipo_relacion_id, rr.requisito_destino_id)
+                FROM relaciones_requisitos rr
+                WHERE rr.requisito_origen_id = r.id AND rr.activo = TRUE), '[]'::jsonb),
+            'casos_uso', COALESCE((
+                SELECT jsonb_agg(l.caso_uso_id ORDER BY l.caso_uso_id)
+                FROM casos_uso_requisitos l
+                WHERE l.requisito_id = r.id AND l.activo = TRUE), '[]'::jsonb),
+            'historias', COALESCE((
+                SELECT jsonb_agg(l.historia_id ORDER BY l.historia_id)
+                FROM historias_requisitos l
+                WHERE l.requisito_id = r.id AND l.activo = TRUE), '[]'::jsonb)
+        )
+        FROM requisitos r
+        WHERE r.proyecto_id = %s AND r.activo = TRUE
+        ORDER BY r.id
+    """,
+    'caso_uso': f"""
+        SELECT c.id, (to_jsonb(c) {EXCLUIDAS}) || jsonb_build_object(
+            'relaciones', COALESCE((
+                SELECT jsonb_agg(jsonb_build_array(rc.tipo_relacion_id, rc.caso_uso_destino_id, rc.descripcion)
+                                 ORDER BY rc.tipo_relacion_id, rc.caso_uso_destino_id)
+                FROM relaciones_casos_uso rc
+                WHERE rc.caso_uso_origen_id = c.id AND rc.activo = TRUE), '[]'::jsonb)
+        )
+        FROM casos_uso c
+        WHERE c.proyecto_id = %s AND c.activo = TRUE
+        ORDER BY c.id
+    """,
+    'historia_usuario': f"""
+        SELECT h.id, (to_jsonb(h) {EXCLUIDAS}) || jsonb_build_object(
+            'estimaciones', COALESCE((
+                SELECT jsonb_agg(jsonb_build_array(he.tipo_estimacion_id, he.valor) ORDER BY he.tipo_estimacion_id)
+                FROM historias_estimaciones he
+                WHERE he.historia_id = h.id AND he.activo = TRUE), '[]'::jsonb)
+        )
+        FROM historias_usuario h
+        WHERE h.proyecto_id = %s AND h.activo = TRUE
+        ORDER BY h.id
+    """,
+}
+TIPOS_ELEMENTO = tuple(CONTENIDOS)
+
+
+def _canonico(contenido):
+    return json.dumps(contenido, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _guardar_lote(cursor, linea_base_id, tipo, lote):
+    """Guarda un lote de (elemento_id, hash, json) y solo comprime los contenidos nuevos.
+
+    FOR KEY SHARE sobre los contenidos existentes impide que la purga los borre
+    antes de que esta transacción los referencie.
+    """
+    hashes = list({h for _, h, _ in lote})
+    cursor.execute(
+        "SELECT hash, id FROM contenidos_linea_base WHERE hash = ANY(%s) FOR KEY SHARE",
+        [hashes]
+    )
+    ids = dict(cursor.fetchall())
+
+    nuevos = {h: datos for _, h, datos in lote if h not in ids}
+    if nuevos:
+        ContenidosLineaBase.objects.bulk_create(
+            [ContenidosLineaBase(hash=h, contenido=zlib.compress(datos), tamano=len(datos)) for h, datos in nuevos.items()],
+            ignore_conflicts=True
+        )
+        cursor.execute(
+            "SELECT hash, id FROM contenidos_linea_base WHERE hash = ANY(%s) FOR KEY SHARE",
+            [list(nuevos)]
+        )
+        ids.update(cursor.fetchall())
+
+    LineasBaseElementos.objects.bulk_create([
+        LineasBaseElementos(linea_base_id=linea_base_id, tipo=tipo, elemento_id=elemento_id, contenido_id=ids[h])
+        for elemento_id, h, _ in lote
+    ])
+    return len(nuevos)
+
+
+def crear_linea_base(proyecto, nombre, descripcion=''):
+    """Congela los artefactos activos del proyecto y devuelve (línea base, contenidos nuevos).
+
+    Cada artefacto se serializa a JSON canónico y se identifica por su sha256; los
+    que no cambiaron desde una línea base anterior reutilizan el contenido ya guardado.
+    Fuera de otra transacción se usa REPEATABLE READ para que los tres tipos de
+    artefacto se lean de la misma instantánea.
+    """
+    aislar = not connection.in_atomic_block
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if aislar:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+            linea_base = LineasBase.objects.create(
+                proyecto=proyecto, nombre=nombre, descripcion=descripcion, activo=True
+            )
+
+            total = nuevos = 0
+            for tipo, sql in CONTENIDOS.items():
+                lote = []
+                with connection.chunked_cursor() as lector:
+                    lector.execute(sql, [proyecto.id])
+                    for elemento_id, contenido in lector:
+                        datos = _canonico(contenido)
+                        lote.append((elemento_id, hashlib.sha256(datos).hexdigest(), datos))
+                        if len(lote) >= TAMANO_LOTE:
+                            nuevos += _guardar_lote(cursor, linea_base.id, tipo, lote)
+                            total += len(lote)
+                            lote = []
+                if lote:
+                    nuevos += _guardar_lote(cursor, linea_base.id, tipo, lote)
+                    total += len(lote)
+
+            linea_base.total_elementos = total
+            linea_base.save(update_fields=['total_elementos'])
+
+    return linea_base, nuevos
+
+
+def comparar_lineas_base(anterior_id, posterior_id):
+    """Diferencias entre dos líneas base comparando solo el contenido_id de cada artefacto.
+
+    Como el contenido está direccionado por hash, mismo contenido_id significa mismo
+    contenido; no se descomprime nada.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT COALESCE(a.tipo, b.tipo), COALESCE(a.elemento_id, b.elemento_id),
+                   CASE WHEN a.id IS NULL THEN 'agregados'
+                        WHEN b.id IS NULL THEN 'eliminados'
+                        ELSE 'modificados' END
+            FROM (SELECT * FROM lineas_base_elementos WHERE linea_base_id = %s) a
+            FULL OUTER JOIN (SELECT * FROM lineas_base_elementos WHERE linea_base_id = %s) b
+                ON b.tipo = a.tipo AND b.elemento_id = a.elemento_id
+            WHERE a.contenido_id IS DISTINCT FROM b.contenido_id
+            ORDER BY 1, 2
+        """, [anterior_id, posterior_id])
+        filas = cursor.fetchall()
+
+    diferencias = {tipo: {'agregados': [], 'eliminados': [], 'modificados': []} for tipo in TIPOS_ELEMENTO}
+    for tipo, elemento_id, cambio in filas:
+        diferencias[tipo][cambio].append(elemento_id)
+
+    resumen = {
+        cambio: sum(len(d[cambio]) for d in diferencias.values())
+        for cambio in ('agregados', 'eliminados', 'modificados')
+    }
+    return {'resumen': resumen, 'diferencias': diferencias}
+
+
+def contenido_elemento(linea_base_id, tipo, elemento_id):
+    """Contenido de un artefacto tal como quedó en la línea base (None si no estaba)."""
+    elemento = LineasBaseElementos.objects.filter(
+        linea_base_id=linea_base_id, tipo=tipo, elemento_id=elemento_id
+    ).select_related('contenido').first()
+    if not elemento:
+        return None
+    return json.loads(zlib.decompress(bytes(elemento.contenido.contenido)))
@@ -0,0 +1,115 @@
+# proyectos/management/commands/generar_datos.py
+import multiprocessing
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from proyectos.sinteticos import GeneradorProyectos, analizar_tablas, generar_usuarios
+
+
+def _generar_proyecto(tarea):
+    """Genera un proyecto en su propia transacción (se ejecuta también en los procesos hijos)."""
+    indice, usuario_id, artefactos, opciones = tarea
+    inicio = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Si el proceso cae a mitad de la carga se pierde a lo sumo el último proyecto,
+        # que igual se descarta entero: no hace falta esperar al disco en cada commit
+        cursor.execute("SET LOCAL synchronous_commit TO OFF")
+        resumen = GeneradorProyectos(cursor, **opciones).proyecto(usuario_id, artefactos, indice=indice)
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos para pruebas de carga: usuarios y proyectos con requisitos, "
+        "casos de uso, historias, estimaciones, relaciones y vínculos de trazabilidad. Escribe "
+        "con COPY y con la misma semilla produce el mismo contenido."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10,
+                            help='Usuarios nuevos; los proyectos se reparten entre ellos (0 usa el admin)')
+        parser.add_argument('--proyectos', type=int, default=10, help='Proyectos a generar')
+        parser.add_argument('--artefactos', type=int, default=1000,
+                            help='Artefactos por proyecto: 50%% requisitos, 20%% casos de uso y 30%% historias')
+        parser.add_argument('--densidad-relaciones', type=float, default=1.5,
+                            help='Relaciones salientes promedio por requisito y por caso de uso')
+        parser.add_argument('--densidad-vinculos', type=float, default=1.0,
+                            help='Requisitos vinculados promedio por caso de uso y por historia')
+        parser.add_argument('--estimaciones', type=float, default=1.5,
+                            help='Estimaciones promedio por historia de usuario')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--procesos', type=int, default=1,
+                            help='Procesos que generan proyectos en paralelo, cada uno con su conexión')
+        parser.add_argument('--contrasenia', default='sintetico',
+                            help='Contraseña de todos los usuarios generados')
+
+    def handle(self, *args, **options):
+        if options['proyectos'] < 0 or options['artefactos'] < 0 or options['usuarios'] < 0:
+            raise CommandError('--usuarios, --proyectos y --artefactos no pueden ser negativos')
+        if min(options['densidad_relaciones'], options['densidad_vinculos'], options['estimaciones']) < 0:
+            raise CommandError('Las densidades no pueden ser negativas')
+        if options['procesos'] < 1:
+            raise CommandError('--procesos debe ser >= 1')
+
+        inicio = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            usuarios = generar_usuarios(
+                cursor, options['usuarios'], make_password(options['contrasenia']), options['semilla']
+            )
+            if not usuarios:
+                cursor.execute("SELECT id FROM usuarios WHERE activo = TRUE ORDER BY id LIMIT 1")
+                fila = cursor.fetchone()
+                if not fila:
+                    raise CommandError('No hay usuarios activos a los que asignar los proyectos')
+                usuarios = [fila[0]]
+        self.stdout.write(f"Usuarios: {options['usuarios']}")
+
+        generacion = {
+            'semilla': options['semilla'],
+            'densidad_relaciones': options['densidad_relaciones'],
+            'densidad_vinculos': options['densidad_vinculos'],
+            'estimaciones': options['estimaciones'],
+        }
+        tareas = [
+            (indice, usuarios[indice % len(usuarios)], options['artefactos'], generacion)
+            for indice in range(options['proyectos'])
+        ]
+
+        total = 0
+        pool = None
+        if options['procesos'] == 1:
+            resultados = map(_generar_proyecto, tareas)
+        else:
+            # Los hijos abren su propia conexión; no deben heredar la del padre
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(options['procesos'])
+            resultados = pool.imap_unordered(_generar_proyecto, tareas)
+        try:
+            for resumen in resultados:
+                artefactos = sum(resumen['artefactos'].values())
+                total += artefactos
+                self.stdout.write(
+                    f"Proyecto {resumen['proyecto_id']}: {artefactos} artefactos, "
+                    f"{sum(resumen['filas'].values())} relaciones/vínculos/estimaciones "
+                    f"en {resumen['segundos']:.1f} s"
+                )
+        except BaseException:
+            if pool:
+                pool.terminate()
+            raise
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        with connection.cursor() as cursor:
+            analizar_tablas(cursor)
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} artefactos en {segundos:.1f} s ({total / segundos if segundos else 0:.0f} artefactos/s)"
+        ))
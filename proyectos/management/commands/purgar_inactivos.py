@@ -0,0 +1,147 @@
+# proyectos/management/commands/purgar_inactivos.py
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+# Artefacto desactivado hace más que la ventana de retención
+REQUISITO_PURGABLE = "SELECT id FROM requisitos WHERE activo = FALSE AND fecha_actualizacion < %(corte)s"
+CASO_USO_PURGABLE = "SELECT id FROM casos_uso WHERE activo = FALSE AND fecha_actualizacion < %(corte)s"
+HISTORIA_PURGABLE = "SELECT id FROM historias_usuario WHERE activo = FALSE AND fecha_actualizacion < %(corte)s"
+
+# Orden de purga: primero las tablas hijas, para no violar llaves foráneas
+ETAPAS = [
+    ('historias_estimaciones', f"""
+        (activo = FALSE AND fecha_actualizacion < %(corte)s)
+        OR historia_id IN ({HISTORIA_PURGABLE})
+    """),
+    ('relaciones_requisitos', f"""
+        requisito_origen_id IN ({REQUISITO_PURGABLE})
+        OR requisito_destino_id IN ({REQUISITO_PURGABLE})
+    """),
+    ('relaciones_casos_uso', f"""
+        caso_uso_origen_id IN ({CASO_USO_PURGABLE})
+        OR caso_uso_destino_id IN ({CASO_USO_PURGABLE})
+    """),
+    ('casos_uso_clausura', f"""
+        ancestro_id IN ({CASO_USO_PURGABLE})
+        OR descendiente_id IN ({CASO_USO_PURGABLE})
+    """),
+    ('casos_uso_requisitos', f"""
+        caso_uso_id IN ({CASO_USO_PURGABLE})
+        OR requisito_id IN ({REQUISITO_PURGABLE})
+    """),
+    ('historias_requisitos', f"""
+        historia_id IN ({HISTORIA_PURGABLE})
+        OR requisito_id IN ({REQUISITO_PURGABLE})
+    """),
+    ('revisiones', f"""
+        (tipo = 'requisito' AND elemento_id IN ({REQUISITO_PURGABLE}))
+        OR (tipo = 'caso_uso' AND elemento_id IN ({CASO_USO_PURGABLE}))
+        OR (tipo = 'historia_usuario' AND elemento_id IN ({HISTORIA_PURGABLE}))
+    """),
+    ('lineas_base_elementos', """
+        linea_base_id IN (SELECT id FROM lineas_base WHERE activo = FALSE AND fecha_actualizacion < %(corte)s)
+    """),
+    ('lineas_base', "activo = FALSE AND fecha_actualizacion < %(corte)s"),
+    # Contenidos que ya ninguna línea base referencia; la fecha protege los recién creados
+    ('contenidos_linea_base', """
+        fecha_creacion < %(corte)s
+        AND NOT EXISTS (SELECT 1 FROM lineas_base_elementos e WHERE e.contenido_id = contenidos_linea_base.id)
+    """),
+    ('requisitos', "activo = FALSE AND fecha_actualizacion < %(corte)s"),
+    ('casos_uso', "activo = FALSE AND fecha_actualizacion < %(corte)s"),
+    ('historias_usuario', "activo = FALSE AND fecha_actualizacion < %(corte)s"),
+    ('proyectos', """
+        activo = FALSE AND fecha_actualizacion < %(corte)s
+        AND NOT EXISTS (SELECT 1 FROM requisitos r WHERE r.proyecto_id = proyectos.id)
+        AND NOT EXISTS (SELECT 1 FROM casos_uso c WHERE c.proyecto_id = proyectos.id)
+        AND NOT EXISTS (SELECT 1 FROM historias_usuario h WHERE h.proyecto_id = proyectos.id)
+        AND NOT EXISTS (SELECT 1 FROM lineas_base l WHERE l.proyecto_id = proyectos.id)
+    """),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina (o archiva en un archivo JSONL) las filas inactivas más antiguas que la "
+        "ventana de retención, en lotes cortos para no mantener bloqueos largos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=90,
+                            help='Días que una fila debe llevar inactiva antes de purgarse (por defecto 90)')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Filas eliminadas por transacción (por defecto 1000)')
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help='Segundos de espera entre lotes para ceder la base de datos')
+        parser.add_argument('--archivar', metavar='ARCHIVO',
+                            help='Escribe cada fila eliminada como JSON en este archivo (una por línea)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo cuenta las filas que se purgarían, sin eliminar nada')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] <= 0:
+            raise CommandError('--dias debe ser >= 0 y --lote debe ser > 0')
+
+        params = {'corte': timezone.now() - timedelta(days=options['dias'])}
+        archivo = open(options['archivar'], 'a', encoding='utf-8') if options['archivar'] else None
+
+        try:
+            total = 0
+            for tabla, condicion in ETAPAS:
+                if options['simular']:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"SELECT COUNT(*) FROM {tabla} WHERE {condicion}", params)
+                        eliminadas = cursor.fetchone()[0]
+                else:
+                    eliminadas = self._purgar_tabla(tabla, condicion, params, options, archivo)
+
+                total += eliminadas
+                self.stdout.write(f"{tabla}: {eliminadas}")
+        finally:
+            if archivo:
+                archivo.close()
+
+        verbo = 'por purgar' if options['simular'] else 'purgadas'
+        self.stdout.write(self.style.SUCCESS(f"Total de filas {verbo}: {total}"))
+
+    def _purgar_tabla(self, tabla, condicion, params, options, archivo):
+        """Borra por lotes de ids; SKIP LOCKED evita esperar filas que otra transacción está usando."""
+        sql = f"""
+            DELETE FROM {tabla}
+            WHERE id IN (
+                SELECT id FROM {tabla}
+                WHERE {condicion}
+                ORDER BY id
+                LIMIT %(lote)s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING to_jsonb({tabla}.*)
+        """
+        params = dict(params, lote=options['lote'])
+        eliminadas = 0
+
+        while True:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    filas = cursor.fetchall()
+
+                if archivo:
+                    for (fila,) in filas:
+                        if isinstance(fila, str):
+                            fila = json.loads(fila)
+                        archivo.write(json.dumps({'tabla': tabla, 'fila': fila}, default=str) + '\n')
+                    archivo.flush()
+
+            eliminadas += len(filas)
+            if len(filas) < options['lote']:
+                return eliminadas
+
+            if options['pausa']:
+                time.sleep(options['pausa'])
@@ -0,0 +1,24 @@
+# Carga bd.sql en una base vacía (instalación nueva o base de pruebas). Si el esquema ya
+# existe no hace nada: los índices y cambios posteriores llegan como migraciones.
+from django.conf import settings
+from django.db import migrations
+
+
+def cargar_esquema(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('public.proyectos')")
+        if cursor.fetchone()[0] is not None:
+            return
+        with open(settings.BASE_DIR / 'bd.sql', encoding='utf-8') as archivo:
+            cursor.execute(archivo.read())
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(cargar_esquema, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('proyectos', '0001_esquema_base'),
+    ]
+
+    operations = [
+        # Listado de proyectos del usuario
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_proyectos_usuario_activo "
+            "ON proyectos (usuario_id) WHERE activo = TRUE",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_proyectos_usuario_activo",
+        ),
+    ]
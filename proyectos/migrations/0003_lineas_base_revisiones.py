@@ -0,0 +1,57 @@
+# Tablas de líneas base y revisiones para las instalaciones creadas antes de que llegaran a
+# bd.sql. En una base nueva ya existen (0001 carga bd.sql) y no se hace nada; al revertir no
+# se borran, porque en ese caso pertenecen a bd.sql.
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0002_indices'),
+    ]
+
+    operations = [
+        migrations.RunSQL("""
+            CREATE TABLE IF NOT EXISTS lineas_base (
+                id SERIAL PRIMARY KEY,
+                proyecto_id INTEGER NOT NULL REFERENCES proyectos(id),
+                nombre VARCHAR(100) NOT NULL,
+                descripcion TEXT,
+                total_elementos INTEGER NOT NULL DEFAULT 0,
+                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                activo BOOLEAN DEFAULT TRUE
+            );
+            CREATE INDEX IF NOT EXISTS idx_lineas_base_proyecto ON lineas_base (proyecto_id);
+
+            CREATE TABLE IF NOT EXISTS contenidos_linea_base (
+                id SERIAL PRIMARY KEY,
+                hash CHAR(64) NOT NULL UNIQUE,
+                contenido BYTEA NOT NULL,
+                tamano INTEGER NOT NULL,
+                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS lineas_base_elementos (
+                id SERIAL PRIMARY KEY,
+                linea_base_id INTEGER NOT NULL REFERENCES lineas_base(id),
+                tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('requisito', 'caso_uso', 'historia_usuario')),
+                elemento_id INTEGER NOT NULL,
+                contenido_id INTEGER NOT NULL REFERENCES contenidos_linea_base(id),
+                UNIQUE(linea_base_id, tipo, elemento_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_lineas_base_elementos_contenido ON lineas_base_elementos (contenido_id);
+
+            CREATE TABLE IF NOT EXISTS revisiones (
+                id SERIAL PRIMARY KEY,
+                tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('requisito', 'caso_uso', 'historia_usuario')),
+                elemento_id INTEGER NOT NULL,
+                numero INTEGER NOT NULL,
+                completa BOOLEAN NOT NULL,
+                datos JSONB NOT NULL,
+                usuario_id INTEGER REFERENCES usuarios(id),
+                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(tipo, elemento_id, numero)
+            );
+        """, migrations.RunSQL.noop),
+    ]
@@ -15,4 +15,67 @@ class Proyectos(models.Model):
         db_table = 'proyectos'
 
     def __str__(self):
-        return f"{self.nombre} ({self.estado})"
\ No newline at end of file
+        return f"{self.nombre} ({self.estado})"
+
+class LineasBase(models.Model):
+    proyecto = models.ForeignKey(Proyectos, models.DO_NOTHING, related_name='lineas_base')
+    nombre = models.CharField(max_length=100)
+    descripcion = models.TextField(blank=True, null=True)
+    total_elementos = models.IntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        managed = False
+        db_table = 'lineas_base'
+
+    def __str__(self):
+        return f"{self.nombre} (proyecto {self.proyecto_id})"
+
+
+class ContenidosLineaBase(models.Model):
+    hash = models.CharField(max_length=64, unique=True)
+    contenido = models.BinaryField()
+    tamano = models.IntegerField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'contenidos_linea_base'
+
+    def __str__(self):
+        return self.hash
+
+
+class LineasBaseElementos(models.Model):
+    linea_base = models.ForeignKey(LineasBase, models.DO_NOTHING, related_name='elementos')
+    tipo = models.CharField(max_length=20)
+    elemento_id = models.IntegerField()
+    contenido = models.ForeignKey(ContenidosLineaBase, models.DO_NOTHING)
+
+    class Meta:
+        managed = False
+        db_table = 'lineas_base_elementos'
+        unique_together = (('linea_base', 'tipo', 'elemento_id'),)
+
+    def __str__(self):
+        return f"{self.tipo} {self.elemento_id} en línea base {self.linea_base_id}"
+
+
+class Revisiones(models.Model):
+    tipo = models.CharField(max_length=20)
+    elemento_id = models.IntegerField()
+    numero = models.IntegerField()
+    completa = models.BooleanField()
+    datos = models.JSONField()
+    usuario = models.ForeignKey(Usuarios, models.DO_NOTHING, blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'revisiones'
+        unique_together = (('tipo', 'elemento_id', 'numero'),)
+
+    def __str__(self):
+        return f"{self.tipo} {self.elemento_id} r{self.numero}"
@@ -0,0 +1,226 @@
+# proyectos/revisiones.py
+import difflib
+import json
+
+from django.conf import settings
+from django.db import connection
+
+# Campos versionados por tipo de artefacto (nombres de columna)
+CAMPOS_VERSIONADOS = {
+    'requisito': [
+        'nombre', 'descripcion', 'tipo_id', 'criterios', 'prioridad_id', 'estado_id',
+        'origen', 'condiciones_previas', 'activo',
+    ],
+    'caso_uso': [
+        'nombre', 'descripcion', 'actores', 'precondiciones', 'flujo_principal',
+        'flujos_alternativos', 'postcondiciones', 'requisitos_especiales',
+        'riesgos_consideraciones', 'prioridad_id', 'estado_id', 'activo',
+    ],
+    'historia_usuario': [
+        'titulo', 'descripcion', 'actor_rol', 'funcionalidad_accion', 'beneficio_razon',
+        'criterios_aceptacion', 'prioridad_id', 'estado_id', 'valor_negocio',
+        'dependencias_relaciones', 'componentes_relacionados', 'notas_adicionales', 'activo',
+    ],
+}
+TIPOS_REVISION = tuple(CAMPOS_VERSIONADOS)
+
+# Campos JSON que se guardan como diferencia estructural y no completos
+CAMPOS_JSON = ('flujo_principal', 'flujos_alternativos')
+
+
+# -----------------------------
+# Diferencias de valores JSON
+# -----------------------------
+def _clave(valor):
+    return json.dumps(valor, sort_keys=True)
+
+
+def diferencia_json(anterior, nuevo):
+    """Diferencia compacta entre dos valores JSON.
+
+    - Listas: {"$lista": [[i, j, [elementos]], ...]}, cada operación reemplaza anterior[i:j].
+    - Objetos: {"$objeto": {clave: diferencia}, "$quitar": [claves]}.
+    - Cualquier otro caso: {"$valor": nuevo}.
+    """
+    if isinstance(anterior, list) and isinstance(nuevo, list):
+        comparador = difflib.SequenceMatcher(
+            None, [_clave(v) for v in anterior], [_clave(v) for v in nuevo], autojunk=False
+        )
+        return {'$lista': [
+            [i1, i2, nuevo[j1:j2]]
+            for etiqueta, i1, i2, j1, j2 in comparador.get_opcodes() if etiqueta != 'equal'
+        ]}
+
+    if isinstance(anterior, dict) and isinstance(nuevo, dict):
+        return {
+            '$objeto': {
+                clave: diferencia_json(anterior[clave], valor) if clave in anterior else {'$valor': valor}
+                for clave, valor in nuevo.items()
+                if clave not in anterior or anterior[clave] != valor
+            },
+            '$quitar': [clave for clave in anterior if clave not in nuevo],
+        }
+
+    return {'$valor': nuevo}
+
+
+def aplicar_diferencia(valor, diferencia):
+    if '$lista' in diferencia:
+        resultado = list(valor)
+        # De atrás hacia adelante para que los índices sigan siendo válidos
+        for i, j, elementos in reversed(diferencia['$lista']):
+            resultado[i:j] = elementos
+        return resultado
+
+    if '$objeto' in diferencia:
+        resultado = {k: v for k, v in valor.items() if k not in diferencia['$quitar']}
+        for clave, cambio in diferencia['$objeto'].items():
+            resultado[clave] = aplicar_diferencia(resultado.get(clave), cambio)
+        return resultado
+
+    return diferencia['$valor']
+
+
+# -----------------------------
+# Registro de revisiones
+# -----------------------------
+def instantanea(tipo, instancia):
+    """Valores versionados de un artefacto, normalizados como quedan en la base."""
+    datos = {}
+    for campo in CAMPOS_VERSIONADOS[tipo]:
+        valor = getattr(instancia, campo)
+        if valor is not None and (campo.endswith('_id') or campo == 'valor_negocio'):
+            valor = int(valor)
+        datos[campo] = valor
+    return datos
+
+
+def _delta(anterior, actual):
+    delta = {}
+    for campo, valor in actual.items():
+        if anterior.get(campo) == valor:
+            continue
+        if campo in CAMPOS_JSON and anterior.get(campo) is not None and valor is not None:
+            delta[campo] = diferencia_json(anterior[campo], valor)
+        elif campo in CAMPOS_JSON:
+            delta[campo] = {'$valor': valor}
+        else:
+            delta[campo] = valor
+    return delta
+
+
+# El número de revisión y si toca una revisión completa se resuelven en el mismo INSERT:
+# completa si no hay ninguna anterior o si desde la última completa ya pasaron
+# REVISIONES_INTERVALO_COMPLETA revisiones.
+SQL_REGISTRAR = """
+    INSERT INTO revisiones (tipo, elemento_id, numero, completa, datos, usuario_id, fecha_creacion)
+    SELECT %(tipo)s, %(elemento)s, u.numero + 1, u.toca_completa,
+           CASE WHEN u.toca_completa THEN %(completa)s::jsonb ELSE %(delta)s::jsonb END,
+           %(usuario)s, CURRENT_TIMESTAMP
+    FROM (
+        SELECT COALESCE(MAX(numero), 0) AS numero,
+               MAX(numero) FILTER (WHERE completa) IS NULL
+               OR COALESCE(MAX(numero), 0) + 1 - MAX(numero) FILTER (WHERE completa) >= %(intervalo)s AS toca_completa
+        FROM revisiones
+        WHERE tipo = %(tipo)s AND elemento_id = %(elemento)s
+    ) u
+"""
+
+
+def registrar_revision(tipo, instancia, anterior=None, usuario_id=None):
+    """Agrega la revisión del artefacto con un único INSERT (debe llamarse dentro de la
+    transacción que guardó el cambio).
+
+    `anterior` es la instantánea tomada antes de modificar la instancia, leída con
+    select_for_update en la misma transacción: así dos cambios simultáneos no calculan su
+    diferencia contra el mismo estado y el historial coincide con la fila guardada. Sin ella
+    (creación) la revisión es completa. Si nada cambió no se registra nada.
+    """
+    actual = instantanea(tipo, instancia)
+    delta = actual if anterior is None else _delta(anterior, actual)
+    if not delta:
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_REGISTRAR, {
+            'tipo': tipo,
+            'elemento': instancia.id,
+            'completa': json.dumps(actual),
+            'delta': json.dumps(delta),
+            'usuario': usuario_id,
+            'intervalo': settings.REVISIONES_INTERVALO_COMPLETA,
+        })
+    return True
+
+
+def sql_revisiones_completas(tipo, origen):
+    """INSERT ... SELECT que registra una revisión completa por cada fila de `origen`
+    (tabla o CTE con las columnas del artefacto), para cambios hechos en bloque."""
+    campos = ', '.join(f"'{c}', o.{c}" for c in CAMPOS_VERSIONADOS[tipo])
+    return f"""
+        INSERT INTO revisiones (tipo, elemento_id, numero, completa, datos, fecha_creacion)
+        SELECT '{tipo}', o.id,
+               COALESCE((SELECT MAX(r.numero) FROM revisiones r
+                         WHERE r.tipo = '{tipo}' AND r.elemento_id = o.id), 0) + 1,
+               TRUE, jsonb_build_object({campos}), CURRENT_TIMESTAMP
+        FROM {origen} o
+    """
+
+
+# -----------------------------
+# Lectura
+# -----------------------------
+def listar_revisiones(tipo, elemento_id):
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT numero, completa, usuario_id, fecha_creacion,
+                   CASE WHEN completa THEN NULL ELSE ARRAY(SELECT jsonb_object_keys(datos) ORDER BY 1) END
+            FROM revisiones
+            WHERE tipo = %s AND elemento_id = %s
+            ORDER BY numero DESC
+        """, [tipo, elemento_id])
+        return [
+            {
+                'numero': numero,
+                'completa': completa,
+                'usuario_id': usuario_id,
+                'fecha_creacion': fecha.isoformat() if fecha else None,
+                'campos': campos,
+            }
+            for numero, completa, usuario_id, fecha, campos in cursor.fetchall()
+        ]
+
+
+def reconstruir_revision(tipo, elemento_id, numero):
+    """Estado del artefacto en la revisión indicada (None si no existe).
+
+    Lee la última revisión completa anterior o igual a `numero` y aplica los deltas
+    siguientes; como máximo REVISIONES_INTERVALO_COMPLETA - 1 deltas.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT numero, completa, datos
+            FROM revisiones
+            WHERE tipo = %(tipo)s AND elemento_id = %(elemento)s AND numero <= %(numero)s
+              AND numero >= (
+                  SELECT MAX(numero) FROM revisiones
+                  WHERE tipo = %(tipo)s AND elemento_id = %(elemento)s
+                    AND numero <= %(numero)s AND completa = TRUE
+              )
+            ORDER BY numero
+        """, {'tipo': tipo, 'elemento': elemento_id, 'numero': numero})
+        filas = cursor.fetchall()
+
+    if not filas or filas[-1][0] != numero:
+        return None
+
+    estado = {}
+    for _, completa, datos in filas:
+        if isinstance(datos, str):
+            datos = json.loads(datos)
+        if completa:
+            estado = dict(datos)
+            continue
+        for campo, cambio in datos.items():
+            estado[campo] = aplicar_diferencia(estado.get(campo), cambio) if campo in CAMPOS_JSON else cambio
+    return estado
@@ -0,0 +1,398 @@
+# proyectos/sinteticos.py
+"""Generación de proyectos sintéticos para pruebas de carga y benchmarks.
+
+Las filas se escriben con COPY desde generadores (nada se arma completo en memoria) y los
+ids se reservan por bloques en cada secuencia, así las relaciones y los vínculos se
+construyen sin volver a leer lo insertado. Con la misma semilla se obtiene el mismo
+contenido y la misma estructura; solo los ids dependen de lo que ya haya en la base.
+
+Las relaciones siempre van de un artefacto a otro creado antes, de modo que las
+jerarquías de casos de uso y las dependencias entre requisitos no forman ciclos.
+"""
+import json
+import random
+
+from casosdeuso.clausura import reconstruir_clausura_proyecto
+from proyectos.importacion import _FlujoCopia
+
+# Fracción de los artefactos de un proyecto que es de cada tipo
+REPARTO = {'requisito': 0.5, 'caso_uso': 0.2, 'historia_usuario': 0.3}
+
+# Primera llave de los candados consultivos de reserva de ids
+LLAVE_BLOQUEO = 7311
+
+# Las relaciones se buscan entre los artefactos cercanos (mismo "módulo" del proyecto)
+VENTANA_RELACIONES = 200
+
+PALABRAS = (
+    'usuario sistema reporte pago factura cliente pedido inventario producto catálogo '
+    'sesión permiso rol auditoría notificación correo búsqueda filtro exportación archivo '
+    'proveedor contrato cuenta saldo transferencia tarjeta envío dirección historial panel '
+    'tablero métrica alerta respaldo integración servicio consulta registro validación firma'
+).split()
+VERBOS = (
+    'registrar consultar modificar eliminar aprobar rechazar exportar importar validar '
+    'notificar calcular asignar generar programar cancelar confirmar buscar filtrar'
+).split()
+NOMBRES = ('Ana', 'Luis', 'María', 'Jorge', 'Lucía', 'Carlos', 'Sofía', 'Diego', 'Valeria', 'Andrés', 'Camila', 'Pedro')
+APELLIDOS = ('García', 'Rodríguez', 'López', 'Martínez', 'Pérez', 'Gómez', 'Sánchez', 'Díaz', 'Torres', 'Ramírez')
+ACTORES = ('Usuario', 'Administrador', 'Cliente', 'Operador', 'Supervisor', 'Sistema externo', 'Auditor')
+
+# Texto del que se recortan las frases: sortear palabra por palabra domina el tiempo de generación
+_CORPUS = random.Random(0).choices(PALABRAS, k=1 << 14)
+_TEXTO = ' '.join(_CORPUS) + ' '
+_INICIOS = [0]
+for _palabra in _CORPUS:
+    _INICIOS.append(_INICIOS[-1] + len(_palabra) + 1)
+del _palabra
+
+
+def _escapar(valor):
+    """Valor en el formato de texto de COPY."""
+    if valor is None:
+        return '\\N'
+    valor = str(valor)
+    if '\\' in valor or '\t' in valor or '\n' in valor or '\r' in valor:
+        valor = valor.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    return valor
+
+
+def _linea(*valores):
+    return '\t'.join(_escapar(v) for v in valores) + '\n'
+
+
+def copiar(cursor, tabla, columnas, lineas):
+    cursor.copy_expert(
+        f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN", _FlujoCopia(lineas), size=1 << 18
+    )
+
+
+def reservar_ids(cursor, tabla, cantidad):
+    """Reserva `cantidad` ids consecutivos de la secuencia de `tabla` y devuelve el primero.
+
+    Los generadores que corren en paralelo se excluyen con un candado de sesión; una
+    inserción normal concurrente (nextval sin candado) sí podría caer dentro del bloque,
+    así que el generador debe correr sin tráfico de escritura sobre estas tablas.
+    """
+    if cantidad <= 0:
+        return None
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [tabla])
+    secuencia = cursor.fetchone()[0]
+    cursor.execute("SELECT pg_advisory_lock(%s, hashtext(%s))", [LLAVE_BLOQUEO, secuencia])
+    try:
+        cursor.execute("SELECT nextval(%s)", [secuencia])
+        primero = cursor.fetchone()[0]
+        if cantidad > 1:
+            cursor.execute("SELECT setval(%s, %s)", [secuencia, primero + cantidad - 1])
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s, hashtext(%s))", [LLAVE_BLOQUEO, secuencia])
+    return primero
+
+
+def _ids_catalogo(cursor, tabla, condicion='TRUE', params=None):
+    cursor.execute(f"SELECT id FROM {tabla} WHERE activo = TRUE AND {condicion} ORDER BY id", params or [])
+    ids = [fila[0] for fila in cursor.fetchall()]
+    if not ids:
+        raise ValueError(f'El catálogo {tabla} está vacío')
+    return ids
+
+
+# -----------------------------
+# Textos
+# -----------------------------
+def _frase(rng, palabras):
+    """`palabras` palabras seguidas del corpus desde una posición al azar (un solo sorteo)."""
+    if palabras <= 0:
+        return ''
+    i = int(rng.random() * (len(_INICIOS) - palabras))
+    return _TEXTO[_INICIOS[i]:_INICIOS[i + palabras] - 1]
+
+
+def _titulo(rng, prefijo, indice):
+    return f"{prefijo}-{indice:06d} {rng.choice(VERBOS)} {rng.choice(PALABRAS)} de {rng.choice(PALABRAS)}"
+
+
+def _flujo(rng, pasos, actor):
+    return [
+        {
+            'paso': i,
+            'actor': actor if i % 2 else 'Sistema',
+            'accion': f"{rng.choice(VERBOS)} {_frase(rng, 3)}",
+        }
+        for i in range(1, pasos + 1)
+    ]
+
+
+def _flujos_alternativos(rng, pasos_principal, actor):
+    return [
+        {
+            'nombre': f"Alternativo {i}",
+            'desde_paso': _entero(rng, 1, pasos_principal),
+            'condicion': f"si {_frase(rng, 3)}",
+            'pasos': _flujo(rng, _entero(rng, 1, 4), actor),
+        }
+        for i in range(1, _entero(rng, 0, 3) + 1)
+    ]
+
+
+def _entero(rng, minimo, maximo):
+    """Como rng.randint pero con un solo random(): randint es de lo más caro al generar."""
+    return minimo + int(rng.random() * (maximo - minimo + 1))
+
+
+def _cantidad(rng, densidad):
+    """Número entero cuya media es `densidad`."""
+    entero = int(densidad)
+    return entero + (rng.random() < densidad - entero)
+
+
+def _destinos(rng, indice, cantidad, ventana=VENTANA_RELACIONES):
+    """Índices anteriores a `indice`, sin repetir, cercanos a él."""
+    inicio = max(0, indice - ventana)
+    disponibles = indice - inicio
+    if disponibles <= 0 or cantidad <= 0:
+        return []
+    return rng.sample(range(inicio, indice), min(cantidad, disponibles))
+
+
+# -----------------------------
+# Usuarios
+# -----------------------------
+def generar_usuarios(cursor, cantidad, contrasenia, semilla=0, rol='usuario'):
+    """Crea `cantidad` usuarios activos con el rol `rol` y devuelve sus ids.
+
+    `contrasenia` es el hash ya calculado (el mismo para todos: calcular un pbkdf2 por
+    usuario tomaría más que generar el resto de los datos). El nombre de usuario se deriva
+    del id para que no choque con los de corridas anteriores.
+    """
+    if cantidad <= 0:
+        return []
+    cursor.execute("SELECT id FROM roles WHERE nombre = %s", [rol])
+    fila = cursor.fetchone()
+    if not fila:
+        raise ValueError(f'No existe el rol {rol}')
+    rol_id = fila[0]
+
+    rng = random.Random(f"{semilla}:usuarios")
+    primer_dato = reservar_ids(cursor, 'datos_personales', cantidad)
+    primer_usuario = reservar_ids(cursor, 'usuarios', cantidad)
+    personas = [(rng.choice(NOMBRES), rng.choice(APELLIDOS)) for _ in range(cantidad)]
+
+    copiar(cursor, 'datos_personales', ('id', 'nombre', 'apellido'), (
+        _linea(primer_dato + i, nombre, apellido) for i, (nombre, apellido) in enumerate(personas)
+    ))
+    copiar(cursor, 'usuarios', ('id', 'usuario', 'contrasenia', 'datos_personales_id', 'rol_id'), (
+        _linea(primer_usuario + i, f"sintetico{primer_usuario + i}", contrasenia, primer_dato + i, rol_id)
+        for i in range(cantidad)
+    ))
+    return list(range(primer_usuario, primer_usuario + cantidad))
+
+
+# -----------------------------
+# Generador
+# -----------------------------
+class GeneradorProyectos:
+    """Genera proyectos completos (artefactos, relaciones, estimaciones y vínculos).
+
+    - densidad_relaciones: relaciones salientes promedio por requisito y por caso de uso.
+    - densidad_vinculos: requisitos vinculados promedio por caso de uso y por historia.
+    - estimaciones: tipos de estimación promedio por historia.
+    """
+
+    def __init__(self, cursor, semilla=0, densidad_relaciones=1.5, densidad_vinculos=1.0, estimaciones=1.5):
+        self.cursor = cursor
+        self.semilla = semilla
+        self.densidad_relaciones = densidad_relaciones
+        self.densidad_vinculos = densidad_vinculos
+        self.estimaciones = estimaciones
+
+        self.tipos_requisito = _ids_catalogo(cursor, 'tipos_requisito')
+        self.prioridades = _ids_catalogo(cursor, 'prioridades')
+        self.estados = {
+            tipo: _ids_catalogo(cursor, 'estados_elemento', 'tipo = %s', [tipo]) for tipo in REPARTO
+        }
+        self.tipos_relacion_requisito = _ids_catalogo(cursor, 'tipos_relacion_requisito')
+        self.tipos_relacion_cu = _ids_catalogo(cursor, 'tipos_relacion_cu')
+        self.tipos_estimacion = _ids_catalogo(cursor, 'tipos_estimacion')
+
+    def _rng(self, *partes):
+        # Una semilla por tabla y proyecto: cada tabla es reproducible por separado
+        return random.Random(':'.join(str(p) for p in (self.semilla,) + partes))
+
+    def proyecto(self, usuario_id, artefactos, indice=0, nombre=None):
+        """Crea un proyecto con `artefactos` artefactos en total y devuelve su resumen."""
+        cursor = self.cursor
+        cantidades = {tipo: int(artefactos * fraccion) for tipo, fraccion in REPARTO.items()}
+        cantidades['requisito'] += artefactos - sum(cantidades.values())
+
+        cursor.execute(
+            "INSERT INTO proyectos (nombre, descripcion, estado, usuario_id, activo) "
+            "VALUES (%s, %s, 'Requisitos', %s, TRUE) RETURNING id",
+            [nombre or f"Proyecto sintético {indice} ({artefactos} artefactos)",
+             _frase(self._rng('proyecto', indice), 12), usuario_id]
+        )
+        proyecto_id = cursor.fetchone()[0]
+
+        primeros = {
+            'requisito': reservar_ids(cursor, 'requisitos', cantidades['requisito']),
+            'caso_uso': reservar_ids(cursor, 'casos_uso', cantidades['caso_uso']),
+            'historia_usuario': reservar_ids(cursor, 'historias_usuario', cantidades['historia_usuario']),
+        }
+
+        self._requisitos(proyecto_id, indice, primeros['requisito'], cantidades['requisito'])
+        self._casos_uso(proyecto_id, indice, primeros['caso_uso'], cantidades['caso_uso'])
+        self._historias(proyecto_id, indice, primeros['historia_usuario'], cantidades['historia_usuario'])
+
+        filas = {
+            'relaciones_requisitos': self._relaciones(
+                'relaciones_requisitos', ('requisito_origen_id', 'requisito_destino_id'),
+                self.tipos_relacion_requisito, indice, primeros['requisito'], cantidades['requisito']
+            ),
+            'relaciones_casos_uso': self._relaciones(
+                'relaciones_casos_uso', ('caso_uso_origen_id', 'caso_uso_destino_id'),
+                self.tipos_relacion_cu, indice, primeros['caso_uso'], cantidades['caso_uso']
+            ),
+            'historias_estimaciones': self._estimaciones(
+                indice, primeros['historia_usuario'], cantidades['historia_usuario']
+            ),
+            'casos_uso_requisitos': self._vinculos(
+                'casos_uso_requisitos', 'caso_uso_id', indice, primeros['caso_uso'], cantidades['caso_uso'],
+                primeros['requisito'], cantidades['requisito']
+            ),
+            'historias_requisitos': self._vinculos(
+                'historias_requisitos', 'historia_id', indice, primeros['historia_usuario'],
+                cantidades['historia_usuario'], primeros['requisito'], cantidades['requisito']
+            ),
+        }
+        if cantidades['caso_uso']:
+            reconstruir_clausura_proyecto(cursor, proyecto_id)
+
+        return {
+            'proyecto_id': proyecto_id,
+            'artefactos': cantidades,
+            'primeros_ids': primeros,
+            'filas': filas,
+        }
+
+    def _requisitos(self, proyecto_id, indice, primero, cantidad):
+        rng = self._rng('requisitos', indice)
+        estados = self.estados['requisito']
+
+        def lineas():
+            for i in range(cantidad):
+                yield _linea(
+                    primero + i, _titulo(rng, 'REQ', i), _frase(rng, _entero(rng, 15, 40)),
+                    rng.choice(self.tipos_requisito), _frase(rng, _entero(rng, 10, 25)),
+                    rng.choice(self.prioridades), rng.choice(estados),
+                    rng.choice(('cliente', 'normativa', 'usuarios', 'negocio', 'técnico')),
+                    _frase(rng, _entero(rng, 0, 10)), proyecto_id,
+                )
+
+        copiar(self.cursor, 'requisitos', (
+            'id', 'nombre', 'descripcion', 'tipo_id', 'criterios', 'prioridad_id', 'estado_id',
+            'origen', 'condiciones_previas', 'proyecto_id',
+        ), lineas())
+
+    def _casos_uso(self, proyecto_id, indice, primero, cantidad):
+        rng = self._rng('casos_uso', indice)
+        estados = self.estados['caso_uso']
+
+        def lineas():
+            for i in range(cantidad):
+                actor = rng.choice(ACTORES)
+                pasos = _entero(rng, 3, 12)
+                yield _linea(
+                    primero + i, _titulo(rng, 'CU', i)[:100], _frase(rng, _entero(rng, 10, 30)),
+                    ', '.join(rng.sample(ACTORES, _entero(rng, 1, 3))), _frase(rng, _entero(rng, 5, 15)),
+                    json.dumps(_flujo(rng, pasos, actor), ensure_ascii=False),
+                    json.dumps(_flujos_alternativos(rng, pasos, actor), ensure_ascii=False),
+                    _frase(rng, _entero(rng, 5, 15)), _frase(rng, _entero(rng, 0, 12)),
+                    _frase(rng, _entero(rng, 0, 12)), proyecto_id,
+                    rng.choice(self.prioridades), rng.choice(estados),
+                )
+
+        copiar(self.cursor, 'casos_uso', (
+            'id', 'nombre', 'descripcion', 'actores', 'precondiciones', 'flujo_principal',
+            'flujos_alternativos', 'postcondiciones', 'requisitos_especiales',
+            'riesgos_consideraciones', 'proyecto_id', 'prioridad_id', 'estado_id',
+        ), lineas())
+
+    def _historias(self, proyecto_id, indice, primero, cantidad):
+        rng = self._rng('historias', indice)
+        estados = self.estados['historia_usuario']
+
+        def lineas():
+            for i in range(cantidad):
+                actor = rng.choice(ACTORES)
+                accion = f"{rng.choice(VERBOS)} {_frase(rng, 3)}"
+                beneficio = _frase(rng, 5)
+                yield _linea(
+                    primero + i, f"HU-{i:06d} Como {actor.lower()} quiero {accion}"[:200],
+                    f"Como {actor} quiero {accion} para {beneficio}", actor, accion[:200], beneficio[:200],
+                    '\n'.join(f"- {_frase(rng, 8)}" for _ in range(_entero(rng, 2, 5))),
+                    rng.choice(self.prioridades), rng.choice(estados), _entero(rng, 1, 100),
+                    _frase(rng, _entero(rng, 0, 8)), _frase(rng, _entero(rng, 0, 4))[:200],
+                    _frase(rng, _entero(rng, 0, 12)), proyecto_id,
+                )
+
+        copiar(self.cursor, 'historias_usuario', (
+            'id', 'titulo', 'descripcion', 'actor_rol', 'funcionalidad_accion', 'beneficio_razon',
+            'criterios_aceptacion', 'prioridad_id', 'estado_id', 'valor_negocio',
+            'dependencias_relaciones', 'componentes_relacionados', 'notas_adicionales', 'proyecto_id',
+        ), lineas())
+
+    def _relaciones(self, tabla, columnas, tipos, indice, primero, cantidad):
+        rng = self._rng(tabla, indice)
+        total = [0]
+
+        def lineas():
+            for i in range(1, cantidad):
+                for j in _destinos(rng, i, _cantidad(rng, self.densidad_relaciones)):
+                    total[0] += 1
+                    yield _linea(primero + i, primero + j, rng.choice(tipos), _frase(rng, _entero(rng, 0, 6)))
+
+        if cantidad > 1:
+            copiar(self.cursor, tabla, columnas + ('tipo_relacion_id', 'descripcion'), lineas())
+        return total[0]
+
+    def _estimaciones(self, indice, primero, cantidad):
+        rng = self._rng('historias_estimaciones', indice)
+        total = [0]
+
+        def lineas():
+            for i in range(cantidad):
+                for tipo in rng.sample(self.tipos_estimacion, min(_cantidad(rng, self.estimaciones), len(self.tipos_estimacion))):
+                    total[0] += 1
+                    yield _linea(primero + i, tipo, f"{rng.choice((1, 2, 3, 5, 8, 13, 21)) * rng.uniform(0.5, 4):.2f}")
+
+        if cantidad:
+            copiar(self.cursor, 'historias_estimaciones', ('historia_id', 'tipo_estimacion_id', 'valor'), lineas())
+        return total[0]
+
+    def _vinculos(self, tabla, columna, indice, primero, cantidad, primer_requisito, requisitos):
+        rng = self._rng(tabla, indice)
+        total = [0]
+
+        def lineas():
+            for i in range(cantidad):
+                # Cada artefacto se vincula con requisitos de la zona equivalente del proyecto
+                centro = int(i * requisitos / cantidad)
+                inicio = max(0, centro - VENTANA_RELACIONES // 2)
+                fin = min(requisitos, inicio + VENTANA_RELACIONES)
+                for j in rng.sample(range(inicio, fin), min(_cantidad(rng, self.densidad_vinculos), fin - inicio)):
+                    total[0] += 1
+                    yield _linea(primero + i, primer_requisito + j)
+
+        if cantidad and requisitos:
+            copiar(self.cursor, tabla, (columna, 'requisito_id'), lineas())
+        return total[0]
+
+
+def analizar_tablas(cursor):
+    """Actualiza las estadísticas del planificador tras una carga masiva."""
+    for tabla in (
+        'datos_personales', 'usuarios', 'proyectos', 'requisitos', 'casos_uso', 'historias_usuario',
+        'relaciones_requisitos', 'relaciones_casos_uso', 'casos_uso_clausura', 'historias_estimaciones',
+        'casos_uso_requisitos', 'historias_requisitos',
+    ):
+        cursor.execute(f"ANALYZE {tabla}")
@@ -1,3 +1,134 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from app.pruebas import PruebaApi, PruebaPlanes
+from casosdeuso.models import CasosUso
+from proyectos.revisiones import aplicar_diferencia, diferencia_json, listar_revisiones, reconstruir_revision
+from proyectos.models import Proyectos
+
+
+class PlanesConsultasTests(PruebaPlanes):
+    """Las consultas frecuentes de proyectos no deben recorrer tablas grandes enteras."""
+
+    def test_listar_proyectos_del_usuario(self):
+        self.assertSinSeqScan(Proyectos.objects.filter(usuario_id=self.usuario_id, activo=True))
+
+    def test_proyecto_activo(self):
+        self.assertSinSeqScan(Proyectos.objects.filter(id=self.proyecto_id, activo=True))
+
+
+class ImportacionTests(PruebaApi):
+    """La importación de requisitos descarta el grafo cacheado del proyecto."""
+
+    def obtener_grafo(self):
+        respuesta = self.client.get(
+            f"/app/requisitos/grafo/{self.proyecto['proyecto_id']}/", HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return respuesta.json()['grafo']
+
+    def test_importar_requisitos_invalida_el_grafo(self):
+        antes = self.obtener_grafo()
+        self.assertEqual(len(antes['nodos']), len(self.proyecto['ids']['requisito']))
+
+        archivo = SimpleUploadedFile(
+            'requisitos.csv',
+            'nombre,descripcion,criterios,tipo_id\nImportado,Descripción,Criterios,1\n'.encode(),
+            content_type='text/csv'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(
+                f"/app/proyectos/importar/{self.proyecto['proyecto_id']}/requisitos/",
+                {'archivo': archivo}, HTTP_AUTHORIZATION=f'Bearer {self.token}'
+            )
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(respuesta.json()['insertados'], 1)
+
+        despues = self.obtener_grafo()
+        self.assertEqual(len(despues['nodos']), len(antes['nodos']) + 1)
+        self.assertEqual(len(despues['orden_implementacion']), len(antes['orden_implementacion']) + 1)
+
+
+class DiferenciasJsonTests(SimpleTestCase):
+    """diferencia_json y aplicar_diferencia son inversas y solo guardan lo que cambió."""
+
+    def assertIdaYVuelta(self, anterior, nuevo):
+        diferencia = diferencia_json(anterior, nuevo)
+        self.assertEqual(aplicar_diferencia(anterior, diferencia), nuevo)
+        # Lo que se guarda debe sobrevivir a JSONB
+        self.assertEqual(aplicar_diferencia(anterior, json.loads(json.dumps(diferencia))), nuevo)
+        return diferencia
+
+    def test_listas(self):
+        anterior = [{'paso': i, 'accion': f'Acción {i}'} for i in range(1, 9)]
+        nuevo = anterior[:2] + [{'paso': 3, 'accion': 'Otra acción'}] + anterior[3:7] + [{'paso': 9, 'accion': 'Final'}]
+        diferencia = self.assertIdaYVuelta(anterior, nuevo)
+        # Solo viajan el elemento reemplazado, el quitado y el agregado
+        self.assertEqual(diferencia, {'$lista': [
+            [2, 3, [{'paso': 3, 'accion': 'Otra acción'}]],
+            [7, 8, [{'paso': 9, 'accion': 'Final'}]],
+        ]})
+
+    def test_listas_vacias_y_sin_cambios(self):
+        self.assertIdaYVuelta([], [1, 2])
+        self.assertIdaYVuelta([1, 2], [])
+        self.assertEqual(self.assertIdaYVuelta([1, 2], [1, 2]), {'$lista': []})
+
+    def test_objetos(self):
+        anterior = {'nombre': 'Flujo', 'pasos': [1, 2, 3], 'quitar': True, 'igual': {'a': 1}}
+        nuevo = {'nombre': 'Flujo alterno', 'pasos': [1, 3], 'igual': {'a': 1}, 'nuevo': [4]}
+        diferencia = self.assertIdaYVuelta(anterior, nuevo)
+        self.assertEqual(diferencia['$quitar'], ['quitar'])
+        self.assertNotIn('igual', diferencia['$objeto'])
+        self.assertIn('$lista', diferencia['$objeto']['pasos'])
+
+    def test_cambio_de_tipo(self):
+        self.assertEqual(self.assertIdaYVuelta([1], {'a': 1}), {'$valor': {'a': 1}})
+        self.assertIdaYVuelta({'a': 1}, 'texto')
+        self.assertIdaYVuelta(None, [1])
+
+
+@override_settings(REVISIONES_INTERVALO_COMPLETA=3)
+class RevisionesTests(PruebaApi):
+    """Cada revisión se reconstruye igual a como quedó guardado el artefacto."""
+
+    def patch_json(self, ruta, datos):
+        return self.client.patch(
+            ruta, json.dumps(datos), content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+
+    def test_reconstruir_requisito(self):
+        requisito_id = self.proyecto['ids']['requisito'][0]
+        nombres = [f'Nombre de la revisión {n}' for n in range(1, 6)]
+        for nombre in nombres:
+            respuesta = self.patch_json(f'/app/requisitos/actualizar/{requisito_id}/', {'nombre': nombre})
+            self.assertEqual(respuesta.status_code, 200, respuesta.content)
+
+        revisiones = listar_revisiones('requisito', requisito_id)
+        self.assertEqual([r['numero'] for r in revisiones], [5, 4, 3, 2, 1])
+        # Una completa cada REVISIONES_INTERVALO_COMPLETA; las demás solo con el campo cambiado
+        self.assertEqual([r['numero'] for r in revisiones if r['completa']], [4, 1])
+        self.assertEqual(revisiones[0]['campos'], ['nombre'])
+
+        for numero, nombre in enumerate(nombres, start=1):
+            self.assertEqual(reconstruir_revision('requisito', requisito_id, numero)['nombre'], nombre)
+        self.assertIsNone(reconstruir_revision('requisito', requisito_id, 6))
+
+    def test_reconstruir_flujos_caso_uso(self):
+        caso_uso_id = self.proyecto['ids']['caso_uso'][0]
+        ruta = f'/app/casosdeuso/actualizar/{caso_uso_id}/'
+        flujo = list(CasosUso.objects.get(id=caso_uso_id).flujo_principal)
+        versiones = [
+            flujo + [{'paso': len(flujo) + 1, 'actor': 'Sistema', 'accion': 'Confirma'}],
+            flujo[1:],
+            [{'paso': 1, 'actor': 'Usuario', 'accion': 'Cancela'}] + flujo[1:],
+        ]
+        for version in versiones:
+            respuesta = self.patch_json(ruta, {'flujo_principal': version})
+            self.assertEqual(respuesta.status_code, 200, respuesta.content)
+
+        for numero, version in enumerate(versiones, start=1):
+            self.assertEqual(reconstruir_revision('caso_uso', caso_uso_id, numero)['flujo_principal'], version)
+        self.assertEqual(CasosUso.objects.get(id=caso_uso_id).flujo_principal, versiones[-1])
@@ -7,4 +7,18 @@ urlpatterns = [
     path('editar/<int:proyecto_id>/', views.editar_proyecto, name='editar_proyecto'),
     path('obtener_proyecto/<int:proyecto_id>/', views.obtener_proyecto, name='obtener_proyecto'),
     path('eliminar/<int:proyecto_id>/', views.eliminar_proyecto, name='eliminar_proyecto'),
+    path('clonar/<int:proyecto_id>/', views.clonar_proyecto, name='clonar_proyecto'),
+    path('exportar/<int:proyecto_id>/<str:tipo>/', views.exportar_proyecto, name='exportar_proyecto'),
+    path('importar/<int:proyecto_id>/<str:tipo>/', views.importar_proyecto, name='importar_proyecto'),
+    path('especificacion/<int:proyecto_id>/', views.especificacion_proyecto, name='especificacion_proyecto'),
+
+    # Líneas base
+    path('lineas_base/crear/<int:proyecto_id>/', views.crear_linea_base_proyecto, name='crear_linea_base_proyecto'),
+    path('lineas_base/<int:proyecto_id>/', views.listar_lineas_base, name='listar_lineas_base'),
+    path('lineas_base/comparar/<int:anterior_id>/<int:posterior_id>/', views.comparar_lineas_base_proyecto, name='comparar_lineas_base_proyecto'),
+    path('lineas_base/elemento/<int:linea_base_id>/<str:tipo>/<int:elemento_id>/', views.elemento_linea_base, name='elemento_linea_base'),
+
+    # Historial de revisiones de requisitos, casos de uso e historias
+    path('revisiones/<str:tipo>/<int:elemento_id>/', views.historial_elemento, name='historial_elemento'),
+    path('revisiones/<str:tipo>/<int:elemento_id>/<int:numero>/', views.revision_elemento, name='revision_elemento'),
 ]
\ No newline at end of file
@@ -1,10 +1,25 @@
+import csv
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import StreamingHttpResponse, FileResponse, HttpResponse
+from app.instrumentacion import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
+from django.db import transaction, connection
+from django.utils import timezone
 from datetime import datetime
-from proyectos.models import Proyectos
+from proyectos.models import Proyectos, LineasBase
+from requisitos.models import Requisitos, RelacionesRequisitos
+from requisitos.grafo import invalidar_grafo
+from casosdeuso.models import CasosUso, RelacionesCasosUso, CasosUsoRequisitos
+from casosdeuso.clausura import reconstruir_clausura_proyecto
+from proyectos.exportacion import TIPOS_EXPORTACION, FORMATOS_EXPORTACION, generar_csv, generar_xlsx
+from proyectos.importacion import (
+    TIPOS_IMPORTACION, FORMATOS_IMPORTACION, ImportacionInvalida, importar, leer_registros
+)
+from proyectos.lineas_base import TIPOS_ELEMENTO, crear_linea_base, comparar_lineas_base, contenido_elemento
+from proyectos.revisiones import TIPOS_REVISION, listar_revisiones, reconstruir_revision
+from proyectos.especificacion import FORMATOS_ESPECIFICACION, generar_especificacion, generar_pdf
+from historiasdeusuario.models import HistoriasUsuario, HistoriasEstimaciones, HistoriasRequisitos
 from usuarios.views import validar_token
 from usuarios.models import Usuarios
 
@@ -52,17 +67,17 @@ def crear_proyecto(request):
 # Listar proyectos del usuario
 # -----------------------------
 @require_http_methods(["GET"])
-def listar_proyectos(request):
+async def listar_proyectos(request):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        usuario_obj = await Usuarios.objects.aget(id=payload['usuario_id'], activo=True)
         proyectos = Proyectos.objects.filter(usuario=usuario_obj, activo=True)
 
         proyectos_data = []
-        for p in proyectos:
+        async for p in proyectos:
             proyectos_data.append({
                 'proyecto_id': p.id,
                 'nombre': p.nombre,
@@ -78,14 +93,14 @@ def listar_proyectos(request):
         return JsonResponse({'error': str(e)}, status=500)
     
 @require_http_methods(["GET"])
-def obtener_proyecto(request, proyecto_id):
+async def obtener_proyecto(request, proyecto_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
-        proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
+        usuario_obj = await Usuarios.objects.aget(id=payload['usuario_id'], activo=True)
+        proyecto = await Proyectos.objects.aget(id=proyecto_id, usuario=usuario_obj, activo=True)
 
         return JsonResponse({
             'proyecto_id': proyecto.id,
@@ -152,12 +167,506 @@ def eliminar_proyecto(request, proyecto_id):
         usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
         proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
 
-        proyecto.activo = False
-        proyecto.save()
+        with transaction.atomic():
+            proyecto.activo = False
+            proyecto.save()
+
+            # Cascada del soft delete a los artefactos del proyecto (una sentencia por tabla)
+            ahora = timezone.now()
+            Requisitos.objects.filter(proyecto_id=proyecto.id, activo=True).update(activo=False, fecha_actualizacion=ahora)
+            CasosUso.objects.filter(proyecto_id=proyecto.id, activo=True).update(activo=False, fecha_actualizacion=ahora)
+            HistoriasUsuario.objects.filter(proyecto_id=proyecto.id, activo=True).update(activo=False, fecha_actualizacion=ahora)
+            RelacionesRequisitos.objects.filter(requisito_origen__proyecto_id=proyecto.id, activo=True).update(activo=False)
+            RelacionesCasosUso.objects.filter(caso_uso_origen__proyecto_id=proyecto.id, activo=True).update(activo=False)
+            HistoriasEstimaciones.objects.filter(historia__proyecto_id=proyecto.id, activo=True).update(activo=False, fecha_actualizacion=ahora)
+            CasosUsoRequisitos.objects.filter(requisito__proyecto_id=proyecto.id, activo=True).update(activo=False)
+            HistoriasRequisitos.objects.filter(requisito__proyecto_id=proyecto.id, activo=True).update(activo=False)
+            LineasBase.objects.filter(proyecto_id=proyecto.id, activo=True).update(activo=False, fecha_actualizacion=ahora)
+
+        invalidar_grafo(proyecto.id)
 
         return JsonResponse({'mensaje': 'Proyecto eliminado exitosamente'}, status=200)
 
     except Proyectos.DoesNotExist:
         return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# -----------------------------
+# Clonar proyecto (INSERT ... SELECT dentro de Postgres)
+# -----------------------------
+# Columnas copiadas tal cual para cada artefacto del proyecto (sin id, proyecto_id ni fechas)
+COLUMNAS_CLONABLES = {
+    'requisitos': [
+        'nombre', 'descripcion', 'tipo_id', 'criterios', 'prioridad_id', 'estado_id',
+        'origen', 'condiciones_previas',
+    ],
+    'casos_uso': [
+        'nombre', 'descripcion', 'actores', 'precondiciones', 'flujo_principal',
+        'flujos_alternativos', 'postcondiciones', 'requisitos_especiales',
+        'riesgos_consideraciones', 'prioridad_id', 'estado_id',
+    ],
+    'historias_usuario': [
+        'titulo', 'descripcion', 'actor_rol', 'funcionalidad_accion', 'beneficio_razon',
+        'criterios_aceptacion', 'prioridad_id', 'estado_id', 'valor_negocio',
+        'dependencias_relaciones', 'componentes_relacionados', 'notas_adicionales',
+    ],
+}
+
+
+def _clonar_artefactos(cursor, proyecto_origen_id, proyecto_destino_id):
+    """Copia los artefactos activos de un proyecto a otro y devuelve cuántos se copiaron por tabla.
+
+    Los ids nuevos se reservan con nextval() en tablas temporales de mapeo
+    (id viejo -> id nuevo), así todas las copias son INSERT ... SELECT sin
+    recorrer filas en Python. Debe ejecutarse dentro de transaction.atomic().
+    """
+    copiados = {}
+
+    for tabla, columnas in COLUMNAS_CLONABLES.items():
+        mapa = f'mapa_{tabla}'
+        cursor.execute(f"""
+            CREATE TEMP TABLE {mapa} (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)
+            ON COMMIT DROP
+        """)
+        cursor.execute(f"""
+            INSERT INTO {mapa} (old_id, new_id)
+            SELECT id, nextval(pg_get_serial_sequence('{tabla}', 'id'))
+            FROM {tabla}
+            WHERE proyecto_id = %s AND activo = TRUE
+            ORDER BY id
+        """, [proyecto_origen_id])
+
+        lista = ', '.join(columnas)
+        origen = ', '.join(f't.{c}' for c in columnas)
+        cursor.execute(f"""
+            INSERT INTO {tabla} (id, {lista}, proyecto_id, fecha_creacion, fecha_actualizacion, activo)
+            SELECT m.new_id, {origen}, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, TRUE
+            FROM {tabla} t
+            JOIN {mapa} m ON m.old_id = t.id
+        """, [proyecto_destino_id])
+        copiados[tabla] = cursor.rowcount
+
+    # Relaciones entre requisitos (solo si ambos extremos fueron clonados)
+    cursor.execute("""
+        INSERT INTO relaciones_requisitos
+            (requisito_origen_id, requisito_destino_id, tipo_relacion_id, descripcion, fecha_creacion, activo)
+        SELECT mo.new_id, md.new_id, r.tipo_relacion_id, r.descripcion, CURRENT_TIMESTAMP, TRUE
+        FROM relaciones_requisitos r
+        JOIN mapa_requisitos mo ON mo.old_id = r.requisito_origen_id
+        JOIN mapa_requisitos md ON md.old_id = r.requisito_destino_id
+        WHERE r.activo = TRUE
+    """)
+    copiados['relaciones_requisitos'] = cursor.rowcount
+
+    # Relaciones entre casos de uso
+    cursor.execute("""
+        INSERT INTO relaciones_casos_uso
+            (caso_uso_origen_id, caso_uso_destino_id, tipo_relacion_id, descripcion, fecha_creacion, activo)
+        SELECT mo.new_id, md.new_id, r.tipo_relacion_id, r.descripcion, CURRENT_TIMESTAMP, TRUE
+        FROM relaciones_casos_uso r
+        JOIN mapa_casos_uso mo ON mo.old_id = r.caso_uso_origen_id
+        JOIN mapa_casos_uso md ON md.old_id = r.caso_uso_destino_id
+        WHERE r.activo = TRUE
+    """)
+    copiados['relaciones_casos_uso'] = cursor.rowcount
+
+    # Estimaciones de las historias
+    cursor.execute("""
+        INSERT INTO historias_estimaciones
+            (historia_id, tipo_estimacion_id, valor, fecha_creacion, fecha_actualizacion, activo)
+        SELECT m.new_id, e.tipo_estimacion_id, e.valor, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, TRUE
+        FROM historias_estimaciones e
+        JOIN mapa_historias_usuario m ON m.old_id = e.historia_id
+        WHERE e.activo = TRUE
+    """)
+    copiados['historias_estimaciones'] = cursor.rowcount
+
+    # Trazabilidad requisito <-> caso de uso / historia
+    cursor.execute("""
+        INSERT INTO casos_uso_requisitos (caso_uso_id, requisito_id, fecha_creacion, activo)
+        SELECT mc.new_id, mr.new_id, CURRENT_TIMESTAMP, TRUE
+        FROM casos_uso_requisitos l
+        JOIN mapa_casos_uso mc ON mc.old_id = l.caso_uso_id
+        JOIN mapa_requisitos mr ON mr.old_id = l.requisito_id
+        WHERE l.activo = TRUE
+    """)
+    copiados['casos_uso_requisitos'] = cursor.rowcount
+
+    cursor.execute("""
+        INSERT INTO historias_requisitos (historia_id, requisito_id, fecha_creacion, activo)
+        SELECT mh.new_id, mr.new_id, CURRENT_TIMESTAMP, TRUE
+        FROM historias_requisitos l
+        JOIN mapa_historias_usuario mh ON mh.old_id = l.historia_id
+        JOIN mapa_requisitos mr ON mr.old_id = l.requisito_id
+        WHERE l.activo = TRUE
+    """)
+    copiados['historias_requisitos'] = cursor.rowcount
+
+    return copiados
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def clonar_proyecto(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
+
+        nombre = request.POST.get('nombre') or f"{proyecto.nombre} (copia)"
+
+        with transaction.atomic():
+            nuevo = Proyectos.objects.create(
+                nombre=nombre[:100],
+                descripcion=proyecto.descripcion,
+                estado=proyecto.estado,
+                usuario=usuario_obj,
+                activo=True
+            )
+
+            with connection.cursor() as cursor:
+                copiados = _clonar_artefactos(cursor, proyecto.id, nuevo.id)
+                reconstruir_clausura_proyecto(cursor, nuevo.id)
+
+        return JsonResponse({
+            'mensaje': 'Proyecto clonado exitosamente',
+            'proyecto_id': nuevo.id,
+            'nombre': nuevo.nombre,
+            'estado': nuevo.estado,
+            'elementos_clonados': copiados
+        }, status=201)
+
+    except Proyectos.DoesNotExist:
+        return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# -----------------------------
+# Exportar artefactos de un proyecto (CSV o XLSX en streaming)
+# -----------------------------
+@require_http_methods(["GET"])
+def exportar_proyecto(request, proyecto_id, tipo):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
+
+        if tipo not in TIPOS_EXPORTACION:
+            return JsonResponse({'error': 'El tipo debe ser requisitos, casos_uso o historias'}, status=400)
+
+        formato = request.GET.get('formato', 'csv')
+        if formato not in FORMATOS_EXPORTACION:
+            return JsonResponse({'error': 'El formato debe ser csv o xlsx'}, status=400)
+
+        nombre_archivo = f'proyecto_{proyecto.id}_{tipo}.{formato}'
+
+        if formato == 'xlsx':
+            try:
+                archivo = generar_xlsx(proyecto.id, tipo)
+            except ImportError:
+                return JsonResponse({'error': 'La exportación XLSX requiere openpyxl'}, status=501)
+            return FileResponse(
+                archivo,
+                as_attachment=True,
+                filename=nombre_archivo,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+
+        response = StreamingHttpResponse(generar_csv(proyecto.id, tipo), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return response
+
+    except Proyectos.DoesNotExist:
+        return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# -----------------------------
+# Importar artefactos desde CSV o JSON (COPY a staging)
+# -----------------------------
+@csrf_exempt
+@require_http_methods(["POST"])
+def importar_proyecto(request, proyecto_id, tipo):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
+
+        if tipo not in TIPOS_IMPORTACION:
+            return JsonResponse({'error': 'El tipo debe ser requisitos, casos_uso o historias'}, status=400)
+
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return JsonResponse({'error': 'Debe enviar el archivo en el campo "archivo"'}, status=400)
+
+        formato = request.GET.get('formato') or archivo.name.rsplit('.', 1)[-1].lower()
+        if formato not in FORMATOS_IMPORTACION:
+            return JsonResponse({'error': 'El formato debe ser csv o json'}, status=400)
+
+        parcial = request.GET.get('parcial', '').lower() in ('1', 'true', 'si')
+
+        try:
+            resultado = importar(proyecto.id, tipo, leer_registros(archivo.file, formato), parcial=parcial)
+        except (ImportacionInvalida, UnicodeDecodeError, csv.Error) as e:
+            return JsonResponse({'error': f'Archivo no válido: {e}'}, status=400)
+
+        if resultado['total_errores'] and not parcial:
+            return JsonResponse({
+                'error': 'El archivo contiene errores; no se importó ningún elemento',
+                **resultado
+            }, status=400)
+
+        return JsonResponse({'mensaje': 'Importación completada', **resultado}, status=200)
+
+    except Proyectos.DoesNotExist:
+        return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# -----------------------------
+# Líneas base (instantáneas congeladas del proyecto)
+# -----------------------------
+def _datos_linea_base(linea_base):
+    return {
+        'id': linea_base.id,
+        'proyecto_id': linea_base.proyecto_id,
+        'nombre': linea_base.nombre,
+        'descripcion': linea_base.descripcion,
+        'total_elementos': linea_base.total_elementos,
+        'fecha_creacion': linea_base.fecha_creacion.isoformat() if linea_base.fecha_creacion else None,
+    }
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def crear_linea_base_proyecto(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
+
+        nombre = request.POST.get('nombre')
+        descripcion = request.POST.get('descripcion', '')
+        if not nombre:
+            return JsonResponse({'error': 'El campo nombre es requerido'}, status=400)
+
+        linea_base, contenidos_nuevos = crear_linea_base(proyecto, nombre[:100], descripcion)
+
+        return JsonResponse({
+            'mensaje': 'Línea base creada exitosamente',
+            'linea_base': _datos_linea_base(linea_base),
+            'contenidos_nuevos': contenidos_nuevos,
+            'contenidos_reutilizados': linea_base.total_elementos - contenidos_nuevos
+        }, status=201)
+
+    except Proyectos.DoesNotExist:
+        return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+async def listar_lineas_base(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = await Usuarios.objects.aget(id=payload['usuario_id'], activo=True)
+        proyecto = await Proyectos.objects.aget(id=proyecto_id, usuario=usuario_obj, activo=True)
+
+        lineas_base = LineasBase.objects.filter(proyecto=proyecto, activo=True).order_by('-fecha_creacion')
+        return JsonResponse({'lineas_base': [_datos_linea_base(lb) async for lb in lineas_base]}, status=200)
+
+    except Proyectos.DoesNotExist:
+        return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def comparar_lineas_base_proyecto(request, anterior_id, posterior_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        lineas_base = LineasBase.objects.filter(
+            id__in=[anterior_id, posterior_id],
+            proyecto__usuario=usuario_obj,
+            proyecto__activo=True,
+            activo=True
+        )
+        proyectos = {lb.id: lb.proyecto_id for lb in lineas_base}
+        if anterior_id not in proyectos or posterior_id not in proyectos:
+            return JsonResponse({'error': 'Línea base no encontrada'}, status=404)
+        if proyectos[anterior_id] != proyectos[posterior_id]:
+            return JsonResponse({'error': 'Las líneas base pertenecen a proyectos distintos'}, status=400)
+
+        return JsonResponse({
+            'anterior_id': anterior_id,
+            'posterior_id': posterior_id,
+            **comparar_lineas_base(anterior_id, posterior_id)
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def elemento_linea_base(request, linea_base_id, tipo, elemento_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        linea_base = LineasBase.objects.get(
+            id=linea_base_id, proyecto__usuario=usuario_obj, proyecto__activo=True, activo=True
+        )
+
+        if tipo not in TIPOS_ELEMENTO:
+            return JsonResponse({'error': 'El tipo debe ser requisito, caso_uso o historia_usuario'}, status=400)
+
+        contenido = contenido_elemento(linea_base.id, tipo, elemento_id)
+        if contenido is None:
+            return JsonResponse({'error': 'El elemento no forma parte de la línea base'}, status=404)
+
+        return JsonResponse({
+            'linea_base_id': linea_base.id,
+            'tipo': tipo,
+            'elemento_id': elemento_id,
+            'contenido': contenido
+        }, status=200)
+
+    except LineasBase.DoesNotExist:
+        return JsonResponse({'error': 'Línea base no encontrada'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# -----------------------------
+# Historial de revisiones de un artefacto
+# -----------------------------
+MODELOS_REVISION = {
+    'requisito': Requisitos,
+    'caso_uso': CasosUso,
+    'historia_usuario': HistoriasUsuario,
+}
+
+
+def _elemento_del_usuario(payload, tipo, elemento_id):
+    """El artefacto (activo o no) si pertenece a un proyecto activo del usuario; si no, None."""
+    usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+    return MODELOS_REVISION[tipo].objects.filter(
+        id=elemento_id, proyecto__usuario=usuario_obj, proyecto__activo=True
+    ).first()
+
+
+@require_http_methods(["GET"])
+def historial_elemento(request, tipo, elemento_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        if tipo not in TIPOS_REVISION:
+            return JsonResponse({'error': 'El tipo debe ser requisito, caso_uso o historia_usuario'}, status=400)
+
+        if not _elemento_del_usuario(payload, tipo, elemento_id):
+            return JsonResponse({'error': 'Elemento no encontrado'}, status=404)
+
+        return JsonResponse({
+            'tipo': tipo,
+            'elemento_id': elemento_id,
+            'revisiones': listar_revisiones(tipo, elemento_id)
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def revision_elemento(request, tipo, elemento_id, numero):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        if tipo not in TIPOS_REVISION:
+            return JsonResponse({'error': 'El tipo debe ser requisito, caso_uso o historia_usuario'}, status=400)
+
+        if not _elemento_del_usuario(payload, tipo, elemento_id):
+            return JsonResponse({'error': 'Elemento no encontrado'}, status=404)
+
+        estado = reconstruir_revision(tipo, elemento_id, numero)
+        if estado is None:
+            return JsonResponse({'error': 'Revisión no encontrada'}, status=404)
+
+        return JsonResponse({
+            'tipo': tipo,
+            'elemento_id': elemento_id,
+            'numero': numero,
+            'datos': estado
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+# -----------------------------
+# Especificación de requisitos (ERS) en Markdown, HTML o PDF
+# -----------------------------
+@require_http_methods(["GET"])
+def especificacion_proyecto(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        usuario_obj = Usuarios.objects.get(id=payload['usuario_id'], activo=True)
+        proyecto = Proyectos.objects.get(id=proyecto_id, usuario=usuario_obj, activo=True)
+
+        formato = request.GET.get('formato', 'html')
+        if formato not in FORMATOS_ESPECIFICACION:
+            return JsonResponse({'error': 'El formato debe ser md, html o pdf'}, status=400)
+
+        nombre_archivo = f'ers_proyecto_{proyecto.id}.{formato}'
+
+        if formato == 'pdf':
+            try:
+                contenido = generar_pdf(proyecto)
+            except ImportError:
+                return JsonResponse({'error': 'La generación de PDF requiere WeasyPrint'}, status=501)
+            response = HttpResponse(contenido, content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+            return response
+
+        tipo_contenido = 'text/markdown; charset=utf-8' if formato == 'md' else 'text/html; charset=utf-8'
+        response = StreamingHttpResponse(generar_especificacion(proyecto, formato), content_type=tipo_contenido)
+        if formato == 'md':
+            response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        return response
+
+    except Proyectos.DoesNotExist:
+        return JsonResponse({'error': 'Proyecto no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
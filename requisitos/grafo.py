@@ -0,0 +1,246 @@
+# requisitos/grafo.py
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+from requisitos.models import Requisitos, RelacionesRequisitos, TiposRelacionRequisito
+
+# Tipos de relación que imponen un orden de implementación
+TIPOS_ORDEN = ('depende', 'bloquea')
+
+logger = logging.getLogger(__name__)
+
+# Las escrituras invalidan el análisis; el vencimiento solo libera los proyectos sin consultas
+TIEMPO_CACHE_GRAFO = 60 * 60 * 24
+
+
+def clave_cache_grafo(proyecto_id):
+    return f'requisitos:grafo:{proyecto_id}'
+
+
+def invalidar_grafo(proyecto_id):
+    """Descarta el análisis cacheado; llamar cada vez que cambian las relaciones del proyecto.
+
+    El cache es el compartido de CACHES (app/settings.py), así la invalidación llega a
+    todos los procesos del servidor. Se aplica al confirmar la transacción en curso (en el
+    acto si no hay una) y un error del cache solo se registra: la escritura ya quedó
+    guardada y no debe responder 500; el análisis viejo vence con TIEMPO_CACHE_GRAFO.
+    """
+    clave = clave_cache_grafo(proyecto_id)
+
+    def descartar():
+        try:
+            cache.delete(clave)
+        except Exception:
+            logger.exception("No se pudo invalidar el grafo cacheado del proyecto %s", proyecto_id)
+
+    transaction.on_commit(descartar)
+
+
+def componentes_fuertes(n, adyacencia):
+    """Tarjan iterativo sobre nodos 0..n-1; devuelve la componente de cada nodo y cuántas hay.
+
+    Las componentes se numeran en orden topológico inverso (la primera no tiene sucesoras).
+    """
+    indice = [-1] * n
+    bajo = [0] * n
+    en_pila = [False] * n
+    componente = [-1] * n
+    pila = []
+    contador = 0
+    total = 0
+
+    for raiz in range(n):
+        if indice[raiz] != -1:
+            continue
+        trabajo = [(raiz, 0)]
+        while trabajo:
+            v, i = trabajo[-1]
+            if i == 0:
+                indice[v] = bajo[v] = contador
+                contador += 1
+                pila.append(v)
+                en_pila[v] = True
+            vecinos = adyacencia[v]
+            while i < len(vecinos):
+                w = vecinos[i]
+                i += 1
+                if indice[w] == -1:
+                    trabajo[-1] = (v, i)
+                    trabajo.append((w, 0))
+                    break
+                if en_pila[w] and indice[w] < bajo[v]:
+                    bajo[v] = indice[w]
+            else:
+                trabajo.pop()
+                if trabajo:
+                    padre = trabajo[-1][0]
+                    if bajo[v] < bajo[padre]:
+                        bajo[padre] = bajo[v]
+                if bajo[v] == indice[v]:
+                    while True:
+                        w = pila.pop()
+                        en_pila[w] = False
+                        componente[w] = total
+                        if w == v:
+                            break
+                    total += 1
+
+    return componente, total
+
+
+def analizar_grafo(proyecto_id):
+    """Carga las relaciones activas del proyecto en una consulta y calcula ciclos y orden.
+
+    Para el orden de implementación una arista "A depende B" significa B antes que A,
+    y "A bloquea B" significa A antes que B. Los requisitos de un mismo ciclo se
+    emiten juntos, ordenados por id.
+    """
+    nodos = list(
+        Requisitos.objects.filter(proyecto_id=proyecto_id, activo=True)
+        .order_by('id').values_list('id', flat=True)
+    )
+    relaciones = RelacionesRequisitos.objects.filter(
+        activo=True,
+        requisito_origen__proyecto_id=proyecto_id,
+        requisito_origen__activo=True,
+        requisito_destino__proyecto_id=proyecto_id,
+        requisito_destino__activo=True
+    ).values_list('requisito_origen_id', 'requisito_destino_id', 'tipo_relacion_id', 'tipo_relacion__nombre')
+
+    posicion = {requisito_id: i for i, requisito_id in enumerate(nodos)}
+    adyacencia = [[] for _ in nodos]
+    aristas = []
+    tipos = {}
+
+    for origen, destino, tipo_id, tipo_nombre in relaciones:
+        aristas.append([origen, destino, tipo_id])
+        tipos[tipo_id] = tipo_nombre
+        if tipo_nombre == 'depende':
+            adyacencia[posicion[destino]].append(posicion[origen])
+        elif tipo_nombre == 'bloquea':
+            adyacencia[posicion[origen]].append(posicion[destino])
+
+    componente, total = componentes_fuertes(len(nodos), adyacencia)
+
+    miembros = [[] for _ in range(total)]
+    for v, c in enumerate(componente):
+        miembros[c].append(nodos[v])
+
+    # Tarjan numera en orden topológico inverso: recorrer de la última a la primera
+    orden = []
+    for c in range(total - 1, -1, -1):
+        orden.extend(miembros[c])
+
+    ciclos = [grupo for grupo in miembros if len(grupo) > 1]
+
+    return {
+        'proyecto_id': proyecto_id,
+        'nodos': nodos,
+        'aristas': aristas,
+        'tipos_relacion': {str(tipo_id): nombre for tipo_id, nombre in tipos.items()},
+        'ciclos': ciclos,
+        'es_aciclico': not ciclos,
+        'orden_implementacion': orden,
+    }
+
+
+def obtener_analisis(proyecto_id):
+    """Devuelve el análisis del grafo desde el cache, calculándolo si hace falta."""
+    clave = clave_cache_grafo(proyecto_id)
+    analisis = cache.get(clave)
+    if analisis is None:
+        analisis = analizar_grafo(proyecto_id)
+        cache.set(clave, analisis, timeout=TIEMPO_CACHE_GRAFO)
+    return analisis
+
+
+# Relaciones que propagan el impacto de un cambio
+TIPOS_IMPACTO = ('depende', 'deriva', 'refina')
+
+# "origen <tipo> destino": aguas arriba se sigue origen -> destino,
+# aguas abajo (lo que se ve afectado) se sigue destino -> origen
+COLUMNAS_DIRECCION = {
+    'aguas_arriba': ('requisito_origen_id', 'requisito_destino_id'),
+    'aguas_abajo': ('requisito_destino_id', 'requisito_origen_id'),
+}
+
+
+def cierre_transitivo(cursor, requisito_id, tipos_ids, profundidad_maxima, direccion):
+    """Requisitos alcanzables desde requisito_id con un CTE recursivo, con la distancia mínima.
+
+    UNION (sin ALL) descarta pares (requisito, profundidad) repetidos, así los ciclos
+    quedan acotados por la profundidad máxima sin tener que arrastrar el camino.
+    Usa los índices sobre requisito_origen_id / requisito_destino_id de bd.sql.
+    """
+    desde, hacia = COLUMNAS_DIRECCION[direccion]
+    cursor.execute(f"""
+        WITH RECURSIVE alcance(requisito_id, profundidad) AS (
+            SELECT %(inicio)s, 0
+            UNION
+            SELECT r.{hacia}, a.profundidad + 1
+            FROM alcance a
+            JOIN relaciones_requisitos r ON r.{desde} = a.requisito_id
+            WHERE r.activo = TRUE
+              AND r.tipo_relacion_id = ANY(%(tipos)s)
+              AND a.profundidad < %(maxima)s
+        )
+        SELECT q.id, q.nombre, MIN(a.profundidad) AS profundidad
+        FROM alcance a
+        JOIN requisitos q ON q.id = a.requisito_id
+        WHERE a.profundidad > 0 AND q.activo = TRUE AND q.id <> %(inicio)s
+        GROUP BY q.id, q.nombre
+        ORDER BY profundidad, q.id
+    """, {'inicio': requisito_id, 'tipos': list(tipos_ids), 'maxima': profundidad_maxima})
+
+    return [
+        {'id': fila[0], 'nombre': fila[1], 'profundidad': fila[2]}
+        for fila in cursor.fetchall()
+    ]
+
+
+class CicloDetectado(Exception):
+    pass
+
+
+def forma_ciclo(cursor, requisito_id):
+    """Indica si requisito_id participa en un ciclo de precedencia (depende / bloquea).
+
+    Se usa justo después de escribir las relaciones de un requisito: como todas las
+    aristas nuevas tocan a ese requisito, cualquier ciclo nuevo pasa por él. El CTE
+    parte de sus sucesores y UNION descarta los ids ya visitados, así el recorrido
+    queda acotado por los requisitos alcanzables y EXISTS corta en la primera
+    coincidencia.
+    """
+    tipos = dict(
+        TiposRelacionRequisito.objects.filter(nombre__in=TIPOS_ORDEN).values_list('nombre', 'id')
+    )
+    if not tipos:
+        return False
+
+    cursor.execute("""
+        WITH RECURSIVE alcance(id) AS (
+            SELECT r.requisito_origen_id
+            FROM relaciones_requisitos r
+            WHERE r.requisito_destino_id = %(inicio)s AND r.tipo_relacion_id = %(depende)s AND r.activo = TRUE
+            UNION
+            SELECT r.requisito_destino_id
+            FROM relaciones_requisitos r
+            WHERE r.requisito_origen_id = %(inicio)s AND r.tipo_relacion_id = %(bloquea)s AND r.activo = TRUE
+            UNION
+            SELECT s.id
+            FROM alcance a
+            CROSS JOIN LATERAL (
+                SELECT r.requisito_origen_id AS id
+                FROM relaciones_requisitos r
+                WHERE r.requisito_destino_id = a.id AND r.tipo_relacion_id = %(depende)s AND r.activo = TRUE
+                UNION ALL
+                SELECT r.requisito_destino_id
+                FROM relaciones_requisitos r
+                WHERE r.requisito_origen_id = a.id AND r.tipo_relacion_id = %(bloquea)s AND r.activo = TRUE
+            ) s
+        )
+        SELECT EXISTS (SELECT 1 FROM alcance WHERE id = %(inicio)s)
+    """, {'inicio': requisito_id, 'depende': tipos.get('depende'), 'bloquea': tipos.get('bloquea')})
+    return cursor.fetchone()[0]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('proyectos', '0001_esquema_base'),
+    ]
+
+    operations = [
+        # Listado por proyecto ordenado por fecha: el índice entrega las filas ya ordenadas y
+        # reemplaza al parcial solo por proyecto_id de bd.sql
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_requisitos_proyecto_fecha_activo "
+            "ON requisitos (proyecto_id, fecha_creacion DESC) WHERE activo = TRUE",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_requisitos_proyecto_fecha_activo",
+        ),
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_requisitos_proyecto_activo",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_requisitos_proyecto_activo "
+            "ON requisitos (proyecto_id) WHERE activo = TRUE",
+        ),
+    ]
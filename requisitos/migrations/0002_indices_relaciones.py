@@ -0,0 +1,28 @@
+# Índices de bd.sql posteriores a la primera versión del esquema, para las instalaciones que
+# ya existían: en una base nueva ya están y IF NOT EXISTS no hace nada. Al revertir no se
+# borran, porque en ese caso pertenecen a bd.sql.
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no admite transacciones; así no se bloquean las escrituras
+    atomic = False
+
+    dependencies = [
+        ('requisitos', '0001_indices'),
+    ]
+
+    operations = [
+        # Relaciones en ambos sentidos (análisis de impacto y grafo de dependencias)
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_relaciones_requisitos_origen "
+            "ON relaciones_requisitos (requisito_origen_id, tipo_relacion_id)",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_relaciones_requisitos_destino "
+            "ON relaciones_requisitos (requisito_destino_id, tipo_relacion_id)",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,3 +1,119 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from app.pruebas import PruebaApi, PruebaPlanes
+from casosdeuso.models import CasosUsoRequisitos
+from historiasdeusuario.models import HistoriasRequisitos
+from requisitos.models import Requisitos, RelacionesRequisitos
+from requisitos.trazabilidad import matriz_trazabilidad
+
+
+class PlanesConsultasTests(PruebaPlanes):
+    """Las consultas frecuentes de requisitos no deben recorrer tablas grandes enteras."""
+
+    def test_listar_requisitos(self):
+        self.assertSinSeqScan(
+            Requisitos.objects.filter(proyecto_id=self.proyecto_id, activo=True)
+            .select_related('tipo', 'prioridad', 'estado').order_by('-fecha_creacion')
+        )
+
+    def test_obtener_requisito(self):
+        self.assertSinSeqScan(Requisitos.objects.filter(id=self.requisito_id, activo=True))
+
+    def test_relaciones_salientes(self):
+        self.assertSinSeqScan(
+            RelacionesRequisitos.objects.filter(requisito_origen_id=self.requisito_id)
+            .select_related('requisito_destino', 'tipo_relacion')
+        )
+
+    def test_relaciones_entrantes(self):
+        self.assertSinSeqScan(RelacionesRequisitos.objects.filter(requisito_destino_id=self.requisito_id, activo=True))
+
+    def test_vinculos_del_requisito(self):
+        self.assertSinSeqScan(CasosUsoRequisitos.objects.filter(requisito_id=self.requisito_id, activo=True))
+        self.assertSinSeqScan(HistoriasRequisitos.objects.filter(requisito_id=self.requisito_id, activo=True))
+
+
+class VinculosTests(PruebaApi):
+    """Acciones de /requisitos/vinculos/ sobre los casos de uso e historias de un requisito."""
+
+    def setUp(self):
+        self.requisito_id = self.proyecto['ids']['requisito'][0]
+        self.casos_uso = self.proyecto['ids']['caso_uso'][:2]
+        self.historias = self.proyecto['ids']['historia_usuario'][:2]
+        self.ruta = f'/app/requisitos/vinculos/{self.requisito_id}/'
+
+    def test_agregar_y_reemplazar(self):
+        respuesta = self.post_json(self.ruta, {
+            'accion': 'agregar', 'casos_uso': self.casos_uso, 'historias': self.historias
+        })
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(respuesta.json()['casos_uso'], self.casos_uso)
+        self.assertEqual(respuesta.json()['historias'], self.historias)
+
+        # Solo cambia el conjunto que viene en la petición
+        respuesta = self.post_json(self.ruta, {'accion': 'reemplazar', 'historias': [self.historias[1]]})
+        self.assertEqual(respuesta.json()['historias'], [self.historias[1]])
+        self.assertNotIn('casos_uso', respuesta.json())
+        self.assertEqual(
+            sorted(CasosUsoRequisitos.objects.filter(requisito_id=self.requisito_id, activo=True)
+                   .values_list('caso_uso_id', flat=True)),
+            self.casos_uso
+        )
+
+    def test_artefactos_de_otro_proyecto(self):
+        ajenos = {'casos_uso': [self.otro_proyecto['ids']['caso_uso'][0]],
+                  'historias': [self.otro_proyecto['ids']['historia_usuario'][0]]}
+        respuesta = self.post_json(self.ruta, {'accion': 'agregar', 'casos_uso': self.casos_uso, **ajenos})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['invalidos'], ajenos)
+        self.assertFalse(HistoriasRequisitos.objects.filter(requisito_id=self.requisito_id).exists())
+
+    def test_sin_conjuntos(self):
+        respuesta = self.post_json(self.ruta, {'accion': 'agregar'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ValidarCiclosTests(PruebaApi):
+    """El campo validar_ciclos solo acepta un booleano JSON."""
+
+    def setUp(self):
+        self.requisito_id = self.proyecto['ids']['requisito'][0]
+
+    def test_crear_con_texto(self):
+        respuesta = self.post_json('/app/requisitos/crear/', {
+            'nombre': 'Requisito de prueba', 'descripcion': 'Descripción', 'tipo_id': 1,
+            'criterios': 'Criterios', 'proyecto_id': self.proyecto['proyecto_id'], 'validar_ciclos': 'false',
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('validar_ciclos', respuesta.json()['error'])
+
+    def test_actualizar_con_texto(self):
+        nombre = Requisitos.objects.get(id=self.requisito_id).nombre
+        respuesta = self.client.patch(
+            f'/app/requisitos/actualizar/{self.requisito_id}/',
+            json.dumps({'nombre': 'Nombre cambiado', 'validar_ciclos': 0}),
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(Requisitos.objects.get(id=self.requisito_id).nombre, nombre)
+
+
+class MatrizTrazabilidadTests(PruebaApi):
+    """La matriz sale de las dos consultas de vínculos."""
+
+    def test_ejes_desde_vinculos(self):
+        ids = self.proyecto['ids']
+        requisitos, casos_uso, historias = ids['requisito'][:3], ids['caso_uso'][:2], ids['historia_usuario'][:1]
+        self.post_json(f'/app/requisitos/vinculos/{requisitos[2]}/', {'accion': 'agregar', 'casos_uso': casos_uso})
+        self.post_json(f'/app/requisitos/vinculos/{requisitos[0]}/', {'accion': 'agregar', 'historias': historias})
+
+        with self.assertNumQueries(2):
+            matriz = matriz_trazabilidad(self.proyecto['proyecto_id'])
+        self.assertEqual(matriz['requisitos'], [requisitos[0], requisitos[2]])
+        self.assertEqual(matriz['casos_uso'], casos_uso)
+        self.assertEqual(matriz['historias'], historias)
+        self.assertEqual(matriz['requisito_caso_uso'], [[1, 0], [1, 1]])
+        self.assertEqual(matriz['requisito_historia'], [[0, 0]])
+
+        matriz = matriz_trazabilidad(self.proyecto['proyecto_id'], 'bitset')
+        self.assertEqual(matriz['requisito_caso_uso'], ['AA==', 'Aw=='])
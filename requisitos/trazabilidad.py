@@ -0,0 +1,185 @@
+# requisitos/trazabilidad.py
+import base64
+import csv
+
+from django.db.models import Exists, OuterRef
+
+from requisitos.models import Requisitos
+from casosdeuso.models import CasosUso, CasosUsoRequisitos, RelacionesCasosUso
+from historiasdeusuario.models import HistoriasUsuario, HistoriasRequisitos
+
+
+def vinculos_casos_uso(proyecto_id):
+    """Pares (requisito_id, caso_uso_id) activos del proyecto, ordenados por requisito."""
+    return CasosUsoRequisitos.objects.filter(
+        activo=True,
+        requisito__proyecto_id=proyecto_id,
+        requisito__activo=True,
+        caso_uso__activo=True
+    ).order_by('requisito_id', 'caso_uso_id').values_list('requisito_id', 'caso_uso_id')
+
+
+def vinculos_historias(proyecto_id):
+    """Pares (requisito_id, historia_id) activos del proyecto, ordenados por requisito."""
+    return HistoriasRequisitos.objects.filter(
+        activo=True,
+        requisito__proyecto_id=proyecto_id,
+        requisito__activo=True,
+        historia__activo=True
+    ).order_by('requisito_id', 'historia_id').values_list('requisito_id', 'historia_id')
+
+
+def _bitset(posiciones, total):
+    bits = bytearray((total + 7) // 8)
+    for p in posiciones:
+        bits[p >> 3] |= 1 << (p & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def _eje(ids):
+    """Ids ordenados y su posición en el eje."""
+    eje = sorted(set(ids))
+    return eje, {id_: i for i, id_ in enumerate(eje)}
+
+
+def matriz_trazabilidad(proyecto_id, formato='pares'):
+    """Matriz requisito x caso de uso y requisito x historia en forma compacta.
+
+    Sale de las dos consultas de vínculos: los ejes son listas de ids con los artefactos
+    que tienen al menos un vínculo (los que no tienen ninguno están en /cobertura/). Cada
+    celda marcada se expresa como un par de posiciones [i_requisito, j_columna] (formato
+    "pares") o, con formato "bitset", como una cadena base64 por requisito donde el bit j
+    indica cobertura (bit j = byte j // 8, bit j % 8 menos significativo primero).
+    """
+    cu = list(vinculos_casos_uso(proyecto_id).filter(caso_uso__proyecto_id=proyecto_id))
+    hu = list(vinculos_historias(proyecto_id).filter(historia__proyecto_id=proyecto_id))
+
+    requisitos, fila = _eje([r for r, _ in cu] + [r for r, _ in hu])
+    casos_uso, col_cu = _eje(c for _, c in cu)
+    historias, col_hu = _eje(h for _, h in hu)
+
+    pares_cu = [[fila[r], col_cu[c]] for r, c in cu]
+    pares_hu = [[fila[r], col_hu[h]] for r, h in hu]
+
+    matriz = {
+        'proyecto_id': proyecto_id,
+        'formato': formato,
+        'requisitos': requisitos,
+        'casos_uso': casos_uso,
+        'historias': historias,
+    }
+
+    if formato == 'bitset':
+        por_fila_cu = [[] for _ in requisitos]
+        por_fila_hu = [[] for _ in requisitos]
+        for i, j in pares_cu:
+            por_fila_cu[i].append(j)
+        for i, j in pares_hu:
+            por_fila_hu[i].append(j)
+        matriz['requisito_caso_uso'] = [_bitset(p, len(casos_uso)) for p in por_fila_cu]
+        matriz['requisito_historia'] = [_bitset(p, len(historias)) for p in por_fila_hu]
+    else:
+        matriz['requisito_caso_uso'] = pares_cu
+        matriz['requisito_historia'] = pares_hu
+
+    matriz['cobertura'] = {
+        'requisitos_con_caso_uso': len({i for i, _ in pares_cu}),
+        'requisitos_con_historia': len({i for i, _ in pares_hu}),
+        'requisitos_vinculados': len(requisitos),
+    }
+    return matriz
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def filas_csv_trazabilidad(proyecto_id):
+    """Genera el CSV de la matriz fila a fila, con memoria constante.
+
+    Recorre los requisitos y ambos conjuntos de vínculos con cursores ordenados por
+    requisito_id y los combina como un merge join.
+    """
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(['requisito_id', 'requisito', 'casos_uso', 'historias'])
+
+    requisitos = Requisitos.objects.filter(
+        proyecto_id=proyecto_id, activo=True
+    ).order_by('id').values_list('id', 'nombre').iterator(chunk_size=2000)
+    cu = vinculos_casos_uso(proyecto_id).filter(caso_uso__proyecto_id=proyecto_id).iterator(chunk_size=2000)
+    hu = vinculos_historias(proyecto_id).filter(historia__proyecto_id=proyecto_id).iterator(chunk_size=2000)
+
+    siguiente_cu = next(cu, None)
+    siguiente_hu = next(hu, None)
+
+    for requisito_id, nombre in requisitos:
+        casos = []
+        while siguiente_cu is not None and siguiente_cu[0] <= requisito_id:
+            if siguiente_cu[0] == requisito_id:
+                casos.append(str(siguiente_cu[1]))
+            siguiente_cu = next(cu, None)
+
+        historias = []
+        while siguiente_hu is not None and siguiente_hu[0] <= requisito_id:
+            if siguiente_hu[0] == requisito_id:
+                historias.append(str(siguiente_hu[1]))
+            siguiente_hu = next(hu, None)
+
+        yield escritor.writerow([requisito_id, nombre, ';'.join(casos), ';'.join(historias)])
+
+
+CATEGORIAS_COBERTURA = (
+    'requisitos_sin_caso_uso',
+    'requisitos_sin_historia',
+    'historias_sin_requisito',
+    'casos_uso_no_incluidos',
+)
+
+
+def brechas_cobertura(proyecto_id):
+    """Consultas NOT EXISTS (anti-joins) de cada brecha de cobertura del proyecto.
+
+    - requisitos_sin_caso_uso / requisitos_sin_historia: sin vínculo activo a un artefacto activo.
+    - historias_sin_requisito: historias sin ningún requisito vinculado.
+    - casos_uso_no_incluidos: casos de uso que ningún caso de uso activo incluye.
+    """
+    requisitos = Requisitos.objects.filter(proyecto_id=proyecto_id, activo=True)
+    historias = HistoriasUsuario.objects.filter(proyecto_id=proyecto_id, activo=True)
+    casos_uso = CasosUso.objects.filter(proyecto_id=proyecto_id, activo=True)
+
+    return {
+        'requisitos_sin_caso_uso': requisitos.filter(~Exists(
+            CasosUsoRequisitos.objects.filter(requisito_id=OuterRef('pk'), activo=True, caso_uso__activo=True)
+        )),
+        'requisitos_sin_historia': requisitos.filter(~Exists(
+            HistoriasRequisitos.objects.filter(requisito_id=OuterRef('pk'), activo=True, historia__activo=True)
+        )),
+        'historias_sin_requisito': historias.filter(~Exists(
+            HistoriasRequisitos.objects.filter(historia_id=OuterRef('pk'), activo=True, requisito__activo=True)
+        )),
+        'casos_uso_no_incluidos': casos_uso.filter(~Exists(
+            RelacionesCasosUso.objects.filter(
+                caso_uso_destino_id=OuterRef('pk'),
+                activo=True,
+                tipo_relacion__nombre='include',
+                caso_uso_origen__activo=True
+            )
+        )),
+    }
+
+
+def reporte_cobertura(proyecto_id, limite, desplazamiento, categorias=None):
+    """Total y una página de ids por cada brecha (dos consultas por categoría)."""
+    reporte = {}
+    for categoria, consulta in brechas_cobertura(proyecto_id).items():
+        if categorias and categoria not in categorias:
+            continue
+        ids = consulta.order_by('id').values_list('id', flat=True)
+        reporte[categoria] = {
+            'total': consulta.count(),
+            'ids': list(ids[desplazamiento:desplazamiento + limite]),
+        }
+    return reporte
@@ -12,4 +12,14 @@ urlpatterns = [
     
     # Relaciones entre requisitos
     path('relaciones/<int:requisito_id>/', views.obtener_relaciones_requisito, name='obtener_relaciones_requisito'),
-]
\ No newline at end of file
+    path('impacto/<int:requisito_id>/', views.impacto_requisito, name='impacto_requisito'),
+    path('vinculos/<int:requisito_id>/', views.vincular_requisito, name='vincular_requisito'),
+
+    # Grafo de dependencias del proyecto
+    path('grafo/<int:proyecto_id>/', views.grafo_requisitos, name='grafo_requisitos'),
+
+    # Matriz de trazabilidad requisito x caso de uso / historia
+    path('trazabilidad/<int:proyecto_id>/', views.matriz_trazabilidad_proyecto, name='matriz_trazabilidad_proyecto'),
+    path('trazabilidad/<int:proyecto_id>/csv/', views.matriz_trazabilidad_csv, name='matriz_trazabilidad_csv'),
+    path('cobertura/<int:proyecto_id>/', views.cobertura_proyecto, name='cobertura_proyecto'),
+]
@@ -1,15 +1,31 @@
 # requisitos/views.py
-from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from app.instrumentacion import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
-from django.shortcuts import get_object_or_404
+from django.db import transaction, connection
+from django.shortcuts import get_object_or_404, aget_object_or_404
 from requisitos.models import Requisitos, RelacionesRequisitos, TiposRequisito, Prioridades, EstadosElemento, TiposRelacionRequisito
 from proyectos.models import Proyectos
+from proyectos.revisiones import instantanea, registrar_revision
 from usuarios.models import Usuarios
 from usuarios.views import validar_token
+from requisitos.grafo import obtener_analisis, invalidar_grafo, cierre_transitivo, forma_ciclo, CicloDetectado, TIPOS_IMPACTO
+from django.conf import settings
+from requisitos.trazabilidad import matriz_trazabilidad, filas_csv_trazabilidad, reporte_cobertura, CATEGORIAS_COBERTURA
+from requisitos.vinculos import ACCIONES, VINCULOS_REQUISITO, VinculosInvalidos, normalizar_ids, ids_fuera_de_proyecto, aplicar_vinculos
 import json
 
+def _validar_ciclos(data):
+    """Campo "validar_ciclos": solo un booleano JSON (None si trae otra cosa); sin el
+    campo, VALIDAR_CICLOS_REQUISITOS."""
+    valor = data.get('validar_ciclos', settings.VALIDAR_CICLOS_REQUISITOS)
+    return valor if isinstance(valor, bool) else None
+
+
+ERROR_VALIDAR_CICLOS = 'El campo validar_ciclos debe ser true o false'
+
+
 # -----------------------------
 # Crear requisito
 # -----------------------------
@@ -36,10 +52,13 @@ def crear_requisito(request):
         origen = data.get('origen', '')
         condiciones_previas = data.get('condiciones_previas', '')
         relaciones = data.get('relaciones_requisitos', [])
+        validar_ciclos = _validar_ciclos(data)
 
         # Validaciones
         if not (nombre and descripcion and tipo_id and criterios and proyecto_id):
             return JsonResponse({'error': 'Campos obligatorios faltantes'}, status=400)
+        if validar_ciclos is None:
+            return JsonResponse({'error': ERROR_VALIDAR_CICLOS}, status=400)
 
         # Validar que el proyecto existe
         try:
@@ -81,6 +100,7 @@ def crear_requisito(request):
                 proyecto_id=proyecto_id,  
                 activo=True
             )
+            registrar_revision('requisito', requisito, usuario_id=payload.get('usuario_id'))
 
             # Guardar relaciones si vienen
             for rel in relaciones:
@@ -109,11 +129,21 @@ def crear_requisito(request):
                         descripcion=descripcion_relacion
                     )
 
+            # Rechazar relaciones depende/bloquea que cierren un ciclo (revierte la transacción)
+            if validar_ciclos and relaciones:
+                with connection.cursor() as cursor:
+                    if forma_ciclo(cursor, requisito.id):
+                        raise CicloDetectado()
+
+        invalidar_grafo(requisito.proyecto_id)
+
         return JsonResponse({
             'mensaje': 'Requisito creado exitosamente',
             'requisito_id': requisito.id
         }, status=201)
 
+    except CicloDetectado:
+        return JsonResponse({'error': 'Las relaciones indicadas forman un ciclo de dependencias'}, status=400)
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON inválido'}, status=400)
     except Exception as e:
@@ -124,14 +154,16 @@ def crear_requisito(request):
 # Obtener un requisito específico
 # -----------------------------
 @require_http_methods(["GET"])
-def obtener_requisito(request, requisito_id):
+async def obtener_requisito(request, requisito_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        # Obtener el requisito
-        requisito = get_object_or_404(Requisitos, id=requisito_id, activo=True)
+        # Obtener el requisito (con sus catálogos: en async no hay carga perezosa)
+        requisito = await aget_object_or_404(
+            Requisitos.objects.select_related('tipo', 'prioridad', 'estado'), id=requisito_id, activo=True
+        )
 
         def safe_key_conversion(value):
             if not value:
@@ -144,7 +176,7 @@ def obtener_requisito(request, requisito_id):
         ).select_related('requisito_destino', 'tipo_relacion')
 
         relaciones_data = []
-        for rel in relaciones:
+        async for rel in relaciones:
             relaciones_data.append({
                 'id': rel.id,
                 'requisito_id': rel.requisito_destino.id,
@@ -185,59 +217,67 @@ def actualizar_requisito(request, requisito_id):
 
     try:
         data = json.loads(request.body.decode('utf-8'))
-        
-        # Obtener el requisito existente
-        requisito = get_object_or_404(Requisitos, id=requisito_id, activo=True)
-
-        # Campos que se pueden actualizar
-        if 'nombre' in data:
-            if not data['nombre'] or len(data['nombre']) < 5:
-                return JsonResponse({'error': 'El nombre debe tener al menos 5 caracteres'}, status=400)
-            requisito.nombre = data['nombre']
-
-        if 'descripcion' in data:
-            if not data['descripcion'] or len(data['descripcion']) < 10:
-                return JsonResponse({'error': 'La descripción debe tener al menos 10 caracteres'}, status=400)
-            requisito.descripcion = data['descripcion']
 
-        if 'criterios' in data:
-            if not data['criterios'] or len(data['criterios']) < 10:
-                return JsonResponse({'error': 'Los criterios deben tener al menos 10 caracteres'}, status=400)
-            requisito.criterios = data['criterios']
+        validar_ciclos = _validar_ciclos(data)
+        if validar_ciclos is None:
+            return JsonResponse({'error': ERROR_VALIDAR_CICLOS}, status=400)
 
-        if 'tipo_id' in data and data['tipo_id']:
-            try:
-                TiposRequisito.objects.get(id=data['tipo_id'])
-                requisito.tipo_id = data['tipo_id']
-            except TiposRequisito.DoesNotExist:
-                return JsonResponse({'error': 'El tipo de requisito especificado no existe'}, status=400)
+        # Obtener el requisito existente
+        with transaction.atomic():
+            # Fila bloqueada hasta el final: la instantánea es exactamente el estado que
+            # reemplaza este cambio, también con actualizaciones concurrentes
+            requisito = get_object_or_404(Requisitos.objects.select_for_update(), id=requisito_id, activo=True)
+            anterior = instantanea('requisito', requisito)
+
+            # Campos que se pueden actualizar
+            if 'nombre' in data:
+                if not data['nombre'] or len(data['nombre']) < 5:
+                    return JsonResponse({'error': 'El nombre debe tener al menos 5 caracteres'}, status=400)
+                requisito.nombre = data['nombre']
+
+            if 'descripcion' in data:
+                if not data['descripcion'] or len(data['descripcion']) < 10:
+                    return JsonResponse({'error': 'La descripción debe tener al menos 10 caracteres'}, status=400)
+                requisito.descripcion = data['descripcion']
+
+            if 'criterios' in data:
+                if not data['criterios'] or len(data['criterios']) < 10:
+                    return JsonResponse({'error': 'Los criterios deben tener al menos 10 caracteres'}, status=400)
+                requisito.criterios = data['criterios']
+
+            if 'tipo_id' in data and data['tipo_id']:
+                try:
+                    TiposRequisito.objects.get(id=data['tipo_id'])
+                    requisito.tipo_id = data['tipo_id']
+                except TiposRequisito.DoesNotExist:
+                    return JsonResponse({'error': 'El tipo de requisito especificado no existe'}, status=400)
 
-        if 'prioridad_id' in data:
-            if data['prioridad_id']:
+            if 'prioridad_id' in data:
+                if data['prioridad_id']:
+                    try:
+                        Prioridades.objects.get(id=data['prioridad_id'])
+                        requisito.prioridad_id = data['prioridad_id']
+                    except Prioridades.DoesNotExist:
+                        return JsonResponse({'error': 'La prioridad especificada no existe'}, status=400)
+                else:
+                    requisito.prioridad_id = None
+
+            if 'estado_id' in data and data['estado_id']:
                 try:
-                    Prioridades.objects.get(id=data['prioridad_id'])
-                    requisito.prioridad_id = data['prioridad_id']
-                except Prioridades.DoesNotExist:
-                    return JsonResponse({'error': 'La prioridad especificada no existe'}, status=400)
-            else:
-                requisito.prioridad_id = None
-
-        if 'estado_id' in data and data['estado_id']:
-            try:
-                EstadosElemento.objects.get(id=data['estado_id'])
-                requisito.estado_id = data['estado_id']
-            except EstadosElemento.DoesNotExist:
-                return JsonResponse({'error': 'El estado especificado no existe'}, status=400)
+                    EstadosElemento.objects.get(id=data['estado_id'])
+                    requisito.estado_id = data['estado_id']
+                except EstadosElemento.DoesNotExist:
+                    return JsonResponse({'error': 'El estado especificado no existe'}, status=400)
 
-        if 'origen' in data:
-            requisito.origen = data['origen'] or ''
+            if 'origen' in data:
+                requisito.origen = data['origen'] or ''
 
-        if 'condiciones_previas' in data:
-            requisito.condiciones_previas = data['condiciones_previas'] or ''
+            if 'condiciones_previas' in data:
+                requisito.condiciones_previas = data['condiciones_previas'] or ''
 
-        with transaction.atomic():
             # Guardar los cambios del requisito
             requisito.save()
+            registrar_revision('requisito', requisito, anterior, payload.get('usuario_id'))
 
             # Actualizar relaciones si vienen en la petición
             if 'relaciones_requisitos' in data:
@@ -276,11 +316,22 @@ def actualizar_requisito(request, requisito_id):
                             descripcion=descripcion_relacion
                         )
 
+                # Rechazar relaciones depende/bloquea que cierren un ciclo (revierte la transacción)
+                if validar_ciclos and relaciones:
+                    with connection.cursor() as cursor:
+                        if forma_ciclo(cursor, requisito.id):
+                            raise CicloDetectado()
+
+        if 'relaciones_requisitos' in data:
+            invalidar_grafo(requisito.proyecto_id)
+
         return JsonResponse({
             'mensaje': 'Requisito actualizado exitosamente',
             'requisito_id': requisito.id
         }, status=200)
 
+    except CicloDetectado:
+        return JsonResponse({'error': 'Las relaciones indicadas forman un ciclo de dependencias'}, status=400)
     except json.JSONDecodeError:
         return JsonResponse({'error': 'JSON inválido'}, status=400)
     except Exception as e:
@@ -298,12 +349,14 @@ def eliminar_requisito(request, requisito_id):
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
-        requisito = get_object_or_404(Requisitos, id=requisito_id, activo=True)
-
         with transaction.atomic():
+            requisito = get_object_or_404(Requisitos.objects.select_for_update(), id=requisito_id, activo=True)
+            anterior = instantanea('requisito', requisito)
+
             # Soft delete del requisito
             requisito.activo = False
             requisito.save()
+            registrar_revision('requisito', requisito, anterior, payload.get('usuario_id'))
 
             # Eliminar todas las relaciones donde este requisito aparece
             RelacionesRequisitos.objects.filter(
@@ -314,6 +367,8 @@ def eliminar_requisito(request, requisito_id):
                 requisito_destino=requisito
             ).delete()
 
+        invalidar_grafo(requisito.proyecto_id)
+
         return JsonResponse({
             'mensaje': 'Requisito eliminado exitosamente'
         }, status=200)
@@ -326,16 +381,14 @@ def eliminar_requisito(request, requisito_id):
 # Listar requisitos de un proyecto
 # -----------------------------
 @require_http_methods(["GET"])
-def listar_requisitos(request, proyecto_id):
+async def listar_requisitos(request, proyecto_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
         # Validar que el proyecto existe
-        try:
-            Proyectos.objects.get(id=proyecto_id, activo=True)
-        except Proyectos.DoesNotExist:
+        if not await Proyectos.objects.filter(id=proyecto_id, activo=True).aexists():
             return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
 
         # Obtener requisitos del proyecto
@@ -344,13 +397,13 @@ def listar_requisitos(request, proyecto_id):
             activo=True
         ).select_related('tipo', 'prioridad', 'estado').order_by('-fecha_creacion')
 
-        data = []
-        for r in requisitos:
-            def safe_key_conversion(value):
-                if not value:
-                    return None
-                return value.lower().replace(' ', '-').replace('ó', 'o').replace('í', 'i')
+        def safe_key_conversion(value):
+            if not value:
+                return None
+            return value.lower().replace(' ', '-').replace('ó', 'o').replace('í', 'i')
 
+        data = []
+        async for r in requisitos:
             data.append({
                 'id': r.id,
                 'nombre': r.nombre,
@@ -375,14 +428,14 @@ def listar_requisitos(request, proyecto_id):
 # Obtener relaciones de un requisito específico
 # -----------------------------
 @require_http_methods(["GET"])
-def obtener_relaciones_requisito(request, requisito_id):
+async def obtener_relaciones_requisito(request, requisito_id):
     payload = validar_token(request)
     if not payload or 'error' in payload:
         return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
 
     try:
         # Validar que el requisito existe
-        requisito = get_object_or_404(Requisitos, id=requisito_id, activo=True)
+        requisito = await aget_object_or_404(Requisitos, id=requisito_id, activo=True)
 
         # Obtener relaciones donde este requisito es el origen
         relaciones = RelacionesRequisitos.objects.filter(
@@ -390,7 +443,7 @@ def obtener_relaciones_requisito(request, requisito_id):
         ).select_related('requisito_destino', 'tipo_relacion')
 
         data = []
-        for rel in relaciones:
+        async for rel in relaciones:
             data.append({
                 'id': rel.id,
                 'requisito_id': rel.requisito_destino.id,
@@ -402,3 +455,205 @@ def obtener_relaciones_requisito(request, requisito_id):
 
     except Exception as e:
         return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+
+# -----------------------------
+# Grafo de dependencias de un proyecto
+# -----------------------------
+@require_http_methods(["GET"])
+def grafo_requisitos(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        # Validar que el proyecto existe
+        if not Proyectos.objects.filter(id=proyecto_id, activo=True).exists():
+            return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
+
+        return JsonResponse({'grafo': obtener_analisis(proyecto_id)}, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+
+# -----------------------------
+# Análisis de impacto de un requisito (cierre transitivo)
+# -----------------------------
+@require_http_methods(["GET"])
+def impacto_requisito(request, requisito_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        requisito = get_object_or_404(Requisitos, id=requisito_id, activo=True)
+
+        # Profundidad máxima (?profundidad=N, entre 1 y 50)
+        try:
+            profundidad = int(request.GET.get('profundidad', 10))
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'La profundidad debe ser un número entero'}, status=400)
+        if profundidad < 1 or profundidad > 50:
+            return JsonResponse({'error': 'La profundidad debe estar entre 1 y 50'}, status=400)
+
+        # Tipos de relación a seguir (?tipos=depende,deriva)
+        nombres_tipos = [t.strip() for t in request.GET.get('tipos', '').split(',') if t.strip()]
+        nombres_tipos = nombres_tipos or list(TIPOS_IMPACTO)
+        tipos = dict(
+            TiposRelacionRequisito.objects.filter(nombre__in=nombres_tipos).values_list('nombre', 'id')
+        )
+        desconocidos = [n for n in nombres_tipos if n not in tipos]
+        if desconocidos:
+            return JsonResponse({'error': f'Tipos de relación no válidos: {", ".join(desconocidos)}'}, status=400)
+
+        with connection.cursor() as cursor:
+            aguas_arriba = cierre_transitivo(cursor, requisito.id, tipos.values(), profundidad, 'aguas_arriba')
+            aguas_abajo = cierre_transitivo(cursor, requisito.id, tipos.values(), profundidad, 'aguas_abajo')
+
+        return JsonResponse({
+            'impacto': {
+                'requisito_id': requisito.id,
+                'profundidad_maxima': profundidad,
+                'tipos_relacion': nombres_tipos,
+                'aguas_arriba': aguas_arriba,
+                'aguas_abajo': aguas_abajo
+            }
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+
+# -----------------------------
+# Matriz de trazabilidad de un proyecto
+# -----------------------------
+@require_http_methods(["GET"])
+def matriz_trazabilidad_proyecto(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        if not Proyectos.objects.filter(id=proyecto_id, activo=True).exists():
+            return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
+
+        formato = request.GET.get('formato', 'pares')
+        if formato not in ('pares', 'bitset'):
+            return JsonResponse({'error': 'El formato debe ser pares o bitset'}, status=400)
+
+        return JsonResponse({'matriz': matriz_trazabilidad(proyecto_id, formato)}, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+
+# -----------------------------
+# Matriz de trazabilidad en CSV (streaming)
+# -----------------------------
+@require_http_methods(["GET"])
+def matriz_trazabilidad_csv(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    if not Proyectos.objects.filter(id=proyecto_id, activo=True).exists():
+        return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
+
+    response = StreamingHttpResponse(filas_csv_trazabilidad(proyecto_id), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="trazabilidad_proyecto_{proyecto_id}.csv"'
+    return response
+
+
+# -----------------------------
+# Reporte de brechas de cobertura de un proyecto
+# -----------------------------
+@require_http_methods(["GET"])
+def cobertura_proyecto(request, proyecto_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        if not Proyectos.objects.filter(id=proyecto_id, activo=True).exists():
+            return JsonResponse({'error': 'El proyecto especificado no existe'}, status=404)
+
+        # Paginación (?limite=100&desplazamiento=0) y filtro opcional (?categoria=a,b)
+        try:
+            limite = int(request.GET.get('limite', 100))
+            desplazamiento = int(request.GET.get('desplazamiento', 0))
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'limite y desplazamiento deben ser números enteros'}, status=400)
+        if limite < 1 or limite > 1000 or desplazamiento < 0:
+            return JsonResponse({'error': 'limite debe estar entre 1 y 1000 y desplazamiento no puede ser negativo'}, status=400)
+
+        categorias = [c.strip() for c in request.GET.get('categoria', '').split(',') if c.strip()]
+        desconocidas = [c for c in categorias if c not in CATEGORIAS_COBERTURA]
+        if desconocidas:
+            return JsonResponse({'error': f'Categorías no válidas: {", ".join(desconocidas)}'}, status=400)
+
+        return JsonResponse({
+            'proyecto_id': proyecto_id,
+            'limite': limite,
+            'desplazamiento': desplazamiento,
+            'cobertura': reporte_cobertura(proyecto_id, limite, desplazamiento, categorias)
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
+
+
+# -----------------------------
+# Vínculos de trazabilidad de un requisito (agregar / quitar / reemplazar)
+# -----------------------------
+@csrf_exempt
+@require_http_methods(["POST"])
+def vincular_requisito(request, requisito_id):
+    payload = validar_token(request)
+    if not payload or 'error' in payload:
+        return JsonResponse({'error': 'Token inválido o requerido'}, status=401)
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        requisito = get_object_or_404(Requisitos, id=requisito_id, activo=True)
+
+        accion = data.get('accion')
+        if accion not in ACCIONES:
+            return JsonResponse({'error': 'La acción debe ser agregar, quitar o reemplazar'}, status=400)
+
+        # Solo se modifican los conjuntos que vienen en la petición (casos_uso y/o historias)
+        try:
+            ids_por_tipo = {
+                tipo: normalizar_ids(data[tipo], tipo)
+                for tipo in VINCULOS_REQUISITO if tipo in data
+            }
+        except VinculosInvalidos as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        if not ids_por_tipo:
+            return JsonResponse({'error': 'Debe indicar casos_uso y/o historias'}, status=400)
+
+        # Todos los artefactos deben pertenecer al mismo proyecto (una consulta)
+        invalidos = ids_fuera_de_proyecto(requisito.proyecto_id, ids_por_tipo)
+        if invalidos:
+            return JsonResponse({
+                'error': 'Hay artefactos que no existen o no pertenecen al proyecto',
+                'invalidos': invalidos
+            }, status=400)
+
+        vinculados = {}
+        with transaction.atomic():
+            for tipo, ids in ids_por_tipo.items():
+                modelo, campo = VINCULOS_REQUISITO[tipo]
+                vinculados[tipo] = aplicar_vinculos(modelo, 'requisito', requisito.id, campo, ids, accion)
+
+        return JsonResponse({
+            'mensaje': 'Vínculos actualizados exitosamente',
+            'requisito_id': requisito.id,
+            **vinculados
+        }, status=200)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f'Error interno del servidor: {str(e)}'}, status=500)
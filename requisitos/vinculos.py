@@ -0,0 +1,91 @@
+# requisitos/vinculos.py
+from django.db.models import Value, CharField
+
+from requisitos.models import Requisitos
+from casosdeuso.models import CasosUso, CasosUsoRequisitos
+from historiasdeusuario.models import HistoriasUsuario, HistoriasRequisitos
+
+ACCIONES = ('agregar', 'quitar', 'reemplazar')
+
+MODELOS_ARTEFACTO = {
+    'requisitos': Requisitos,
+    'casos_uso': CasosUso,
+    'historias': HistoriasUsuario,
+}
+
+
+class VinculosInvalidos(Exception):
+    pass
+
+
+def normalizar_ids(valor, campo):
+    """Convierte la lista recibida en ids enteros únicos, conservando el orden."""
+    if not isinstance(valor, list):
+        raise VinculosInvalidos(f'El campo {campo} debe ser una lista de ids')
+    ids = []
+    for v in valor:
+        try:
+            ids.append(int(v))
+        except (ValueError, TypeError):
+            raise VinculosInvalidos(f'El campo {campo} contiene un id no válido: {v}')
+    return list(dict.fromkeys(ids))
+
+
+def ids_fuera_de_proyecto(proyecto_id, ids_por_tipo):
+    """Comprueba con una sola consulta (UNION ALL) que todos los ids existen, están activos
+    y pertenecen al proyecto. Devuelve {tipo: [ids inválidos]} solo con los tipos que fallan.
+    """
+    consultas = [
+        MODELOS_ARTEFACTO[tipo].objects.filter(id__in=ids, proyecto_id=proyecto_id, activo=True)
+        .annotate(tipo_artefacto=Value(tipo, output_field=CharField()))
+        .values_list('tipo_artefacto', 'id')
+        for tipo, ids in ids_por_tipo.items() if ids
+    ]
+    if not consultas:
+        return {}
+
+    consulta = consultas[0].union(*consultas[1:], all=True) if len(consultas) > 1 else consultas[0]
+    encontrados = {}
+    for tipo, artefacto_id in consulta:
+        encontrados.setdefault(tipo, set()).add(artefacto_id)
+
+    invalidos = {}
+    for tipo, ids in ids_por_tipo.items():
+        faltantes = [i for i in ids if i not in encontrados.get(tipo, set())]
+        if faltantes:
+            invalidos[tipo] = faltantes
+    return invalidos
+
+
+def aplicar_vinculos(modelo, campo_propio, propio_id, campo_otro, otros_ids, accion):
+    """Aplica una acción sobre el conjunto de vínculos de un artefacto.
+
+    agregar: un INSERT ... ON CONFLICT; los vínculos existentes se conservan
+    y, si estaban desactivados, se reactivan.
+    quitar: un DELETE.
+    reemplazar: un DELETE de los que sobran y el mismo INSERT para los que faltan.
+    Devuelve los ids vinculados después del cambio.
+    """
+    vinculos = modelo.objects.filter(**{f'{campo_propio}_id': propio_id})
+
+    if accion == 'quitar':
+        vinculos.filter(**{f'{campo_otro}_id__in': otros_ids}).delete()
+    elif accion == 'reemplazar':
+        vinculos.exclude(**{f'{campo_otro}_id__in': otros_ids}).delete()
+
+    if accion in ('agregar', 'reemplazar') and otros_ids:
+        modelo.objects.bulk_create(
+            [modelo(**{f'{campo_propio}_id': propio_id, f'{campo_otro}_id': otro_id, 'activo': True}) for otro_id in otros_ids],
+            update_conflicts=True,
+            unique_fields=[campo_propio, campo_otro],
+            update_fields=['activo']
+        )
+
+    return sorted(vinculos.filter(activo=True).values_list(f'{campo_otro}_id', flat=True))
+
+
+# Tablas de vínculo por tipo de artefacto relacionado con un requisito
+VINCULOS_REQUISITO = {
+    'casos_uso': (CasosUsoRequisitos, 'caso_uso'),
+    'historias': (HistoriasRequisitos, 'historia'),
+}
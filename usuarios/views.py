@@ -1,5 +1,5 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from app.instrumentacion import JsonResponse, medir_auth
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.hashers import make_password, check_password
@@ -115,6 +115,7 @@ def login_usuario(request):
     
 
 # Función auxiliar para validar JWT, es decir ya no es necesario validar el token en cada llamado a la API
+@medir_auth
 def validar_token(request):
     """Valida el token JWT del header Authorization"""
     try:
@@ -130,11 +131,23 @@ def validar_token(request):
         return {'error': 'Token expirado'}
     except jwt.InvalidTokenError:
         return {'error': 'Token inválido'}
+
+
+ROL_ADMIN = 'admin'
+
+
+# Función auxiliar para endpoints de administración: el rol se consulta en la base y no se
+# toma del token, así un usuario que dejó de ser admin pierde el acceso de inmediato
+def es_admin(payload):
+    """Indica si el usuario del token válido `payload` tiene el rol admin"""
+    if not payload or 'error' in payload:
+        return False
+    return Usuarios.objects.filter(id=payload['usuario_id'], activo=True, rol__nombre=ROL_ADMIN).exists()
     
 
 
 @require_http_methods(["GET"])
-def perfil_usuario(request):
+async def perfil_usuario(request):
     """Endpoint protegido que requiere JWT"""
     payload = validar_token(request)
     
@@ -145,7 +158,7 @@ def perfil_usuario(request):
         return JsonResponse(payload, status=401)
     
     try:
-        usuario = Usuarios.objects.select_related('datos_personales', 'rol').get(
+        usuario = await Usuarios.objects.select_related('datos_personales', 'rol').aget(
             id=payload['usuario_id'],
             activo=True
         )